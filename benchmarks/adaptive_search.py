@@ -0,0 +1,52 @@
+"""Compare fixed and adaptive search on papers whose sections saturate quickly.
+
+Each section generates `queries_per_section` queries, but the fake search client
+draws every section's results from a pool of `pool_size` documents, so later
+queries mostly return documents the section has already seen:
+
+    python -m benchmarks.adaptive_search [queries_per_section] [pool_size]
+"""
+
+import sys
+import time
+
+from benchmarks.fakes import install_fakes
+
+
+def run(graph, adaptive: bool) -> tuple[float, dict]:
+    config = {
+        "configurable": {
+            "search_cache_mode": "bypass",
+            "adaptive_search": adaptive,
+            "adaptive_search_max_queries": 100,
+        }
+    }
+    start = time.perf_counter()
+    output = graph.invoke({"topic": "adaptive search"}, config)
+    return time.perf_counter() - start, output["run_stats"]
+
+
+def main(queries_per_section: int = 10, pool_size: int = 8, search_delay: float = 0.05):
+    install_fakes(
+        search_delay=search_delay,
+        queries_per_section=queries_per_section,
+        search_pool_size=pool_size,
+    )
+    from src.agent import graph
+
+    print(
+        f"{queries_per_section} queries per section, {pool_size} distinct documents per section, "
+        f"{search_delay * 1000:.0f}ms per search"
+    )
+    print(f"{'search':<10} {'issued':>7} {'skipped':>8} {'context tokens':>15} {'seconds':>8}")
+    for adaptive in (False, True):
+        elapsed, stats = run(graph, adaptive)
+        print(
+            f"{'adaptive' if adaptive else 'fixed':<10} {stats.get('search_queries_issued', 0):>7}"
+            f" {stats.get('search_queries_skipped', 0):>8} {stats.get('context_tokens_after', 0):>15,}"
+            f" {elapsed:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""Show what the eval runner recomputes as the graph and the judges change.
+
+Evaluates a small dataset with the fakes in a throwaway cache directory, then
+evaluates it again unchanged, after editing one judge prompt, and after a code
+change to the graph. Prints, for each step, the wall time and how many target runs
+and judge calls were computed or served from the cache:
+
+    python -m benchmarks.evals [examples] [repetitions]
+"""
+
+import sys
+import tempfile
+
+from benchmarks.fakes import install_fakes
+
+
+def main(examples: int = 6, repetitions: int = 2):
+    install_fakes(llm_delay=0.05, search_delay=0.05)
+    from src.evals import JUDGES, run_evals
+
+    dataset = [
+        {
+            "id": f"example-{i}",
+            "inputs": {"topic": f"eval topic {i}"},
+            "outputs": {"final_report": f"# Reference paper {i}\n\n## Introduction\n\nReference text."},
+        }
+        for i in range(examples)
+    ]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        config = {"configurable": {"cache_dir": cache_dir, "search_cache_mode": "bypass"}}
+        clarity = JUDGES["clarity"]
+        steps = [
+            ("cold", "v1", None),
+            ("unchanged", "v1", None),
+            ("clarity prompt edited", "v1", clarity.prompt + "\nBe strict about hedging language.\n"),
+            ("graph code changed", "v2", None),
+        ]
+
+        print(f"{examples} examples x {repetitions} repetitions, concurrency 4")
+        print(f"{'step':<24} {'seconds':>8} {'targets run':>12} {'cached':>7} {'judges run':>11} {'cached':>7}")
+        for step, version, prompt in steps:
+            if prompt is not None:
+                clarity.prompt = prompt
+            summary = run_evals(
+                dataset, target="paper", repetitions=repetitions, concurrency=4, config=config, version=version
+            )
+            print(
+                f"{step:<24} {summary['seconds']:>8.2f} {summary['targets_run']:>12} "
+                f"{summary['targets_cached']:>7} {summary['judges_run']:>11} {summary['judges_cached']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
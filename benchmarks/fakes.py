@@ -0,0 +1,362 @@
+"""Deterministic local stand-ins for the chat models and the search client."""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import zlib
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+
+# Sentences of the paragraphs of a fake page that are about its subject
+FINDINGS = [
+    "Study {n} measured how {subject} changes outcomes across several cohorts.",
+    "The {subject} evidence in report {n} points to a moderate, consistent effect.",
+    "Critics of {subject} argue that trial {n} overstated the benefits.",
+    "A replication ({n}) found the {subject} effect held in smaller samples.",
+    "Cost estimates for {subject} in survey {n} varied widely by region.",
+    "Experts interviewed for brief {n} called {subject} a priority for policy.",
+    "Dataset {n} links {subject} to long-term gains in productivity.",
+    "Methodological limits of {subject} research are discussed in review {n}.",
+]
+
+
+class FakeSearchClient:
+    """Search client that waits for a fixed delay and returns canned results.
+
+    By default every query gets its own documents. With `pool_size`, queries that
+    only differ in their numbers (e.g. "<section> evidence 3") draw from a shared pool
+    of that many documents, so later queries of a section mostly return known ones.
+    With `include_raw_content=True`, every result also carries a page of about
+    `raw_content_chars` characters where a few paragraphs are about the query and
+    the rest is navigation, boilerplate and unrelated text.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.0,
+        fail_on: set[str] | None = None,
+        content_chars: int = 400,
+        pool_size: int | None = None,
+        raw_content_chars: int = 20_000,
+    ):
+        self.delay = delay
+        self.fail_on = fail_on or set()
+        self.content_chars = content_chars
+        self.pool_size = pool_size
+        self.raw_content_chars = raw_content_chars
+        self.calls = 0
+
+    def _documents(self, query: str, max_results: int) -> list[tuple[str, int]]:
+        if not self.pool_size:
+            return [(query, i) for i in range(max_results)]
+        stem = re.sub(r"\d+", "", query).strip()
+        offset = zlib.crc32(query.encode())
+        return [(stem, (offset + i) % self.pool_size) for i in range(max_results)]
+
+    def _raw_content(self, subject: str, doc: int) -> str:
+        paragraphs = []
+        length = 0
+        while length < self.raw_content_chars:
+            i = len(paragraphs)
+            if i % 5 == 2:
+                paragraph = " ".join(
+                    FINDINGS[(doc * 7 + i + j) % len(FINDINGS)].format(subject=subject.lower(), n=f"{doc}.{i}.{j}")
+                    for j in range(4)
+                )
+            elif i % 5 == 0:
+                paragraph = "Home | News | About us | Contact. Subscribe to our newsletter. We use cookies. "
+            else:
+                paragraph = f"Related stories {doc}.{i}: weather, travel deals, recipes and sports scores. " * 4
+            paragraphs.append(paragraph.strip())
+            length += len(paragraph) + 2
+        return "\n\n".join(paragraphs)[: self.raw_content_chars]
+
+    def _response(self, query: str, max_results: int | None, include_raw_content: bool = False) -> dict:
+        self.calls += 1
+        if query in self.fail_on:
+            raise RuntimeError(f"injected failure for {query!r}")
+        results = []
+        for i, (subject, doc) in enumerate(self._documents(query, max_results or 5)):
+            result = {
+                "title": f"{subject} result {doc}",
+                "url": f"https://example.com/{'-'.join(subject.lower().split())}/{doc}",
+                "content": (f"Content about {subject} #{doc}. " * 50)[: self.content_chars],
+                "score": round(1.0 - i / 10, 2),
+            }
+            if include_raw_content:
+                result["raw_content"] = self._raw_content(subject, doc)
+            results.append(result)
+        return {"query": query, "results": results}
+
+    def search(self, query, max_results=None, include_raw_content=False, **kwargs):
+        time.sleep(self.delay)
+        return self._response(query, max_results, include_raw_content)
+
+
+class FakeAsyncSearchClient(FakeSearchClient):
+    """Async variant of `FakeSearchClient`"""
+
+    async def search(self, query, max_results=None, include_raw_content=False, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._response(query, max_results, include_raw_content)
+
+
+class FakePromptCache:
+    """Provider-side prompt prefix cache, modelled on OpenAI's automatic caching.
+
+    Prompts of at least `min_tokens` tokens are cached in blocks of `block_tokens`
+    (at 4 characters per token); a prompt reads the longest run of leading blocks it
+    shares with any earlier prompt. Shared by every fake model, like a provider's
+    cache is shared by every request of an organization.
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128):
+        self.min_tokens = min_tokens
+        self.block_tokens = block_tokens
+        self._prefixes: set[bytes] = set()
+        self._lock = threading.Lock()
+
+    def read(self, text: str) -> int:
+        """Return the cached tokens of a prompt and cache its prefixes"""
+        block = self.block_tokens * 4
+        digest = hashlib.sha256()
+        prefixes = []
+        for end in range(block, len(text) + 1, block):
+            digest.update(text[end - block : end].encode())
+            prefixes.append(digest.copy().digest())
+        if len(text) // 4 < self.min_tokens:
+            return 0
+
+        with self._lock:
+            cached_blocks = 0
+            for prefix in prefixes:
+                if prefix not in self._prefixes:
+                    break
+                cached_blocks += 1
+            self._prefixes.update(prefixes)
+        cached = cached_blocks * self.block_tokens
+        return cached if cached >= self.min_tokens else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._prefixes.clear()
+
+
+PROMPT_CACHE = FakePromptCache()
+
+
+def message_text(message) -> str:
+    """Text of a chat message given as a dict or a message object, with or without content blocks"""
+    content = message["content"] if isinstance(message, dict) else message.content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+class FakeStructuredModel:
+    """Structured-output wrapper returning `respond(messages)`.
+
+    The call goes through the chat model with the JSON of the response as its output,
+    so it takes the model's delays and reports its token usage to the callbacks.
+    """
+
+    def __init__(self, model: "FakeChatModel", respond):
+        self.model = model
+        self.respond = respond
+
+    def invoke(self, messages, config=None, **kwargs):
+        response = self.respond(messages)
+        self.model.invoke(messages, config, content=response.model_dump_json())
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        response = self.respond(messages)
+        await self.model.ainvoke(messages, config, content=response.model_dump_json())
+        return response
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model writing a canned report, waiting `delay` before the first token and
+    `token_delay` between tokens. Supports streaming through the callback system."""
+
+    delay: float = 0.0
+    token_delay: float = 0.0
+    report_chars: int = 2000
+    queries_per_section: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, content: str | None = None) -> list[str]:
+        text = content or ("Lorem ipsum dolor sit amet. " * (self.report_chars // 28 + 1))[: self.report_chars]
+        return re.findall(r"\S+\s*", text)
+
+    def _usage(self, messages: list[BaseMessage], tokens: list[str]) -> dict:
+        input_tokens = sum(len(message_text(m)) for m in messages) // 4
+        prompt = "".join(f"{m.type}:{message_text(m)}\n" for m in messages)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": len(tokens),
+            "total_tokens": input_tokens + len(tokens),
+            "input_token_details": {"cache_read": PROMPT_CACHE.read(prompt)},
+        }
+
+    def _result(self, messages: list[BaseMessage], tokens: list[str]) -> ChatResult:
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, content=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(content)
+        time.sleep(self.delay + self.token_delay * len(tokens))
+        return self._result(messages, tokens)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, content=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(content)
+        await asyncio.sleep(self.delay + self.token_delay * len(tokens))
+        return self._result(messages, tokens)
+
+    def _chunks(self, messages: list[BaseMessage], content: str | None = None):
+        tokens = self._tokens(content)
+        for i, token in enumerate(tokens):
+            usage = self._usage(messages, tokens) if i == len(tokens) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+
+    def _stream(self, messages, stop=None, run_manager=None, content=None, **kwargs):
+        time.sleep(self.delay)
+        for chunk in self._chunks(messages, content):
+            time.sleep(self.token_delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        respond = STRUCTURED_RESPONSES[schema.__name__]
+        return FakeStructuredModel(self, lambda messages: respond(messages, self))
+
+    async def _astream(self, messages, stop=None, run_manager=None, content=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        for chunk in self._chunks(messages, content):
+            await asyncio.sleep(self.token_delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+SECTION_TITLES = [
+    ("Abstract", False),
+    ("Introduction", False),
+    ("Related Work", True),
+    ("Analytical Framework", True),
+    ("Analysis", True),
+    ("Discussion", True),
+    ("Conclusion", False),
+    ("Future Work", True),
+]
+
+
+def fake_template(num_sections: int = len(SECTION_TITLES)) -> str:
+    """Build a document template with `num_sections` sections, cycling through SECTION_TITLES"""
+    headings = []
+    for i in range(num_sections):
+        title, require_research = SECTION_TITLES[i % len(SECTION_TITLES)]
+        if i >= len(SECTION_TITLES):
+            title = f"{title} {i // len(SECTION_TITLES) + 1}"
+        marker = "[research]" if require_research else "[no research]"
+        headings.append(f"## {title} {marker}\n- Points to cover in {title}")
+    return "# Benchmark Paper\n\n" + "\n\n".join(headings)
+
+
+def fake_descriptions(messages, model: FakeChatModel):
+    from src.nodes.generate_sections import SectionDescriptions
+
+    prompt = "\n".join(message_text(m) for m in messages)
+    outline = prompt.split("<Outline>")[1].split("</Outline>")[0]
+    titles = re.findall(r"^\d+\. (.+)$", outline, re.MULTILINE)
+    topic = prompt.split("<Topic>")[1].split("</Topic>")[0].strip()
+    return SectionDescriptions(
+        descriptions=[f"Coverage plan for the {title} section of a paper on {topic}." for title in titles]
+    )
+
+
+def fake_queries(messages, model: FakeChatModel):
+    from src.nodes.research_agent.nodes.generate_queries import SearchQueries
+
+    prompt = "\n".join(message_text(m) for m in messages)
+    title = prompt.split("<section_title>")[1].split("</section_title>")[0].strip()
+    return SearchQueries(
+        queries=[f"{title} evidence {i}" for i in range(model.queries_per_section)]
+    )
+
+
+def fake_verdict(schema_name: str):
+    """Structured response of an eval judge: a passing verdict with a fixed explanation"""
+
+    def respond(messages, model: FakeChatModel):
+        import src.evals
+
+        schema = getattr(src.evals, schema_name)
+        fields = {
+            name: True if field.annotation is bool else "Meets the criteria."
+            for name, field in schema.model_fields.items()
+        }
+        return schema(**fields)
+
+    return respond
+
+
+def install_fakes(
+    llm_delay: float = 0.0,
+    search_delay: float = 0.0,
+    token_delay: float = 0.0,
+    queries_per_section: int = 4,
+    content_chars: int = 400,
+    report_chars: int = 2000,
+    search_pool_size: int | None = None,
+    model_profiles: dict[str, dict] | None = None,
+    raw_content_chars: int = 20_000,
+) -> FakeSearchClient:
+    """Point the client registry at local fakes and return the shared fake search client.
+
+    `model_profiles` maps model names to `FakeChatModel` settings (e.g. `delay`)
+    overriding the defaults for that model.
+    """
+    from src.clients import configure_clients
+
+    search_options = {
+        "delay": search_delay,
+        "content_chars": content_chars,
+        "pool_size": search_pool_size,
+        "raw_content_chars": raw_content_chars,
+    }
+    search_client = FakeSearchClient(**search_options)
+    defaults = {
+        "delay": llm_delay,
+        "token_delay": token_delay,
+        "report_chars": report_chars,
+        "queries_per_section": queries_per_section,
+    }
+    configure_clients(
+        model_factory=lambda model, **kwargs: FakeChatModel(
+            **{**defaults, **(model_profiles or {}).get(model, {})}
+        ),
+        search_client_factory=lambda: search_client,
+        async_search_client_factory=lambda: FakeAsyncSearchClient(**search_options),
+    )
+    return search_client
+
+
+STRUCTURED_RESPONSES = {
+    "SectionDescriptions": fake_descriptions,
+    "SearchQueries": fake_queries,
+    **{
+        name: fake_verdict(name)
+        for name in ("CorrectnessGrader", "StructurePresenceGrader", "ClarityGrader", "SectionScore")
+    },
+}
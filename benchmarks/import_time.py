@@ -0,0 +1,52 @@
+"""Check that importing src.agent stays cheap and needs no API keys.
+
+Runs `python -X importtime -c "import src.agent"` in a clean subprocess without
+provider credentials, fails if the import raises, exceeds the time budget, or
+pulls in a provider SDK that should only load on first use.
+
+    python -m benchmarks.import_time [budget_seconds]
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_BUDGET_SECONDS = 1.5
+
+# Provider SDKs that must only be imported when a client is first built
+LAZY_MODULES = ("langchain_openai", "openai", "tavily", "langchain.chat_models")
+
+
+def measure() -> tuple[float, set[str]]:
+    env = {k: v for k, v in os.environ.items() if not k.endswith("_API_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.agent"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import src.agent failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match:
+            cumulative_us[match.group(2)] = int(match.group(1))
+    return cumulative_us["src.agent"] / 1e6, set(cumulative_us)
+
+
+def main(budget: float = DEFAULT_BUDGET_SECONDS) -> int:
+    elapsed, modules = measure()
+    eager = [name for name in LAZY_MODULES if name in modules]
+
+    print(f"import src.agent: {elapsed:.3f}s (budget {budget:.3f}s)")
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+    return 0 if elapsed <= budget and not eager else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(arg) for arg in sys.argv[1:])))
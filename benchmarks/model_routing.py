@@ -0,0 +1,94 @@
+"""Compare cost and latency of routing the query, planner and drafting models.
+
+Each fake model gets its own latency profile, roughly ordered like the real ones
+(smaller models answer sooner and stream faster), and cost is computed from the
+token usage the metrics handler records per node, at list prices in USD per
+million input / output tokens:
+
+    python -m benchmarks.model_routing [runs] [drafting_mode]
+"""
+
+import sys
+import time
+
+from benchmarks.fakes import install_fakes
+
+
+FAKE_MODELS = {
+    "openai:gpt-4.1-nano": {"delay": 0.05, "token_delay": 0.0002},
+    "openai:gpt-4.1-mini": {"delay": 0.10, "token_delay": 0.0005},
+    "openai:gpt-4.1": {"delay": 0.20, "token_delay": 0.0010},
+}
+
+PRICES = {
+    "openai:gpt-4.1-nano": (0.10, 0.40),
+    "openai:gpt-4.1-mini": (0.40, 1.60),
+    "openai:gpt-4.1": (2.00, 8.00),
+}
+
+ROUTING_PROFILES = {
+    "all gpt-4.1": {
+        "query_model": "openai:gpt-4.1",
+        "planner_model": "openai:gpt-4.1",
+        "drafting_model": "openai:gpt-4.1",
+    },
+    "all gpt-4.1-nano": {
+        "query_model": "openai:gpt-4.1-nano",
+        "planner_model": "openai:gpt-4.1-nano",
+        "drafting_model": "openai:gpt-4.1-nano",
+    },
+    "routed": {
+        "query_model": "openai:gpt-4.1-nano",
+        "planner_model": "openai:gpt-4.1-mini",
+        "drafting_model": "openai:gpt-4.1",
+    },
+    "routed, mini drafts": {
+        "query_model": "openai:gpt-4.1-nano",
+        "planner_model": "openai:gpt-4.1-nano",
+        "drafting_model": "openai:gpt-4.1-mini",
+    },
+}
+
+# The Configuration field whose model each LLM-calling node uses
+NODE_MODEL_FIELD = {
+    "generate_sections": "planner_model",
+    "generate_queries": "query_model",
+    "generate_section_queries": "query_model",
+    "generate_report": "drafting_model",
+    "write_section": "drafting_model",
+    "write_dependent_section": "drafting_model",
+}
+
+
+def run_cost(summary: dict, profile: dict) -> float:
+    cost = 0.0
+    for node, stats in summary.get("nodes", {}).items():
+        field = NODE_MODEL_FIELD.get(node)
+        if field is None:
+            continue
+        input_price, output_price = PRICES[profile[field]]
+        cost += (stats["input_tokens"] * input_price + stats["output_tokens"] * output_price) / 1e6
+    return cost
+
+
+def main(runs: int = 3, drafting_mode: str = "single"):
+    install_fakes(report_chars=4000, model_profiles=FAKE_MODELS)
+    from src.agent import graph, metrics_handler
+
+    print(f"{runs} runs per profile, drafting_mode={drafting_mode!r}")
+    print(f"{'profile':<20} {'seconds/paper':>14} {'USD/paper':>10} {'USD/1k papers':>14}")
+    for name, profile in ROUTING_PROFILES.items():
+        config = {
+            "configurable": {"search_cache_mode": "bypass", "drafting_mode": drafting_mode, **profile}
+        }
+        seconds = cost = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            graph.invoke({"topic": "model routing"}, config)
+            seconds += time.perf_counter() - start
+            cost += run_cost(metrics_handler.summary(), profile)
+        print(f"{name:<20} {seconds / runs:>14.2f} {cost / runs:>10.4f} {cost / runs * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]))
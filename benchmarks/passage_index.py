@@ -0,0 +1,87 @@
+"""Measure the passage index on raw page content from the fake search client.
+
+First indexes and scores growing amounts of raw content for one section, showing
+that time per MB stays flat and the selected context stays bounded, and compares
+how much of the selection is about the section against pasting the first passages
+of the pages. Then runs the graph with and without `passage_index`, comparing time
+and the context tokens the drafting model gets:
+
+    python -m benchmarks.passage_index [runs]
+"""
+
+import sys
+import time
+
+from benchmarks.fakes import FakeSearchClient, fake_template, install_fakes
+from src.passages import select_passages, split_passages
+from src.text import estimate_tokens
+
+
+SECTION = "Analysis"
+QUERY = f"{SECTION} Coverage plan for the {SECTION} section."
+
+
+def relevant_share(results: list[dict], title: str) -> float:
+    """Share of the context's tokens in passages that mention the section title"""
+    total = sum(estimate_tokens(item["content"]) for item in results)
+    relevant = sum(estimate_tokens(item["content"]) for item in results if title.lower() in item["content"].lower())
+    return relevant / total if total else 0.0
+
+
+def scaling(passage_tokens: int = 200, top_k: int = 12) -> None:
+    print(
+        f"{'pages':>6} {'raw MB':>7} {'passages':>9} {'ms':>8} {'ms/MB':>7} {'context tokens':>15} "
+        f"{'relevant':>9} {'first-k relevant':>17}"
+    )
+    for pages in (25, 50, 100, 200, 400):
+        client = FakeSearchClient(raw_content_chars=20_000)
+        results = []
+        for i in range(pages // 5):
+            results.extend(client.search(f"{SECTION} evidence {i}", max_results=5, include_raw_content=True)["results"])
+        raw_mb = sum(len(item["raw_content"]) for item in results) / 1e6
+
+        start = time.perf_counter()
+        selected, stats = select_passages(results, QUERY, passage_tokens, top_k)
+        ms = (time.perf_counter() - start) * 1000
+        tokens = sum(estimate_tokens(item["content"]) for item in selected)
+        first_k = [{"content": p} for p in split_passages(results[0]["raw_content"], passage_tokens)[:top_k]]
+        print(
+            f"{pages:>6} {raw_mb:>7.1f} {stats['passages_indexed']:>9} {ms:>8.1f} {ms / raw_mb:>7.1f} "
+            f"{tokens:>15} {relevant_share(selected, SECTION):>9.0%} {relevant_share(first_k, SECTION):>17.0%}"
+        )
+
+
+def graph_runs(runs: int) -> None:
+    install_fakes(content_chars=400, raw_content_chars=20_000)
+    from src.agent import graph
+
+    print(f"\n{'mode':<10} {'seconds':>8} {'raw tokens':>11} {'passages':>9} {'context tokens':>15}")
+    for passage_index in (False, True):
+        config = {
+            "configurable": {
+                "search_cache_mode": "bypass",
+                "document_template": fake_template(8),
+                "passage_index": passage_index,
+            }
+        }
+        seconds = 0.0
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = graph.invoke({"topic": "passage index"}, config)
+            seconds += time.perf_counter() - start
+
+        stats = output["run_stats"]
+        print(
+            f"{'passages' if passage_index else 'snippets':<10} {seconds / runs:>8.2f} "
+            f"{stats.get('raw_content_tokens', 0):>11} {stats.get('passages_indexed', 0):>9} "
+            f"{stats['context_tokens_after']:>15}"
+        )
+
+
+def main(runs: int = 3):
+    scaling()
+    graph_runs(runs)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
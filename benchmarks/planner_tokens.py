@@ -0,0 +1,141 @@
+"""Compare the planner's token usage before and after the template compiler.
+
+The previous planner sent the whole markdown template and had the model re-emit
+every section as a full `Section` object (title, research flag and three fields
+that always had to be empty). The planner now gets the compiled outline and returns
+only the descriptions. Token counts are estimated (about four characters per
+token) for the prompt, the JSON schema sent as the tool definition and the
+structured output, assuming equally long descriptions in both versions:
+
+    python -m benchmarks.planner_tokens [description_chars]
+"""
+
+import json
+import sys
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.configuration import Configuration
+from src.nodes.generate_sections import SectionDescriptions, _build_messages
+from src.scheduler import prompt_tokens
+from src.templates import TEMPLATES, compile_template
+from src.text import estimate_tokens
+
+
+class PreviousSection(BaseModel):
+    """The `Section` schema the previous planner had to fill in"""
+
+    model_config = ConfigDict(extra="forbid")
+    title: str = Field(description="The title of the section")
+    description: str = Field(
+        description="A comprehensive, well-detailed description of what should be included in the section, incorporating current research findings, specific content areas, key concepts, methodologies, and practical guidance"
+    )
+    require_research: bool = Field(
+        description="Whether the section requires research to be written or it can be written based on other section contents"
+    )
+    search_queries: list[str] = Field(description="Make sure this field is always empty")
+    search_results: list[dict] = Field(description="Make sure this field is always empty")
+    section_context: str = Field(description="Make sure this field is always empty")
+
+
+class PreviousSections(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    sections: list[PreviousSection] = Field(description="The sections of the topic")
+
+
+PREVIOUS_PROMPT = """
+# Identity
+You are a helpful assistant that generates a list of sections for a given topic.
+
+# Task
+You are provided with:
+1. A **topic** that defines the subject.
+2. A **template** that specifies the section titles to generate.
+
+Your goal is to produce a **list of sections**, one for each item in the template.
+
+# Guidelines
+- Always generate **all sections listed in the template**, in the same order.
+- Return a **list of sections** where each section has exactly:
+  * `title`: A concise title (use the template wording as-is, or clarify if needed).
+  * `description`: A topic-specific coverage plan for what to include in that section.
+  * `require_research`: A boolean indicating whether this section needs external research (true) or can be written from other sections' content (false).
+  * `search_queries`: Default empty list.
+  * `search_results`: Default empty list.
+  * `section_context`: Default empty string.
+  
+  
+- Each description must:
+  - Be grounded in the provided topic (avoid generic phrasing like "This section should...").
+  - State **what content should be covered**, not just what the section “is about.”
+  - Include:
+    * **Purpose** of the section.
+    * **Scope**: what belongs, what is out-of-scope.
+    * **Key points, elements, or subtopics** tied to the topic.
+    * **Methods, datasets, or evidence** if applicable.
+    * **Examples, pitfalls, or best practices** if relevant.
+    * **Deliverables** such as figures, tables, or diagrams if useful.
+- The descriptions must be **actionable and specific**, so they can guide someone writing the section.
+- Do not restate the section title in the description.
+- Do not omit any section from the template.
+- For `require_research`: Set to `true` for sections that need external data, studies, or current information (e.g., "Related Work", "Results", "Analysis"). Set to `false` for sections that can be written from other sections' content (e.g., "Introduction", "Conclusion", "Organization of the paper").
+
+# Context
+
+<Topic>
+{topic}
+</Topic>
+
+<Template>
+{template}
+</Template>
+"""
+
+
+TOPIC = "The impact of large language models on software engineering productivity"
+
+
+def previous_tokens(template: str, description: str) -> tuple[int, int]:
+    outline = compile_template(template)
+    prompt = PREVIOUS_PROMPT.format(topic=TOPIC, template=template)
+    schema = json.dumps(PreviousSections.model_json_schema())
+    output = PreviousSections(
+        sections=[
+            PreviousSection(
+                title=section.title,
+                description=description,
+                require_research=section.require_research,
+                search_queries=[],
+                search_results=[],
+                section_context="",
+            )
+            for section in outline
+        ]
+    ).model_dump_json()
+    return estimate_tokens(prompt) + estimate_tokens(schema), estimate_tokens(output)
+
+
+def current_tokens(template: str, description: str) -> tuple[int, int]:
+    outline = compile_template(template)
+    messages = _build_messages({"topic": TOPIC}, outline, Configuration().planner_model)
+    schema = json.dumps(SectionDescriptions.model_json_schema())
+    output = SectionDescriptions(descriptions=[description] * len(outline)).model_dump_json()
+    return prompt_tokens(messages) + estimate_tokens(schema), estimate_tokens(output)
+
+
+def main(description_chars: int = 600):
+    description = ("Topic-specific coverage plan. " * (description_chars // 30 + 1))[:description_chars]
+    print(f"descriptions of {description_chars} characters; estimated tokens (input / output)")
+    print(f"{'paper type':<32} {'previous':>15} {'current':>15} {'input saved':>12} {'output saved':>13}")
+    for paper_type in (Configuration().research_paper_type, "Experimental Research Paper", "Review Paper"):
+        template = TEMPLATES[paper_type]
+        old_in, old_out = previous_tokens(template, description)
+        new_in, new_out = current_tokens(template, description)
+        print(
+            f"{paper_type:<32} {old_in:>6} / {old_out:>6} {new_in:>6} / {new_out:>6}"
+            f" {(old_in - new_in) / old_in:>12.0%} {(old_out - new_out) / old_out:>13.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
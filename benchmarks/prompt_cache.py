@@ -0,0 +1,52 @@
+"""Measure how much of every node's prompt a provider prefix cache can reuse.
+
+Runs several papers on different topics through the graph with the fakes, whose
+`PROMPT_CACHE` caches prompt prefixes the way OpenAI does (prompts of 1024+ tokens,
+in 128-token blocks). Prints the input tokens and the cached share per node, as
+recorded from the models' usage metadata, for both drafting modes:
+
+    python -m benchmarks.prompt_cache [papers]
+"""
+
+import sys
+
+from benchmarks.fakes import PROMPT_CACHE, install_fakes
+
+
+COUNTERS = ("llm_calls", "input_tokens", "cached_input_tokens")
+
+
+def main(papers: int = 4):
+    install_fakes(content_chars=400)
+    from src.agent import graph, metrics_handler
+
+    for drafting_mode in ("single", "parallel"):
+        PROMPT_CACHE.clear()
+        config = {
+            "configurable": {
+                "search_cache_mode": "bypass",
+                "drafting_mode": drafting_mode,
+            }
+        }
+        totals: dict[str, dict] = {}
+        for i in range(papers):
+            graph.invoke({"topic": f"prompt caching topic {i}"}, config)
+            for node, stats in metrics_handler.summary()["nodes"].items():
+                if stats["llm_calls"]:
+                    node_totals = totals.setdefault(node, dict.fromkeys(COUNTERS, 0))
+                    for key in node_totals:
+                        node_totals[key] += stats[key]
+
+        print(f"\n{drafting_mode} drafting, {papers} papers")
+        print(f"{'node':<26} {'calls':>6} {'input tokens':>13} {'cached':>9} {'cached %':>9}")
+        totals["total"] = {key: sum(stats[key] for stats in totals.values()) for key in COUNTERS}
+        for node, stats in totals.items():
+            share = stats["cached_input_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0
+            print(
+                f"{node:<26} {stats['llm_calls']:>6} {stats['input_tokens']:>13} "
+                f"{stats['cached_input_tokens']:>9} {share:>9.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
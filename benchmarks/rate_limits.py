@@ -0,0 +1,332 @@
+"""Exercise the call scheduler against a local server that throttles and stalls.
+
+The server speaks just enough of the Tavily search and OpenAI chat completions
+APIs for the real clients: it answers 429 to requests above its per-route rate and
+makes a small share of responses slow. Two workloads run under each scheduler
+setting, from no call retries at all to rate limits, retries and hedged requests:
+
+- a burst of web searches, reporting failures and latency percentiles
+- whole papers generated concurrently through `ChatOpenAI` and the search client
+
+    python -m benchmarks.rate_limits [queries] [papers]
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from benchmarks.fakes import STRUCTURED_RESPONSES, FakeChatModel, FakeSearchClient, fake_template
+
+
+SCENARIOS = {
+    "no call retries": {"call_max_attempts": 1},
+    "retries": {"call_max_attempts": 5},
+    "rate limited + retries": {"call_max_attempts": 5, "rate_limited": True},
+    "rate limited + hedged": {"call_max_attempts": 5, "rate_limited": True, "hedge_requests": True},
+}
+
+TAIL_SCENARIOS = {
+    "retries": {"call_max_attempts": 5},
+    "hedged": {"call_max_attempts": 5, "hedge_requests": True},
+}
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    """Fake search and chat API allowing `rps` requests per second on each route.
+
+    A `slow_rate` share of the responses takes `slow_seconds`, the rest `delay`. With
+    `retry_after`, 429 responses carry a Retry-After header of that many seconds.
+    Every request's arrival time is kept per route in `arrivals`.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        rps: dict[str, int],
+        delay: float = 0.02,
+        slow_rate: float = 0.04,
+        slow_seconds: float = 1.0,
+        retry_after: float | None = None,
+    ):
+        super().__init__(("127.0.0.1", 0), ThrottlingHandler)
+        self.rps = rps
+        self.delay = delay
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.retry_after = retry_after
+        self.random = random.Random(0)
+        self.requests = Counter()
+        self.throttled = Counter()
+        self.arrivals = defaultdict(list)
+        self._recent = {route: deque() for route in rps}
+        self._lock = threading.Lock()
+        self.search = FakeSearchClient()
+        self.model = FakeChatModel()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self, route: str) -> bool:
+        """Count the request and decide whether it is within the route's rate"""
+        now = time.monotonic()
+        with self._lock:
+            self.requests[route] += 1
+            self.arrivals[route].append(now)
+            recent = self._recent[route]
+            while recent and recent[0] <= now - 1.0:
+                recent.popleft()
+            if len(recent) >= self.rps[route]:
+                self.throttled[route] += 1
+                return False
+            recent.append(now)
+            return True
+
+    def stall(self) -> None:
+        slow = self.random.random() < self.slow_rate
+        time.sleep(self.slow_seconds if slow else self.delay)
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(
+        self, status: int, body: bytes, content_type: str = "application/json", headers: dict | None = None
+    ) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on a slow response, e.g. the loser of a hedged request
+            self.close_connection = True
+
+    def do_POST(self) -> None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not raw:
+            # The client hung up before sending its request
+            self.close_connection = True
+            return
+        body = json.loads(raw)
+        route = "search" if self.path == "/search" else "chat"
+        if not self.server.admit(route):
+            headers = {"Retry-After": str(self.server.retry_after)} if self.server.retry_after is not None else None
+            self._send(429, b'{"error": {"message": "rate limited", "type": "rate_limit_exceeded"}}', headers=headers)
+            return
+        self.server.stall()
+        if route == "search":
+            response = self.server.search._response(
+                body["query"], body.get("max_results"), body.get("include_raw_content", False)
+            )
+            self._send(200, json.dumps(response).encode())
+        else:
+            self._chat(body)
+
+    def _chat(self, body: dict) -> None:
+        model = self.server.model
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            respond = STRUCTURED_RESPONSES[response_format["json_schema"]["name"]]
+            content = respond(body["messages"], model).model_dump_json()
+        else:
+            content = "".join(model._tokens())
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body["messages"]) // 4
+        completion_tokens = len(model._tokens(content))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {"id": "chatcmpl-local", "created": int(time.time()), "model": body["model"]}
+        if not body.get("stream"):
+            choice = {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            self._send(200, json.dumps({**base, "object": "chat.completion", "choices": [choice], "usage": usage}).encode())
+            return
+
+        chunk = {**base, "object": "chat.completion.chunk"}
+        events = [
+            {**chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": None}]},
+            {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+            {**chunk, "choices": [], "usage": usage},
+        ]
+        stream = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        self._send(200, stream.encode(), "text/event-stream")
+
+
+class HTTPSearchClient:
+    """Tavily-style search client for the local server"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = httpx.Client()
+
+    def search(self, query, max_results=5, topic="general", timeout=30.0, include_raw_content=False, **kwargs):
+        body = {"query": query, "max_results": max_results, "topic": topic, "include_raw_content": include_raw_content}
+        response = self.client.post(f"{self.url}/search", json=body, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class AsyncHTTPSearchClient(HTTPSearchClient):
+    def __init__(self, url: str):
+        self.url = url
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=200))
+
+    async def search(self, query, max_results=5, topic="general", timeout=30.0, include_raw_content=False, **kwargs):
+        body = {"query": query, "max_results": max_results, "topic": topic, "include_raw_content": include_raw_content}
+        response = await self.client.post(f"{self.url}/search", json=body, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def install_server_clients(server: ThrottlingServer) -> None:
+    """Point the client registry at the local server, with the SDK's own retries turned off"""
+    install_url_clients(server.url)
+
+
+def install_url_clients(url: str) -> None:
+    """`install_server_clients` for the server at `url`, e.g. as the initializer of pool workers"""
+    from langchain_openai import ChatOpenAI
+
+    from src.clients import configure_clients
+
+    configure_clients(
+        model_factory=lambda model, **kwargs: ChatOpenAI(
+            model=model.split(":", 1)[1], base_url=f"{url}/v1", api_key="local", max_retries=0
+        ),
+        search_client_factory=lambda: HTTPSearchClient(url),
+        async_search_client_factory=lambda: AsyncHTTPSearchClient(url),
+    )
+
+
+def apply_scenario(scenario: dict, server: ThrottlingServer) -> dict:
+    """Set the process-wide rate limits of `scenario` and return its Configuration overrides"""
+    from src.scheduler import SCHEDULER, set_rate_limits
+
+    SCHEDULER.reset()
+    if scenario.get("rate_limited"):
+        # Stay a little under the server's limits
+        set_rate_limits({
+            "openai": {"requests_per_second": server.rps["chat"] * 0.9},
+            "tavily": {"requests_per_second": server.rps["search"] * 0.9},
+        })
+    server.requests.clear()
+    server.throttled.clear()
+    server.arrivals.clear()
+    return {key: value for key, value in scenario.items() if key != "rate_limited"}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def search_burst(num_queries: int, concurrency: int, overrides: dict) -> tuple[list[tuple[dict, float]], float]:
+    from src.nodes.research_agent.nodes.web_research import _asearch
+    from src.search_backends import TavilyBackend
+
+    backend = TavilyBackend(overrides["call_max_attempts"], overrides.get("hedge_requests", False))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(query: str):
+        async with semaphore:
+            return await _asearch(backend, query, 5, "general", 10.0)
+
+    start = time.perf_counter()
+    fetched = await asyncio.gather(*(one(f"burst query {i}") for i in range(num_queries)))
+    return fetched, time.perf_counter() - start
+
+
+async def papers(num_papers: int, overrides: dict) -> tuple[int, int, float]:
+    from src.agent import graph
+
+    config = {
+        "configurable": {
+            "search_cache_mode": "bypass",
+            "document_template": fake_template(6),
+            "query_model": "openai:gpt-4.1-nano",
+            "planner_model": "openai:gpt-4.1-nano",
+            "drafting_model": "openai:gpt-4.1-nano",
+            **overrides,
+        }
+    }
+
+    async def one(i: int):
+        try:
+            output = await graph.ainvoke({"topic": f"throttling {i}"}, config)
+        except Exception as e:
+            print(f"  paper {i} failed: {type(e).__name__}: {e}")
+            return None
+        return output["run_stats"].get("search_errors", 0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(num_papers)))
+    succeeded = [errors for errors in results if errors is not None]
+    return len(succeeded), sum(succeeded), time.perf_counter() - start
+
+
+async def print_bursts(server: ThrottlingServer, scenarios: dict, num_queries: int, in_flight: int) -> None:
+    print(f"{'scenario':<24} {'failed':>7} {'429s':>6} {'requests':>9} {'seconds':>8} {'p50':>6} {'p95':>6} {'p99':>6}")
+    for name, scenario in scenarios.items():
+        overrides = apply_scenario(scenario, server)
+        fetched, seconds = await search_burst(num_queries, in_flight, overrides)
+        latencies = [elapsed for response, elapsed in fetched if response]
+        failed = sum(1 for response, _ in fetched if not response)
+        print(
+            f"{name:<24} {failed:>7} {server.throttled['search']:>6} {server.requests['search']:>9} {seconds:>8.2f} "
+            f"{percentile(latencies, 0.5):>6.3f} {percentile(latencies, 0.95):>6.3f} {percentile(latencies, 0.99):>6.3f}"
+        )
+
+
+async def amain(num_queries: int, num_papers: int):
+    # Everything runs on one event loop, since the async clients are bound to the loop they start on
+    server = ThrottlingServer(rps={"search": 100, "chat": 20})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    install_server_clients(server)
+    # Every failed search is logged; the tables count them instead
+    logging.getLogger("src.nodes.research_agent.nodes.web_research").setLevel(logging.ERROR)
+
+    print(f"search burst: {num_queries} queries, 32 in flight, server allows {server.rps['search']}/s")
+    await print_bursts(server, SCENARIOS, num_queries, 32)
+
+    print(f"\nslow responses only: {num_queries} queries, 8 in flight, {server.slow_rate:.0%} take {server.slow_seconds}s")
+    server.rps["search"] = 10_000
+    await print_bursts(server, TAIL_SCENARIOS, num_queries, 8)
+    server.rps["search"] = 100
+
+    print(f"\npapers: {num_papers} at once, server allows {server.rps['chat']} chat and {server.rps['search']} search calls/s")
+    print(f"{'scenario':<24} {'papers':>7} {'search errors':>14} {'chat 429s':>10} {'search 429s':>12} {'seconds':>8}")
+    for name, scenario in SCENARIOS.items():
+        overrides = apply_scenario(scenario, server)
+        succeeded, search_errors, seconds = await papers(num_papers, overrides)
+        print(
+            f"{name:<24} {succeeded:>3}/{num_papers:<3} {search_errors:>14} {server.throttled['chat']:>10} "
+            f"{server.throttled['search']:>12} {seconds:>8.2f}"
+        )
+    server.shutdown()
+
+
+def main(num_queries: int = 400, num_papers: int = 8):
+    asyncio.run(amain(num_queries, num_papers))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,125 @@
+"""Measure the local corpus and the tiered search backend with the fake search client.
+
+Fills a search cache with fake responses, builds the corpus from it and reports
+the index build time and size, then the query latency of the corpus against the
+(simulated) web and the local hit rate of tiered search for repeated and new
+queries. Finally runs the graph on the web, then tiered and fully offline from
+the corpus the first run left behind:
+
+    python -m benchmarks.search_backends [cached queries] [web delay]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeSearchClient, fake_template, install_fakes
+from src.cache import SQLiteCache
+from src.corpus import CORPUS_FILE, LocalCorpus, ingest_search_cache
+from src.nodes.research_agent.nodes.web_research import search_cache_key
+from src.search_backends import LocalCorpusBackend, TavilyBackend, TieredBackend
+
+
+SUBJECTS = ["solar storage", "urban heat", "soil carbon", "river flooding", "wildfire smoke", "coastal erosion"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def cached_queries(num_queries: int) -> list[str]:
+    return [f"{SUBJECTS[i % len(SUBJECTS)]} evidence {i // len(SUBJECTS)}" for i in range(num_queries)]
+
+
+def build(cache_dir: str, num_queries: int, raw_content_chars: int) -> LocalCorpus:
+    client = FakeSearchClient(raw_content_chars=raw_content_chars)
+    cache_path = os.path.join(cache_dir, "search.sqlite")
+    cache = SQLiteCache(cache_path, ttl_seconds=3600, max_entries=num_queries)
+    for query in cached_queries(num_queries):
+        cache.set(search_cache_key(query, 5, "general", True), client.search(query, 5, include_raw_content=True))
+
+    corpus = LocalCorpus(os.path.join(cache_dir, CORPUS_FILE))
+    start = time.perf_counter()
+    responses, added = ingest_search_cache(corpus, cache_path)
+    seconds = time.perf_counter() - start
+    megabytes = os.path.getsize(corpus.path) / 1e6
+    print(
+        f"build: {responses} cached responses, {added} documents ({raw_content_chars} chars of raw content each) "
+        f"in {seconds:.2f}s = {added / seconds:.0f} docs/s; corpus file {megabytes:.1f} MB"
+    )
+    return corpus
+
+
+def query_latency(corpus: LocalCorpus, num_queries: int) -> None:
+    web = TavilyBackend()
+    backends = {
+        "local": LocalCorpusBackend(corpus),
+        "web": web,
+        "tiered": TieredBackend(corpus, web, min_score=0.8),
+    }
+    # Every new query is about a subject of its own, so the corpus cannot answer it
+    workloads = {
+        "repeated": cached_queries(num_queries)[:100],
+        "new": [f"ocean acidification site{i} trial" for i in range(50)],
+        "mixed": cached_queries(num_queries)[100:150] + [f"glacier retreat site{i} survey" for i in range(50)],
+    }
+
+    print(f"\n{'backend':<8} {'queries':<9} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} {'local hits':>11}")
+    for name, backend in backends.items():
+        for workload, queries in workloads.items():
+            if name == "web" and workload != "new":
+                continue
+            latencies, hits = [], 0
+            for query in queries:
+                start = time.perf_counter()
+                response = backend.search(query, 5, "general", 10.0)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += response.get("source") == "local"
+            hit_rate = f"{hits / len(queries):.0%}" if name == "tiered" else "-"
+            print(
+                f"{name:<8} {workload:<9} {len(queries):>4} {percentile(latencies, 0.5):>8.1f} "
+                f"{percentile(latencies, 0.95):>8.1f} {hit_rate:>11}"
+            )
+    # The new queries were added to the corpus by the tiered backend; asking again hits locally
+    again = sum(backends["tiered"].search(q, 5, "general", 10.0)["source"] == "local" for q in workloads["new"])
+    print(f"tiered, new queries asked again: {again / len(workloads['new']):.0%} local hits")
+
+
+def graph_runs(cache_dir: str) -> None:
+    from src.agent import graph
+
+    base = {"cache_dir": cache_dir, "search_cache_mode": "bypass"}
+    runs = [
+        ("web", {"search_backend": "tavily", "search_cache_mode": "use"}, 8),
+        ("tiered, same paper", {"search_backend": "tiered"}, 8),
+        ("tiered, longer paper", {"search_backend": "tiered"}, 16),
+        ("local, offline", {"search_backend": "local"}, 8),
+    ]
+    print(f"\n{'run':<22} {'seconds':>8} {'searches':>9} {'local hits':>11} {'web':>5} {'errors':>7}")
+    for name, overrides, sections in runs:
+        if name == "tiered, same paper":
+            # Build the corpus from what the web run cached
+            ingest_search_cache(LocalCorpus(os.path.join(cache_dir, CORPUS_FILE)), os.path.join(cache_dir, "search.sqlite"))
+        config = {"configurable": {**base, **overrides, "document_template": fake_template(sections)}}
+        start = time.perf_counter()
+        stats = graph.invoke({"topic": "search backends"}, config)["run_stats"]
+        seconds = time.perf_counter() - start
+        print(
+            f"{name:<22} {seconds:>8.2f} {stats.get('search_calls', 0):>9} {stats.get('search_local_hits', '-'):>11} "
+            f"{stats.get('search_web_fallbacks', '-'):>5} {stats.get('search_errors', 0):>7}"
+        )
+
+
+def main(num_queries: int = 1200, web_delay: float = 0.2):
+    install_fakes(search_delay=web_delay)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        corpus = build(cache_dir, num_queries, raw_content_chars=5_000)
+        query_latency(corpus, num_queries)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        graph_runs(cache_dir)
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:])))
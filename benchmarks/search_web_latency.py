@@ -0,0 +1,60 @@
+"""Compare search_web latency against the old sequential loop using a fake client.
+
+Run from the repository root:
+
+    python -m benchmarks.search_web_latency
+"""
+
+import time
+
+from benchmarks.fakes import FakeSearchClient
+from src.clients import configure_clients, get_search_client
+from src.nodes.research_agent.nodes import web_research
+from src.schema import Section
+
+
+def sequential_search(queries: list[str]) -> list[dict]:
+    """The previous implementation: one query at a time"""
+    return [get_search_client().search(q, max_results=5, topic="general") for q in queries]
+
+
+def main(delay: float = 0.2, num_queries: int = 8, max_concurrency: int = 4):
+    queries = [f"query {i}" for i in range(num_queries)]
+    search_client = FakeSearchClient(delay=delay, fail_on={queries[-1]})
+    configure_clients(search_client_factory=lambda: search_client)
+    section = Section(
+        title="Analysis",
+        description="Benchmark section",
+        require_research=True,
+        search_queries=[],
+        search_results=[],
+        section_context="",
+    )
+    config = {
+        "configurable": {
+            "search_max_concurrency": max_concurrency,
+            "search_cache_mode": "bypass",
+        }
+    }
+
+    start = time.perf_counter()
+    try:
+        sequential_search(queries)
+    except RuntimeError:
+        pass  # the sequential loop loses the whole section on one failure
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output = web_research.search_web(
+        {"section": section, "search_queries": queries}, config
+    )
+    concurrent = time.perf_counter() - start
+
+    print(f"queries={num_queries} delay={delay:.2f}s max_concurrency={max_concurrency}")
+    print(f"sequential: {sequential:.2f}s")
+    print(f"concurrent: {concurrent:.2f}s ({sequential / concurrent:.1f}x faster)")
+    print(f"results kept with one failed query: {len(output['search_results'])}")
+
+
+if __name__ == "__main__":
+    main()
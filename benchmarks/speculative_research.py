@@ -0,0 +1,62 @@
+"""Compare sequential and speculative research on the time to a finished paper.
+
+The planner's model call is given a longer latency than the other calls, as a
+structured call describing every section usually is. Speculative research runs
+query generation and search for the template's sections during that call. A last
+run keeps only sections whose queries are nearly all in the planner's
+descriptions, to show what discarded speculation costs:
+
+    python -m benchmarks.speculative_research [runs] [planner_delay]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from benchmarks.fakes import install_fakes
+
+
+# The planner gets a model of its own, so its latency can be set apart from the query model's
+PLANNER_MODEL = "openai:gpt-4.1"
+
+
+def run(graph, runs: int, configurable: dict) -> tuple[float, dict]:
+    config = {
+        "configurable": {"search_cache_mode": "bypass", "planner_model": PLANNER_MODEL, **configurable}
+    }
+    seconds, stats = [], {}
+    for i in range(runs):
+        start = time.perf_counter()
+        output = asyncio.run(graph.ainvoke({"topic": f"speculative research {i}"}, config))
+        seconds.append(time.perf_counter() - start)
+        stats = output["run_stats"]
+    return statistics.median(seconds), stats
+
+
+def main(runs: int = 5, planner_delay: float = 1.0, llm_delay: float = 0.3, search_delay: float = 0.2):
+    install_fakes(
+        llm_delay=llm_delay,
+        search_delay=search_delay,
+        model_profiles={PLANNER_MODEL: {"delay": planner_delay}},
+    )
+    from src.agent import graph
+
+    print(f"planner {planner_delay:.1f}s, other calls {llm_delay:.1f}s, search {search_delay:.1f}s, median of {runs} runs")
+    print(f"{'research':<24} {'seconds':>8} {'kept':>5} {'discarded':>10} {'saved s':>8} {'wasted s':>9}")
+    for name, configurable in (
+        ("sequential", {}),
+        ("speculative", {"speculative_research": True}),
+        ("speculative, strict", {"speculative_research": True, "speculative_match_threshold": 0.9}),
+    ):
+        elapsed, stats = run(graph, runs, configurable)
+        print(
+            f"{name:<24} {elapsed:>8.2f} {stats.get('speculative_sections_kept', 0):>5}"
+            f" {stats.get('speculative_sections_discarded', 0):>10}"
+            f" {stats.get('speculative_seconds_saved', 0.0):>8.2f}"
+            f" {stats.get('speculative_min_seconds_wasted', 0.0):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:])))
@@ -0,0 +1,76 @@
+"""Measure checkpoint size and peak memory of a run with and without blob store references.
+
+Compiles the graph with an in-memory checkpointer, runs a paper with the fakes and
+sums the serialized size of every checkpoint the run wrote (subgraph checkpoints
+included) plus the size of the final one.
+
+    python -m benchmarks.state_size [num_sections]
+"""
+
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from benchmarks.fakes import fake_template, install_fakes
+
+
+def measure(num_sections: int, state_blob_refs: bool, cache_dir: str) -> dict:
+    from src.agent import graph_builder
+
+    install_fakes(queries_per_section=6, content_chars=1500)
+    checkpointer = InMemorySaver()
+    graph = graph_builder.compile(checkpointer=checkpointer)
+    config = {
+        "configurable": {
+            "thread_id": f"state-size-{state_blob_refs}",
+            "search_cache_mode": "bypass",
+            "search_max_results": 8,
+            "state_blob_refs": state_blob_refs,
+            "document_template": fake_template(num_sections),
+            "cache_dir": cache_dir,
+        }
+    }
+
+    tracemalloc.start()
+    try:
+        graph.invoke({"topic": "state size"}, config)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    serde = JsonPlusSerializer()
+    sizes = [
+        len(serde.dumps_typed(snapshot.checkpoint)[1])
+        for snapshot in checkpointer.list(None)
+    ]
+    final = graph.get_state(config).values
+    return {
+        "checkpoints": len(sizes),
+        "checkpoint_bytes": sum(sizes),
+        "final_state_bytes": len(serde.dumps_typed(final)[1]),
+        "peak_bytes": peak,
+    }
+
+
+def main(num_sections: int = 12):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        print(f"{num_sections}-section paper")
+        print(f"{'state':<14} {'checkpoints':>11} {'total bytes':>12} {'final bytes':>12} {'peak memory':>12}")
+        for state_blob_refs in (False, True):
+            result = measure(num_sections, state_blob_refs, cache_dir)
+            label = "blob refs" if state_blob_refs else "inline"
+            print(
+                f"{label:<14} {result['checkpoints']:>11} {result['checkpoint_bytes']:>12,}"
+                f" {result['final_state_bytes']:>12,} {result['peak_bytes'] / 1e6:>10.1f}MB"
+            )
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
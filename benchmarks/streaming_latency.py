@@ -0,0 +1,64 @@
+"""Measure time to outline, first researched section and first report token when streaming.
+
+Section progress events are emitted inside the research_agent subgraph, so the
+graph is streamed with subgraphs=True.
+
+    python -m benchmarks.streaming_latency
+"""
+
+import asyncio
+import time
+
+from benchmarks.fakes import install_fakes
+
+CONFIG = {"configurable": {"search_cache_mode": "bypass"}}
+
+
+def record(marks: dict, name: str, start: float) -> None:
+    marks.setdefault(name, time.perf_counter() - start)
+
+
+def handle(marks: dict, mode: str, payload, start: float) -> None:
+    if mode == "custom":
+        record(marks, f"first {payload['event']}", start)
+    elif mode == "messages":
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") == "generate_report" and chunk.content:
+            record(marks, "first report token", start)
+
+
+def stream_sync(graph) -> dict:
+    marks = {}
+    start = time.perf_counter()
+    for _namespace, mode, payload in graph.stream(
+        {"topic": "streaming"}, CONFIG, stream_mode=["custom", "messages"], subgraphs=True
+    ):
+        handle(marks, mode, payload, start)
+    marks["complete"] = time.perf_counter() - start
+    return marks
+
+
+async def stream_async(graph) -> dict:
+    marks = {}
+    start = time.perf_counter()
+    async for _namespace, mode, payload in graph.astream(
+        {"topic": "streaming"}, CONFIG, stream_mode=["custom", "messages"], subgraphs=True
+    ):
+        handle(marks, mode, payload, start)
+    marks["complete"] = time.perf_counter() - start
+    return marks
+
+
+def main(llm_delay: float = 0.2, search_delay: float = 0.1, token_delay: float = 0.005):
+    install_fakes(llm_delay=llm_delay, search_delay=search_delay, token_delay=token_delay)
+    from src.agent import graph
+
+    print(f"llm_delay={llm_delay}s search_delay={search_delay}s token_delay={token_delay}s")
+    for name, marks in (("sync", stream_sync(graph)), ("async", asyncio.run(stream_async(graph)))):
+        print(name)
+        for mark, elapsed in sorted(marks.items(), key=lambda item: item[1]):
+            print(f"  {mark:<28} {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
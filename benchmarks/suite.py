@@ -0,0 +1,204 @@
+"""Offline benchmark suite for the research paper graph.
+
+Runs the real `graph` from src/agent.py against the deterministic fakes in
+benchmarks/fakes.py and reports end-to-end latency percentiles, per-node time,
+throughput at several concurrency levels and peak memory. Results are written to
+benchmarks/results/ so runs on different commits can be compared:
+
+    python -m benchmarks.suite --runs 20 --concurrency 1 8 32
+    python -m benchmarks.suite --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.fakes import fake_template, install_fakes
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "mean": statistics.fmean(values),
+    }
+
+
+async def timed_run(graph, topic: str, config: dict) -> tuple[float, int]:
+    start = time.perf_counter()
+    output = await graph.ainvoke({"topic": topic}, config)
+    return time.perf_counter() - start, len(output.get("final_report", ""))
+
+
+async def measure_latency(graph, runs: int, config: dict) -> dict:
+    from src.agent import metrics_handler
+
+    latencies, report_sizes = [], []
+    node_seconds: dict[str, list[float]] = {}
+    for i in range(runs):
+        elapsed, report_size = await timed_run(graph, f"latency topic {i}", config)
+        latencies.append(elapsed)
+        report_sizes.append(report_size)
+        # Node time per run, summed over the parallel branches of a node
+        for node, stats in metrics_handler.summary()["nodes"].items():
+            node_seconds.setdefault(node, []).append(stats["seconds"])
+
+    return {
+        "end_to_end": summarize(latencies),
+        "nodes": {node: summarize(values) for node, values in sorted(node_seconds.items())},
+        "report_chars": statistics.fmean(report_sizes),
+    }
+
+
+async def measure_throughput(graph, concurrency: int, config: dict) -> dict:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(timed_run(graph, f"throughput topic {i}", config) for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "seconds": elapsed, "papers_per_second": concurrency / elapsed}
+
+
+async def measure_memory(graph, config: dict) -> dict:
+    tracemalloc.start()
+    try:
+        await timed_run(graph, "memory topic", config)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": peak}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """Print the relative change of the headline metrics against a saved result"""
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\ncompared to {baseline.get('commit')} ({baseline.get('timestamp')})")
+    for q in ("p50", "p90", "p99"):
+        new = current["latency"]["end_to_end"][q]
+        old = baseline["latency"]["end_to_end"][q]
+        print(f"  end-to-end {q}: {new:.3f}s vs {old:.3f}s ({delta(new, old)})")
+    old_throughput = {t["concurrency"]: t for t in baseline.get("throughput", [])}
+    for t in current["throughput"]:
+        if t["concurrency"] in old_throughput:
+            new, old = t["papers_per_second"], old_throughput[t["concurrency"]]["papers_per_second"]
+            print(f"  throughput @{t['concurrency']}: {new:.1f}/s vs {old:.1f}/s ({delta(new, old)})")
+    new, old = current["memory"]["peak_bytes"], baseline["memory"]["peak_bytes"]
+    print(f"  peak memory: {new / 1e6:.1f}MB vs {old / 1e6:.1f}MB ({delta(new, old)})")
+
+
+def report(result: dict) -> None:
+    latency = result["latency"]
+    e2e = latency["end_to_end"]
+    print(f"end-to-end latency: p50 {e2e['p50']:.3f}s  p90 {e2e['p90']:.3f}s  p99 {e2e['p99']:.3f}s")
+    print("per-node time per run, summed over branches (p50 / p90):")
+    for node, stats in latency["nodes"].items():
+        print(f"  {node:<26} {stats['p50']:.3f}s / {stats['p90']:.3f}s")
+    print("throughput:")
+    for t in result["throughput"]:
+        print(f"  {t['concurrency']:>4} concurrent topics: {t['papers_per_second']:.1f} papers/s")
+    print(f"peak memory (single run): {result['memory']['peak_bytes'] / 1e6:.1f}MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="sequential runs for latency percentiles")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--search-delay", type=float, default=0.05)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--queries-per-section", type=int, default=4)
+    parser.add_argument("--content-chars", type=int, default=400)
+    parser.add_argument("--report-chars", type=int, default=2000)
+    parser.add_argument(
+        "--config", type=json.loads, default={}, help="JSON object of Configuration overrides"
+    )
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    fakes = {
+        "llm_delay": args.llm_delay,
+        "token_delay": args.token_delay,
+        "search_delay": args.search_delay,
+        "queries_per_section": args.queries_per_section,
+        "content_chars": args.content_chars,
+        "report_chars": args.report_chars,
+    }
+    install_fakes(**fakes)
+    fakes["sections"] = args.sections
+    from src.agent import graph
+
+    # Caches would turn every run after the first into a no-op
+    config = {
+        "configurable": {
+            "search_cache_mode": "bypass",
+            "planner_cache": False,
+            "document_template": fake_template(args.sections),
+            **args.config,
+        }
+    }
+
+    async def run_all() -> dict:
+        return {
+            "latency": await measure_latency(graph, args.runs, config),
+            "throughput": [await measure_throughput(graph, n, config) for n in args.concurrency],
+            "memory": await measure_memory(graph, config),
+        }
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fakes": fakes,
+        "config": config["configurable"],
+        **asyncio.run(run_all()),
+    }
+    report(result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{result['commit'] or 'nocommit'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nsaved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+    return result
+
+
+if __name__ == "__main__":
+    main()
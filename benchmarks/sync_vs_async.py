@@ -0,0 +1,71 @@
+"""Compare concurrent graph runs per process on the sync and async paths.
+
+Model and search calls are replaced by fakes that wait for a fixed delay, so the
+numbers reflect how each path waits on I/O rather than provider speed.
+
+    python -m benchmarks.sync_vs_async
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import install_fakes
+
+CONFIG = {"configurable": {"search_cache_mode": "bypass"}}
+
+
+class ThreadCounter:
+    """Samples the number of live threads in the background and keeps the peak"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_sync(graph, runs: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda i: graph.invoke({"topic": f"topic {i}"}, CONFIG), range(runs)))
+    return time.perf_counter() - start
+
+
+async def run_async(graph, runs: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(graph.ainvoke({"topic": f"topic {i}"}, CONFIG) for i in range(runs)))
+    return time.perf_counter() - start
+
+
+def main(llm_delay: float = 0.1, search_delay: float = 0.1, workers: int = 16):
+    install_fakes(llm_delay=llm_delay, search_delay=search_delay)
+    from src.agent import graph
+
+    print(f"llm_delay={llm_delay}s search_delay={search_delay}s sync worker threads={workers}")
+    print(f"{'runs':>5} {'sync s':>8} {'sync runs/s':>12} {'threads':>8} {'async s':>8} {'async runs/s':>13} {'threads':>8}")
+    for runs in (1, 8, 32, 64):
+        with ThreadCounter() as sync_threads:
+            sync_elapsed = run_sync(graph, runs, workers)
+        with ThreadCounter() as async_threads:
+            async_elapsed = asyncio.run(run_async(graph, runs))
+        print(
+            f"{runs:>5} {sync_elapsed:>8.2f} {runs / sync_elapsed:>12.1f} {sync_threads.peak:>8}"
+            f" {async_elapsed:>8.2f} {runs / async_elapsed:>13.1f} {async_threads.peak:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Papers per minute of the multi-process worker pool at several worker counts.
+
+Runs the same batch of topics through `run_pool` with 1, 2, 4 and 8 workers, each
+worker installing the fakes. Model and search latency are short and the payloads
+large, so a run is bound by the graph's own CPU work, which is what extra processes
+add capacity for. Scaling stops at the number of cores:
+
+    python -m benchmarks.worker_pool --topics 48 --workers 1 2 4 8
+"""
+
+import argparse
+import functools
+import os
+import tempfile
+
+from benchmarks.fakes import fake_template, install_fakes
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=48)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=4, help="topics at once per worker")
+    parser.add_argument("--llm-delay", type=float, default=0.02)
+    parser.add_argument("--search-delay", type=float, default=0.02)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--content-chars", type=int, default=2000)
+    parser.add_argument("--report-chars", type=int, default=8000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> list[dict]:
+    from src.pool import run_pool
+
+    args = parse_args(argv)
+    initializer = functools.partial(
+        install_fakes,
+        llm_delay=args.llm_delay,
+        search_delay=args.search_delay,
+        content_chars=args.content_chars,
+        report_chars=args.report_chars,
+    )
+    print(f"{os.cpu_count()} cores, {args.topics} topics, {args.concurrency} topics at once per worker")
+    print(f"{'workers':>7} {'seconds':>8} {'startup':>8} {'papers/min':>11} {'speedup':>8}")
+
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {
+            "configurable": {
+                "cache_dir": tmp,
+                "search_cache_mode": "bypass",
+                "document_template": fake_template(args.sections),
+            }
+        }
+        for workers in args.workers:
+            topics = [{"id": f"{workers}-{i}", "topic": f"scaling topic {i}", "config": {}} for i in range(args.topics)]
+            report = run_pool(
+                topics,
+                os.path.join(tmp, f"papers-{workers}.jsonl"),
+                workers=workers,
+                concurrency=args.concurrency,
+                config=config,
+                initializer=initializer,
+            )
+            reports.append(report)
+            speedup = report["papers_per_minute"] / reports[0]["papers_per_minute"]
+            print(
+                f"{workers:>7} {report['seconds']:>8.1f} {report['startup_seconds']:>8.1f} "
+                f"{report['papers_per_minute']:>11.1f} {speedup:>7.2f}x"
+            )
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,95 @@
+import os
+import sqlite3
+from contextlib import asynccontextmanager, closing, contextmanager
+
 from langgraph.graph import StateGraph, START, END
 
 from src.state import AgentState, InputState, OutputState
-from src.nodes.generate_sections import generate_sections
+from src.nodes.generate_sections import agenerate_sections, generate_sections
 from src.configuration import Configuration
-from src.nodes.generate_report import generate_report
+from src.durable import DEFAULT_CHECKPOINT_PATH, RETRY_POLICY, checkpoint_serde
+from src.nodes.generate_report import agenerate_report, generate_report
+from src.nodes.compact_context import compact_context
+from src.nodes.write_section import (
+    awrite_dependent_section,
+    awrite_section,
+    stitch_report,
+    write_dependent_section,
+    write_section,
+)
+from src.metrics import MetricsCallbackHandler
+from src.profiling import ProfilingCallbackHandler
+from src.schema import get_field
+
+from src.nodes.plan_searches import (
+    agenerate_section_queries,
+    aplan_searches,
+    generate_section_queries,
+    plan_searches,
+)
 
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.types import Send
 from src.nodes.research_agent.research_agent import research_agent
 
 
-def assign_to_section_writer(state: AgentState):
+def assign_to_section_writer(state: AgentState, config: RunnableConfig):
+    # Sections already researched speculatively while the planner ran are skipped
+    researched = {get_field(s, "title", "") for s in state.get("researched_sections", [])}
     research_sections = [
-        s for s in state["sections"] if getattr(s, "require_research", True)
+        s
+        for s in state["sections"]
+        if get_field(s, "require_research", True) and get_field(s, "title", "") not in researched
     ]
+    if not research_sections:
+        return "compact_context"
+
+    # With query deduplication, sections only generate queries and the searches are planned together
+    if Configuration.from_runnable_config(config).query_dedup:
+        return [Send("generate_section_queries", {"section": s}) for s in research_sections]
 
     # Send research sections to research agents
     return [Send("research_agent", {"section": s}) for s in research_sections]
 
 
+def assign_to_drafting(state: AgentState, config: RunnableConfig):
+    # The single-call mode writes the whole paper in generate_report
+    if Configuration.from_runnable_config(config).drafting_mode == "single":
+        return "generate_report"
+
+    section_contexts = state.get("section_contexts") or {}
+    sends = [
+        Send(
+            "write_section",
+            {
+                "topic": state["topic"],
+                "section": s,
+                "section_context": section_contexts.get(
+                    get_field(s, "title", ""), get_field(s, "section_context", "")
+                ),
+            },
+        )
+        for s in state.get("researched_sections", [])
+    ]
+    return sends or "collect_drafts"
+
+
+def assign_to_dependent_writer(state: AgentState):
+    dependent_sections = [
+        s for s in state["sections"] if not get_field(s, "require_research", True)
+    ]
+
+    # Dependent sections are written in parallel from the researched drafts
+    sends = [
+        Send(
+            "write_dependent_section",
+            {"topic": state["topic"], "section": s, "drafts": state.get("section_drafts", [])},
+        )
+        for s in dependent_sections
+    ]
+    return sends or "stitch_report"
+
+
 graph_builder = StateGraph(
     AgentState,
     input_schema=InputState,
@@ -26,32 +98,105 @@ graph_builder = StateGraph(
 )
 
 
-graph_builder.add_node("generate_sections", generate_sections)
+# Nodes carry both a sync and an async implementation so that graph.invoke and
+# graph.ainvoke / graph.astream each run without blocking on the other's I/O style
+graph_builder.add_node(
+    "generate_sections",
+    RunnableLambda(generate_sections, afunc=agenerate_sections),
+    retry_policy=RETRY_POLICY,
+)
 graph_builder.add_node("research_agent", research_agent)
-graph_builder.add_node("generate_report", generate_report)
+graph_builder.add_node(
+    "generate_section_queries",
+    RunnableLambda(generate_section_queries, afunc=agenerate_section_queries),
+    retry_policy=RETRY_POLICY,
+)
+graph_builder.add_node("plan_searches", RunnableLambda(plan_searches, afunc=aplan_searches))
+graph_builder.add_node("compact_context", compact_context)
+graph_builder.add_node(
+    "generate_report",
+    RunnableLambda(generate_report, afunc=agenerate_report),
+    retry_policy=RETRY_POLICY,
+)
+graph_builder.add_node(
+    "write_section",
+    RunnableLambda(write_section, afunc=awrite_section),
+    retry_policy=RETRY_POLICY,
+)
+graph_builder.add_node("collect_drafts", lambda state: {})
+graph_builder.add_node(
+    "write_dependent_section",
+    RunnableLambda(write_dependent_section, afunc=awrite_dependent_section),
+    retry_policy=RETRY_POLICY,
+)
+graph_builder.add_node("stitch_report", stitch_report)
 
 graph_builder.add_edge(START, "generate_sections")
 graph_builder.add_conditional_edges(
-    "generate_sections", assign_to_section_writer, ["research_agent"]
+    "generate_sections",
+    assign_to_section_writer,
+    ["research_agent", "generate_section_queries", "compact_context"],
 )
 
-graph_builder.add_edge("research_agent", "generate_report")
+graph_builder.add_edge("research_agent", "compact_context")
+graph_builder.add_edge("generate_section_queries", "plan_searches")
+graph_builder.add_edge("plan_searches", "compact_context")
+graph_builder.add_conditional_edges(
+    "compact_context",
+    assign_to_drafting,
+    ["generate_report", "write_section", "collect_drafts"],
+)
 graph_builder.add_edge("generate_report", END)
 
+# Parallel drafting: researched sections, then dependent sections, then the stitch pass
+graph_builder.add_edge("write_section", "collect_drafts")
+graph_builder.add_conditional_edges(
+    "collect_drafts",
+    assign_to_dependent_writer,
+    ["write_dependent_section", "stitch_report"],
+)
+graph_builder.add_edge("write_dependent_section", "stitch_report")
+graph_builder.add_edge("stitch_report", END)
+
+
+# Every run, including the research_agent subgraph nodes, reports to the metrics handler
+metrics_handler = MetricsCallbackHandler()
+
+# Profiles the nodes of the runs that set a profile_dir, and does nothing otherwise
+profiling_handler = ProfilingCallbackHandler()
+
+
+def compile_graph(checkpointer=None):
+    """Compile the graph with the metrics and profiling handlers attached and an optional checkpointer"""
+    return graph_builder.compile(checkpointer=checkpointer).with_config(
+        callbacks=[metrics_handler, profiling_handler]
+    )
+
+
+# The graph served by langgraph.json; the server brings its own persistence
+graph = compile_graph()
+
 
-graph = graph_builder.compile()
+@contextmanager
+def durable_graph(path: str = DEFAULT_CHECKPOINT_PATH):
+    """Yield the graph compiled with a SQLite checkpointer stored at `path`.
 
-# graph_builder.add_node("generate_sections", generate_sections)
-# graph_builder.add_node("write_section", write_section)
-# graph_builder.add_node("generate_report", generate_report)
+    Runs are saved after every step under their `thread_id`, so a crashed or failed
+    run can be resumed with `run_or_resume` from src/durable.py.
+    """
+    from langgraph.checkpoint.sqlite import SqliteSaver
 
-# graph_builder.add_edge(START, "generate_sections")
-# graph_builder.add_conditional_edges(
-#     "generate_sections", assign_to_section_writer, ["write_section"]
-# )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with closing(sqlite3.connect(path, check_same_thread=False)) as conn:
+        yield compile_graph(SqliteSaver(conn, serde=checkpoint_serde()))
 
-# graph_builder.add_edge("write_section", "generate_report")
-# graph_builder.add_edge("generate_report", END)
 
+@asynccontextmanager
+async def adurable_graph(path: str = DEFAULT_CHECKPOINT_PATH):
+    """Async version of `durable_graph`, for `ainvoke` / `astream`"""
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
-# graph = graph_builder.compile()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    async with aiosqlite.connect(path) as conn:
+        yield compile_graph(AsyncSqliteSaver(conn, serde=checkpoint_serde()))
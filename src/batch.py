@@ -0,0 +1,274 @@
+"""Generate papers for many topics in one process.
+
+Reads a JSONL file with one topic per line, either a plain string or an object
+
+    {"id": "optional-unique-id", "topic": "...", "config": {<Configuration overrides>}}
+
+and runs them through the graph concurrently. All runs share the model and search
+clients, the caches and a global cap on LLM and web search calls in flight. Each
+result is appended to the output JSONL as soon as its topic finishes, so an
+interrupted batch resumes by skipping the topics already completed:
+
+    python -m src.batch topics.jsonl --output papers.jsonl --concurrency 16 \\
+        --llm-concurrency 32 --search-concurrency 64 \\
+        --rate-limits '{"openai": {"requests_per_second": 50, "tokens_per_minute": 2000000}}'
+
+With `--workers N` the topics are spread over N processes (see src/pool.py).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+from contextlib import nullcontext
+
+from src.blob_store import prune_blob_store
+from src.configuration import Configuration
+from src.durable import arun_or_resume
+from src.limits import set_concurrency_limits
+from src.scheduler import set_rate_limits
+
+
+logger = logging.getLogger(__name__)
+
+COST_COUNTERS = ("llm_calls", "input_tokens", "cached_input_tokens", "output_tokens", "search_calls")
+
+
+def load_topics(path: str) -> list[dict]:
+    """Read the topics file, giving every topic an id (its topic text unless set) and config"""
+    topics, seen = [], set()
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"topic": item}
+            if not item.get("topic"):
+                raise ValueError(f"{path}:{line_number}: missing topic")
+
+            item_id = str(item.get("id") or item["topic"])
+            if item_id in seen:
+                logger.warning("Skipping duplicate topic id %r on line %d", item_id, line_number)
+                continue
+            seen.add(item_id)
+            topics.append({"id": item_id, "topic": item["topic"], "config": item.get("config") or {}})
+    return topics
+
+
+def completed_ids(output_path: str) -> set[str]:
+    """Return the ids of the topics that already finished successfully in `output_path`"""
+    if not os.path.exists(output_path):
+        return set()
+
+    done = set()
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def _cost(summary: dict) -> dict:
+    """Sum the cost counters of a run over its nodes"""
+    totals = dict.fromkeys(COST_COUNTERS, 0)
+    for stats in summary.get("nodes", {}).values():
+        for key in COST_COUNTERS:
+            totals[key] += stats.get(key, 0)
+    return totals
+
+
+async def arun_topic(graph, metrics_handler, item: dict, config: dict, durable: bool) -> dict:
+    """Run one topic and return its result line: status, report, run_stats, time and cost"""
+    run_id = uuid.uuid4()
+    run_config = {
+        "run_id": run_id,
+        "configurable": {**config.get("configurable", {}), **item["config"]},
+    }
+
+    start = time.perf_counter()
+    try:
+        if durable:
+            run_config["configurable"]["thread_id"] = f"batch:{item['id']}"
+            output = await arun_or_resume(graph, item["topic"], run_config)
+        else:
+            output = await graph.ainvoke({"topic": item["topic"]}, run_config)
+    except Exception as e:
+        logger.warning("Topic %r failed: %s", item["id"], e)
+        result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    else:
+        result = {
+            "status": "ok",
+            "final_report": output.get("final_report", ""),
+            "run_stats": output.get("run_stats", {}),
+        }
+
+    return {
+        "id": item["id"],
+        "topic": item["topic"],
+        **result,
+        "seconds": time.perf_counter() - start,
+        "cost": _cost(metrics_handler.summary(run_id)),
+    }
+
+
+def prune_blobs(config: dict | None) -> None:
+    """Prune the blob store before a batch, so repeated batches keep it within its TTL and size"""
+    pruned = prune_blob_store(Configuration.from_runnable_config(config))
+    if pruned["blobs_removed"]:
+        logger.info("Pruned %d blobs (%d bytes) from the blob store", pruned["blobs_removed"], pruned["bytes_removed"])
+
+
+async def arun_batch(
+    topics: list[dict],
+    output_path: str,
+    concurrency: int = 8,
+    llm_concurrency: int | None = None,
+    search_concurrency: int | None = None,
+    config: dict | None = None,
+    checkpoint_path: str | None = None,
+    rate_limits: dict | None = None,
+) -> dict:
+    """Run every topic not yet completed in `output_path` and return the batch report.
+
+    At most `concurrency` topics run at once; `llm_concurrency` and
+    `search_concurrency` cap the model and search calls in flight across all of them,
+    and `rate_limits` sets the per-provider rate limits (see `set_rate_limits`).
+    `config` is the base RunnableConfig, merged with each topic's own overrides. With
+    a `checkpoint_path`, each topic is checkpointed on its own thread, so a topic
+    interrupted midway resumes from its last step instead of starting over.
+    """
+    from src.agent import adurable_graph, graph, metrics_handler
+
+    done = completed_ids(output_path)
+    pending = [item for item in topics if item["id"] not in done]
+    set_concurrency_limits(llm=llm_concurrency, search=search_concurrency)
+    set_rate_limits(rate_limits)
+    prune_blobs(config)
+
+    # Keep a summary for every run in flight so their costs can be read back
+    metrics_handler.max_runs = max(metrics_handler.max_runs, 2 * concurrency)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    write_lock = asyncio.Lock()
+    results = []
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    start = time.perf_counter()
+    graph_context = adurable_graph(checkpoint_path) if checkpoint_path else nullcontext(graph)
+    async with graph_context as run_graph:
+        with open(output_path, "a") as output:
+
+            async def run(item: dict) -> None:
+                async with semaphore:
+                    result = await arun_topic(
+                        run_graph, metrics_handler, item, config or {}, checkpoint_path is not None
+                    )
+                async with write_lock:
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+                results.append(result)
+                logger.info(
+                    "[%d/%d] %s %s in %.1fs",
+                    len(results), len(pending), result["status"], item["id"], result["seconds"],
+                )
+
+            await asyncio.gather(*(run(item) for item in pending))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    cost = dict.fromkeys(COST_COUNTERS, 0)
+    for result in results:
+        for key in COST_COUNTERS:
+            cost[key] += result["cost"][key]
+    return {
+        "topics": len(topics),
+        "skipped": len(topics) - len(pending),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "seconds": elapsed,
+        "papers_per_minute": succeeded / elapsed * 60 if elapsed else 0.0,
+        "cost": cost,
+    }
+
+
+def run_batch(topics: list[dict], output_path: str, **kwargs) -> dict:
+    """Blocking version of `arun_batch`"""
+    return asyncio.run(arun_batch(topics, output_path, **kwargs))
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['succeeded']} papers in {report['seconds']:.1f}s "
+        f"({report['papers_per_minute']:.1f} papers/min), "
+        f"{report['failed']} failed, {report['skipped']} already done"
+    )
+    cost = report["cost"]
+    print(
+        f"LLM calls: {cost['llm_calls']}  input tokens: {cost['input_tokens']} "
+        f"({cost['cached_input_tokens']} cached)  output tokens: {cost['output_tokens']}  "
+        f"search calls: {cost['search_calls']}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("topics", help="JSONL file of topics")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("--concurrency", type=int, default=8, help="topics running at once")
+    parser.add_argument("--llm-concurrency", type=int, help="LLM calls in flight across all topics")
+    parser.add_argument("--search-concurrency", type=int, help="web search calls in flight across all topics")
+    parser.add_argument(
+        "--rate-limits",
+        type=json.loads,
+        help='JSON object of per-provider rate limits, e.g. {"tavily": {"requests_per_second": 10}}',
+    )
+    parser.add_argument(
+        "--config", type=json.loads, default={}, help="JSON object of Configuration overrides for every topic"
+    )
+    parser.add_argument(
+        "--checkpoints", help="SQLite file to checkpoint every topic in, so interrupted topics resume midway"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="worker processes, each running --concurrency topics at once"
+    )
+    args = parser.parse_args(argv)
+    if args.workers > 1 and args.checkpoints:
+        parser.error("--checkpoints is not supported with --workers")
+    return args
+
+
+def main(argv=None) -> dict:
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.INFO)
+    args = parse_args(argv)
+    options = {
+        "concurrency": args.concurrency,
+        "llm_concurrency": args.llm_concurrency,
+        "search_concurrency": args.search_concurrency,
+        "config": {"configurable": args.config},
+        "rate_limits": args.rate_limits,
+    }
+    if args.workers > 1:
+        from src.pool import logger as pool_logger, run_pool
+
+        pool_logger.setLevel(logging.INFO)
+        report = run_pool(load_topics(args.topics), args.output, workers=args.workers, **options)
+    else:
+        report = run_batch(load_topics(args.topics), args.output, checkpoint_path=args.checkpoints, **options)
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+REF_PREFIX = "blob:sha256:"
+
+
+def is_ref(value: Any) -> bool:
+    """Whether `value` is a blob store reference"""
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+class BlobStore:
+    """Content-addressed store for large JSON values such as search results and contexts.
+
+    Values are written once under `root`, named by the SHA-256 of their JSON encoding,
+    so identical payloads from different sections or runs share one file. Graph state
+    then only carries the short reference returned by `put`. Recently read values are
+    kept in a small in-memory LRU.
+
+    The directory is only created by the first `put`. A blob's modification time is
+    refreshed whenever it is stored again or read from disk, and `prune` deletes the
+    blobs unused for longer than a TTL or beyond a total size.
+    """
+
+    def __init__(self, root: str, memory_items: int = 256):
+        self.root = root
+        self.memory_items = memory_items
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:] + ".json")
+
+    def _remember(self, ref: str, value: Any) -> None:
+        with self._lock:
+            self._memory[ref] = value
+            self._memory.move_to_end(ref)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def put(self, value: Any) -> str:
+        """Store `value` and return its reference"""
+        data = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file and rename, so readers never see partial blobs
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> Any:
+        """Load the value stored under `ref`"""
+        with self._lock:
+            if ref in self._memory:
+                self._memory.move_to_end(ref)
+                return self._memory[ref]
+        path = self._path(ref[len(REF_PREFIX) :])
+        with open(path, "rb") as f:
+            value = json.loads(f.read())
+        os.utime(path)
+        self._remember(ref, value)
+        return value
+
+    def prune(self, max_age_seconds: float | None = None, max_bytes: int | None = None) -> dict:
+        """Delete blobs unused for more than `max_age_seconds`, then the least recently
+        used ones until the store holds at most `max_bytes`, and return the counts"""
+        blobs = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+
+        # Oldest first, so the size limit drops the least recently used blobs
+        blobs.sort()
+        now = time.time()
+        total = sum(size for _, size, _ in blobs)
+        removed = removed_bytes = 0
+        for mtime, size, path in blobs:
+            expired = max_age_seconds is not None and now - mtime > max_age_seconds
+            if not expired and (max_bytes is None or total <= max_bytes):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            removed_bytes += size
+
+        with self._lock:
+            self._memory.clear()
+        return {
+            "blobs_removed": removed,
+            "bytes_removed": removed_bytes,
+            "blobs_kept": len(blobs) - removed,
+            "bytes_kept": total,
+        }
+
+    def resolve(self, value: Any) -> Any:
+        """Return the stored value if `value` is a reference, otherwise `value` itself"""
+        return self.get(value) if is_ref(value) else value
+
+
+_stores: dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(root: str) -> BlobStore:
+    """Return the process-wide blob store rooted at `root`"""
+    root = os.path.abspath(root)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = BlobStore(root)
+        return _stores[root]
+
+
+def store_for(configuration) -> BlobStore:
+    """Return the blob store under the cache directory of `configuration`"""
+    return get_blob_store(os.path.join(configuration.cache_dir, "blobs"))
+
+
+def prune_blob_store(configuration) -> dict:
+    """Prune the blob store of `configuration` to its `blob_store_ttl` and `blob_store_max_bytes`"""
+    return store_for(configuration).prune(
+        max_age_seconds=configuration.blob_store_ttl, max_bytes=configuration.blob_store_max_bytes
+    )
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any
+
+
+class SQLiteCache:
+    """A small persistent key/value cache backed by SQLite.
+
+    Values are stored as JSON. Entries expire after `ttl_seconds` and the least
+    recently used entries are evicted once the cache holds more than
+    `max_entries`. The database runs in WAL mode with a busy timeout, so it can be
+    shared by threads and by separate processes pointing at the same file.
+
+    Reads never take the write lock: the access times of hits are kept in memory
+    and written in one batch with the next write, or once `TOUCH_BATCH` hits have
+    piled up. The entry count is checked every `EVICT_CHECK_EVERY` writes, so a
+    cache may hold that many entries above `max_entries` until the next check.
+    """
+
+    TOUCH_BATCH = 64
+    EVICT_CHECK_EVERY = 32
+
+    def __init__(self, path: str, ttl_seconds: float | None = None, max_entries: int | None = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # Access times of hits not yet written, and writes since the last eviction check
+        self._touched: dict[str, float] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key`, or None if it is missing or expired"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+
+        with self._lock:
+            self._touched[key] = now
+            flush = len(self._touched) >= self.TOUCH_BATCH
+        if flush:
+            with closing(self._connect()) as conn, conn:
+                self._flush_touched(conn)
+        return json.loads(value)
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Write the buffered access times of hits inside the open transaction"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()],
+            )
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key` and evict the least recently used entries if the cache is over capacity"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._flush_touched(conn)
+            if self.max_entries is None:
+                return
+            with self._lock:
+                check = self._writes % self.EVICT_CHECK_EVERY == 0
+                self._writes += 1
+            if not check:
+                return
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self, prefix: str = "") -> None:
+        """Remove every entry whose key starts with `prefix`"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+
+_caches: dict[tuple, SQLiteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path: str, ttl_seconds: float | None = None, max_entries: int | None = None) -> SQLiteCache:
+    """Return the process-wide cache for the given file and settings"""
+    key = (os.path.abspath(path), ttl_seconds, max_entries)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = SQLiteCache(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+        return _caches[key]
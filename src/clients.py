@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+
+
+# Clients are built lazily on first use and shared by every node and run in the
+# process, so importing the graph needs no API keys and connection pools are reused
+_lock = threading.Lock()
+_env_loaded = False
+
+_chat_models: dict[tuple, Any] = {}
+_structured_models: dict[tuple, Any] = {}
+_search_client = None
+_async_search_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _default_model_factory(model: str, **kwargs):
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(model=model, **kwargs)
+
+
+def _default_search_client_factory():
+    from tavily import TavilyClient
+
+    return TavilyClient()
+
+
+def _default_async_search_client_factory():
+    from tavily import AsyncTavilyClient
+
+    return AsyncTavilyClient()
+
+
+_model_factory: Callable[..., Any] = _default_model_factory
+_search_client_factory: Callable[[], Any] = _default_search_client_factory
+_async_search_client_factory: Callable[[], Any] = _default_async_search_client_factory
+
+
+def _load_env() -> None:
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+def _settings_key(kwargs: dict) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+
+def get_chat_model(model: str, **kwargs):
+    """Return the shared chat model for `model` and the given init settings"""
+    key = (model, _settings_key(kwargs))
+    with _lock:
+        if key not in _chat_models:
+            _load_env()
+            _chat_models[key] = _model_factory(model, **kwargs)
+        return _chat_models[key]
+
+
+def get_structured_model(model: str, schema: type, **kwargs):
+    """Return the shared `with_structured_output(schema)` wrapper of the chat model for `model`"""
+    key = (model, schema, _settings_key(kwargs))
+    with _lock:
+        cached = _structured_models.get(key)
+    if cached is not None:
+        return cached
+
+    structured = get_chat_model(model, **kwargs).with_structured_output(schema)
+    with _lock:
+        return _structured_models.setdefault(key, structured)
+
+
+def get_search_client():
+    """Return the shared blocking search client"""
+    global _search_client
+    with _lock:
+        if _search_client is None:
+            _load_env()
+            _search_client = _search_client_factory()
+        return _search_client
+
+
+def get_async_search_client():
+    """Return the async search client of the running event loop.
+
+    Async HTTP clients are bound to the loop they were created on, so one client is
+    kept per loop and dropped together with it.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_search_clients.get(loop)
+        if client is None:
+            _load_env()
+            client = _async_search_clients[loop] = _async_search_client_factory()
+        return client
+
+
+def configure_clients(
+    model_factory: Callable[..., Any] | None = None,
+    search_client_factory: Callable[[], Any] | None = None,
+    async_search_client_factory: Callable[[], Any] | None = None,
+) -> None:
+    """Replace the client factories (e.g. with local fakes) and drop every cached client"""
+    global _model_factory, _search_client_factory, _async_search_client_factory, _search_client
+    with _lock:
+        if model_factory is not None:
+            _model_factory = model_factory
+        if search_client_factory is not None:
+            _search_client_factory = search_client_factory
+        if async_search_client_factory is not None:
+            _async_search_client_factory = async_search_client_factory
+        _chat_models.clear()
+        _structured_models.clear()
+        _search_client = None
+        _async_search_clients.clear()
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, validator, root_validator
-from typing import Annotated, Literal, Optional, Dict
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Annotated, Literal, Optional
+from langchain_core.runnables import RunnableConfig
 
 
 ResearchPaperType = Literal[
@@ -19,30 +20,51 @@ ModelName = Literal[
     # --- OpenAI GPT-4 family ---
     "openai:gpt-5-nano",
     "openai:gpt-4.1",
+    "openai:gpt-4.1-mini",
+    "openai:gpt-4.1-nano",
     "openai:o4-mini-2025-04-16",
     "openai:gpt-4o",
     "openai:gpt-4o-mini",
-    
 
     # --- OpenAI GPT-5 family ---
     "openai:gpt-5",
     "openai:gpt-5-mini",
-    "openai:gpt-5-large",
-
-    # --- Anthropic Claude family ---
-    "anthropic:claude-3-haiku",
-    "anthropic:claude-3-sonnet",
-    "anthropic:claude-3-opus",
-    "anthropic:claude-3-5-sonnet",
-    "anthropic:claude-3-5-opus",
-
-    # --- Google Gemini family ---
-    "google:gemini-1.5-flash",
-    "google:gemini-1.5-pro",
-    "google:gemini-1.5-ultra",
-    "google:gemini-2.0-flash",
-    "google:gemini-2.0-pro",
+
+    # --- Anthropic Claude family (langchain-anthropic) ---
+    "anthropic:claude-3-haiku-20240307",
+    "anthropic:claude-3-5-haiku-latest",
+    "anthropic:claude-3-5-sonnet-latest",
+    "anthropic:claude-3-7-sonnet-latest",
+    "anthropic:claude-3-opus-latest",
+    "anthropic:claude-sonnet-4-0",
+    "anthropic:claude-opus-4-0",
+
+    # --- Google Gemini family (langchain-google-genai) ---
+    "google_genai:gemini-1.5-flash",
+    "google_genai:gemini-1.5-pro",
+    "google_genai:gemini-2.0-flash",
+    "google_genai:gemini-2.5-flash",
+    "google_genai:gemini-2.5-pro",
 ]
+
+# Names accepted from older configurations: init_chat_model knows Gemini as
+# google_genai, and Claude models need a dated id or an alias. Names no provider
+# serves (retired, or never released) map to the closest model that is served
+LEGACY_MODEL_NAMES = {
+    "openai:gpt-5-large": "openai:gpt-5",
+    "google:gemini-1.5-flash": "google_genai:gemini-1.5-flash",
+    "google:gemini-1.5-pro": "google_genai:gemini-1.5-pro",
+    "google:gemini-1.5-ultra": "google_genai:gemini-1.5-pro",
+    "google:gemini-2.0-flash": "google_genai:gemini-2.0-flash",
+    "google:gemini-2.0-pro": "google_genai:gemini-2.5-pro",
+    "anthropic:claude-3-haiku": "anthropic:claude-3-haiku-20240307",
+    "anthropic:claude-3-sonnet": "anthropic:claude-3-5-sonnet-latest",
+    "anthropic:claude-3-5-sonnet": "anthropic:claude-3-5-sonnet-latest",
+    "anthropic:claude-3-opus": "anthropic:claude-3-opus-latest",
+    "anthropic:claude-3-5-opus": "anthropic:claude-opus-4-0",
+}
+
+
 class Configuration(BaseModel):
 
     research_paper_type: Annotated[
@@ -64,68 +86,191 @@ class Configuration(BaseModel):
         default="openai:gpt-4o", description="Model for prose drafting."
     )
 
+    # Outbound calls
+    call_max_attempts: int = Field(
+        default=3,
+        description="Attempts per model or web search call when it fails with a 429, a 5xx or a timeout, with jittered backoff in between.",
+    )
+    hedge_requests: bool = Field(
+        default=False,
+        description="Send a duplicate planner, query or web search call once the first has taken longer than the p95 latency of recent ones, and use whichever answers first.",
+    )
+
+    # Search
+    search_backend: Literal["tavily", "local", "tiered"] = Field(
+        default="tavily",
+        description="'tavily' searches the web; 'local' answers offline from the local corpus of earlier results; 'tiered' answers from the local corpus when its matches are good enough and from the web otherwise, adding the web results to the corpus.",
+    )
+    local_corpus_path: str = Field(
+        default="",
+        description="SQLite file of the local search corpus. Empty uses corpus.sqlite under cache_dir.",
+    )
+    local_corpus_min_score: float = Field(
+        default=0.8,
+        description="Match score (idf-weighted share of the query terms a document contains) a local result needs to count in tiered search; a query is answered locally when at least half of search_max_results results reach it.",
+    )
+    search_max_concurrency: int = Field(
+        default=4,
+        description="Maximum number of web search queries a research branch runs at once.",
+    )
+    search_timeout: float = Field(
+        default=30.0,
+        description="Timeout in seconds for a single web search query.",
+    )
+    search_max_results: int = Field(
+        default=5,
+        description="Number of results to request for each web search query.",
+    )
+    search_topic: Literal["general", "news", "finance"] = Field(
+        default="general",
+        description="Tavily search topic used for web search queries.",
+    )
+
+    adaptive_search: bool = Field(
+        default=False,
+        description="Run a section's queries in batches, in the order they were generated, and stop once new batches add little new evidence or a budget runs out. Cannot be combined with query_dedup.",
+    )
+    adaptive_search_batch_size: int = Field(
+        default=2,
+        description="Number of queries run together in each adaptive search batch.",
+    )
+    adaptive_search_novelty_threshold: float = Field(
+        default=0.25,
+        description="Stop searching a section when the score-weighted share of new URLs and content in a batch falls below this.",
+    )
+    adaptive_search_max_queries: int = Field(
+        default=6,
+        description="Maximum number of queries adaptive search runs for one section.",
+    )
+    adaptive_search_token_budget: int = Field(
+        default=8_000,
+        description="Stop searching a section once its results hold this many (estimated) tokens.",
+    )
+
+    passage_index: bool = Field(
+        default=False,
+        description="Fetch the raw page content of every result, split it into passages and use the passages that best match the section title and description (BM25) as the section's results.",
+    )
+    passage_tokens: int = Field(
+        default=200,
+        description="Maximum (estimated) tokens of one passage of raw page content.",
+    )
+    passage_top_k: int = Field(
+        default=12,
+        description="Number of passages kept per section, so a section holds at most passage_top_k * passage_tokens tokens however large the pages are.",
+    )
+
+    query_dedup: bool = Field(
+        default=False,
+        description="Plan web searches across all sections, running duplicate and near-duplicate queries only once. Cannot be combined with adaptive_search or speculative_research.",
+    )
+    query_dedup_threshold: float = Field(
+        default=0.7,
+        description="Token-set Jaccard similarity at or above which two queries are treated as duplicates.",
+    )
+
+    speculative_research: bool = Field(
+        default=False,
+        description="Start query generation and search for the template's research sections while the planner describes them, then keep the results of the sections the planner returns. Cannot be combined with query_dedup.",
+    )
+    speculative_match_threshold: float = Field(
+        default=0.0,
+        description="Minimum share of a section's speculative query words found in the planner's description of it for its speculative research to be kept; 0 keeps every section whose title matches.",
+    )
+
+    # Context
+    context_compaction: bool = Field(
+        default=True,
+        description="Deduplicate, rank and trim the section contexts before drafting.",
+    )
+    context_token_budget: int = Field(
+        default=32_000,
+        description="Total token budget for the section contexts, split across the researched sections.",
+    )
+    context_similarity_threshold: float = Field(
+        default=0.8,
+        description="Shingle Jaccard similarity at or above which two snippets are treated as duplicates.",
+    )
+
+    # Caching
+    cache_dir: str = Field(
+        default=".cache",
+        description="Directory holding the persistent on-disk caches.",
+    )
+    state_blob_refs: bool = Field(
+        default=False,
+        description="Keep search results and section contexts in a content-addressed blob store under cache_dir and carry only references in graph state.",
+    )
+    blob_store_ttl: float = Field(
+        default=7 * 24 * 60 * 60,
+        description="Seconds a blob may go unused before prune_blob_store deletes it; keep it above the age of any checkpoint that should still resume.",
+    )
+    blob_store_max_bytes: int = Field(
+        default=1024**3,
+        description="Total size the blob store is pruned down to, dropping the least recently used blobs first.",
+    )
+    search_cache_mode: Literal["use", "refresh", "bypass"] = Field(
+        default="use",
+        description="'use' reads and writes the search cache, 'refresh' skips reads but stores fresh results, 'bypass' ignores the cache.",
+    )
+    search_cache_ttl: float = Field(
+        default=24 * 60 * 60,
+        description="Seconds a cached search response stays valid.",
+    )
+    search_cache_max_entries: int = Field(
+        default=10_000,
+        description="Maximum number of cached search responses before least recently used ones are evicted.",
+    )
+
+    planner_cache: bool = Field(
+        default=False,
+        description="Reuse the section outline of earlier runs with the same planner model, prompt, topic and template.",
+    )
+    planner_cache_ttl: float = Field(
+        default=7 * 24 * 60 * 60,
+        description="Seconds a cached section outline stays valid.",
+    )
+    planner_cache_max_entries: int = Field(
+        default=1_000,
+        description="Maximum number of cached section outlines before least recently used ones are evicted.",
+    )
+
+    # Drafting
+    drafting_mode: Literal["single", "parallel"] = Field(
+        default="single",
+        description="'single' writes the whole paper in one model call; 'parallel' drafts each researched section in parallel, then the dependent sections from those drafts, then stitches them together.",
+    )
+
+    # Profiling
+    profile_dir: str = Field(
+        default="",
+        description="Directory to write per-node CPU and allocation profiles and the run's collapsed stacks to. Empty uses the PAPER_PROFILE_DIR environment variable; empty there too disables profiling.",
+    )
+
     # Templates
     document_template: str = Field(
-        default="""
-            # Research Paper — Analytical Paper
-
-            ## Title Page
-            - **Title**
-            - **Authors & Affiliations**
-            - **Correspondence**
-
-            ## Abstract (150–250 words)
-            - Concise summary of the research question, sources analyzed, methods of analysis, and main insights.
-            - Should emphasize interpretation rather than taking a definitive stance.
-            - No citations here.
-
-            ## Introduction
-            - Background and motivation
-            - Research question(s) or guiding problem
-            - Scope and boundaries of the analysis
-            - Contributions (bulleted list of what the paper adds)
-            - Organization of the paper
-
-            ## Related Work / Literature Context
-            - Synthesize prior literature and perspectives
-            - Highlight debates, patterns, or trends relevant to the analysis
-            - Identify gaps that your analysis addresses
-
-            ## Analytical Framework / Method
-            - Explain the framework, models, or methods used for analysis
-            - Data, texts, or materials examined
-            - Criteria for inclusion/exclusion
-            - Assumptions and rationale
-
-            ## Analysis
-            - Systematic breakdown of the evidence (thematic, chronological, comparative, etc.)
-            - Tables, figures, or diagrams to support interpretation
-            - Multiple subsections allowed (###) to handle dimensions of analysis
-
-            ## Discussion
-            - Interpret the findings: what do they mean?
-            - Connections back to literature
-            - Strengths and limitations of your analysis
-            - Broader implications
-
-            ## Conclusion
-            - Recap of key insights
-            - What new understanding the analysis provides
-            - Implications for theory, practice, or future research
-
-            ## Future Work
-            - Open questions raised by the analysis
-            - Possible extensions of the framework or data
-            - Recommendations for deeper or comparative studies
-
-            ## References
-            - Full bibliography in the required style (APA, IEEE, etc.)
-
-            ## Appendices (optional)
-            - Extended tables, coding schemes, or supplementary analysis
-            """,
-        description="Template to use when drafting the research paper.",
-    )
-
-
-   
+        default="",
+        description="Markdown template to use when drafting the research paper, one `##` heading per section. Empty uses the built-in template of research_paper_type.",
+    )
+
+    @field_validator("query_model", "planner_model", "drafting_model", mode="before")
+    @classmethod
+    def _rename_legacy_models(cls, value):
+        return LEGACY_MODEL_NAMES.get(value, value)
+
+    @model_validator(mode="after")
+    def _check_search_modes(self) -> "Configuration":
+        # Deduplicated searches are shared between sections, so they cannot stop per section
+        if self.query_dedup and self.adaptive_search:
+            raise ValueError("adaptive_search cannot be combined with query_dedup")
+        # Every research section is researched speculatively, leaving nothing to deduplicate
+        if self.query_dedup and self.speculative_research:
+            raise ValueError("speculative_research cannot be combined with query_dedup")
+        return self
+
+    @classmethod
+    def from_runnable_config(cls, config: Optional[RunnableConfig] = None) -> "Configuration":
+        """Create a Configuration from the `configurable` values of a RunnableConfig"""
+        configurable = (config or {}).get("configurable", {})
+        values = {k: v for k, v in configurable.items() if k in cls.model_fields}
+        return cls(**values)
@@ -0,0 +1,84 @@
+from src.nodes.research_agent.nodes.web_research import render_context
+from src.text import estimate_tokens, jaccard, shingles
+
+
+# Tokens taken by the separator `render_context` puts between two results
+SEPARATOR_TOKENS = estimate_tokens("\n\n---\n\n")
+
+
+def dedupe_results(results: list[dict], threshold: float) -> list[dict]:
+    """Drop exact URL duplicates and near-duplicate snippets, keeping the best scored copy"""
+    ranked = sorted(results, key=lambda item: item.get("score") or 0.0, reverse=True)
+
+    kept: list[dict] = []
+    kept_shingles: list[frozenset] = []
+    seen_urls: set[str] = set()
+    for item in ranked:
+        url = item.get("url")
+        if url and url in seen_urls:
+            continue
+        item_shingles = shingles(item.get("content") or "")
+        # Results without content have nothing to compare, so only their URLs dedupe them
+        if item_shingles and any(jaccard(item_shingles, other) >= threshold for other in kept_shingles):
+            continue
+        if url:
+            seen_urls.add(url)
+        kept.append(item)
+        kept_shingles.append(item_shingles)
+    return kept
+
+
+def trim_to_budget(results: list[dict], token_budget: int) -> list[dict]:
+    """Keep results in order until `token_budget` is spent, truncating the one that crosses it"""
+    trimmed: list[dict] = []
+    remaining = token_budget
+    for item in results:
+        tokens = estimate_tokens(render_context([item])) + (SEPARATOR_TOKENS if trimmed else 0)
+        if tokens <= remaining:
+            trimmed.append(item)
+            remaining -= tokens
+            continue
+        overhead = tokens - estimate_tokens(item.get("content") or "")
+        if remaining > overhead:
+            content = (item.get("content") or "")[: (remaining - overhead) * 4]
+            trimmed.append({**item, "content": content})
+        break
+    return trimmed
+
+
+def split_budget(needs: list[int], total_budget: int) -> list[int]:
+    """Split `total_budget` across sections, handing budget a section doesn't need to the others"""
+    budgets = [0] * len(needs)
+    remaining = total_budget
+    order = sorted(range(len(needs)), key=lambda i: needs[i])
+    for position, i in enumerate(order):
+        share = remaining // (len(needs) - position)
+        budgets[i] = min(needs[i], share)
+        remaining -= budgets[i]
+    return budgets
+
+
+def compact_contexts(
+    sections_results: list[list[dict]], total_budget: int, similarity_threshold: float
+) -> tuple[list[str], dict]:
+    """Deduplicate, rank and trim the search results of every section to a shared token budget.
+
+    Returns the rendered context of every section and the token counts before and
+    after compaction.
+    """
+    deduped = [dedupe_results(results, similarity_threshold) for results in sections_results]
+    needs = [estimate_tokens(render_context(results)) for results in deduped]
+    budgets = split_budget(needs, total_budget)
+
+    contexts = [
+        render_context(trim_to_budget(results, budget))
+        for results, budget in zip(deduped, budgets)
+    ]
+
+    stats = {
+        "context_tokens_before": sum(
+            estimate_tokens(render_context(results)) for results in sections_results
+        ),
+        "context_tokens_after": sum(estimate_tokens(context) for context in contexts),
+    }
+    return contexts, stats
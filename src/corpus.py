@@ -0,0 +1,209 @@
+"""Local corpus of previously retrieved search results.
+
+Documents are kept in SQLite with an inverted index (term -> document, term
+frequency) and answered with BM25, so earlier results can be searched without the
+network. Build or extend a corpus from the search cache of earlier runs:
+
+    python -m src.corpus --cache-dir .cache
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import closing
+
+from src.text import STOPWORDS, normalize_text
+
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+CORPUS_FILE = "corpus.sqlite"
+
+
+def _terms(text: str) -> list[str]:
+    return [t for t in normalize_text(text).split() if t not in STOPWORDS]
+
+
+class LocalCorpus:
+    """Search results stored on disk with a BM25 inverted index over their text.
+
+    Each document is one result page, keyed by URL; its title, snippet and raw
+    content (when it was fetched) are indexed. Like `SQLiteCache`, the database runs
+    in WAL mode, so threads and processes can share the file.
+
+    Besides the BM25 ranking, every result gets a match `score` between 0 and 1: the
+    idf-weighted share of the query terms it contains. Terms the corpus has never
+    seen count with the highest idf, so a query about something new scores low.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id INTEGER PRIMARY KEY,"
+                " url TEXT UNIQUE NOT NULL,"
+                " title TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " raw_content TEXT,"
+                " length INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL,"
+                " doc_id INTEGER NOT NULL,"
+                " tf INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " PRIMARY KEY (term, doc_id)) WITHOUT ROWID"
+            )
+            # Documents hold whole pages; corpus statistics are read from this index instead
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_length ON documents (length)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def add(self, results: list[dict]) -> int:
+        """Index the result items whose URL is not in the corpus yet; returns how many were added"""
+        added = 0
+        with self._lock, closing(self._connect()) as conn, conn:
+            for item in results:
+                url = item.get("url")
+                if not url:
+                    continue
+                title = item.get("title") or ""
+                content = item.get("content") or ""
+                raw_content = item.get("raw_content") or None
+                counts = Counter(_terms(" ".join((title, content, raw_content or ""))))
+                length = sum(counts.values())
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO documents (url, title, content, raw_content, length)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (url, title, content, raw_content, length),
+                )
+                if not cursor.rowcount:
+                    continue
+                doc_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf, length) VALUES (?, ?, ?, ?)",
+                    ((term, doc_id, tf, length) for term, tf in counts.items()),
+                )
+                conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT (term) DO UPDATE SET df = df + 1",
+                    ((term,) for term in counts),
+                )
+                added += 1
+        return added
+
+    def search(self, query: str, max_results: int = 5, include_raw_content: bool = False) -> dict:
+        """Return the best matching documents for `query` as a Tavily-style response"""
+        terms = list(dict.fromkeys(_terms(query)))
+        response = {"query": query, "results": []}
+        if not terms:
+            return response
+
+        placeholders = ",".join("?" * len(terms))
+        with closing(self._connect()) as conn:
+            n, total_length = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+            if not n:
+                return response
+            df = dict(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms))
+            postings = conn.execute(
+                f"SELECT term, doc_id, tf, length FROM postings WHERE term IN ({placeholders})", terms
+            ).fetchall()
+
+            idf = {term: math.log1p((n - df.get(term, 0) + 0.5) / (df.get(term, 0) + 0.5)) for term in terms}
+            total_idf = sum(idf.values())
+            average_length = total_length / n
+
+            # BM25 length normalization is norm_base + norm_slope * length
+            norm_base = BM25_K1 * (1 - BM25_B)
+            norm_slope = BM25_K1 * BM25_B / average_length
+            bm25: defaultdict[int, float] = defaultdict(float)
+            matched: defaultdict[int, float] = defaultdict(float)
+            for term, doc_id, tf, length in postings:
+                weight = idf[term]
+                bm25[doc_id] += weight * tf * (BM25_K1 + 1) / (tf + norm_base + norm_slope * length)
+                matched[doc_id] += weight
+
+            best = sorted(bm25, key=bm25.get, reverse=True)[:max_results]
+            if not best:
+                return response
+            rows = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    "SELECT id, url, title, content, raw_content FROM documents"
+                    f" WHERE id IN ({','.join('?' * len(best))})",
+                    best,
+                )
+            }
+
+        for doc_id in best:
+            url, title, content, raw_content = rows[doc_id]
+            result = {"title": title, "url": url, "content": content, "score": round(matched[doc_id] / total_idf, 4)}
+            if include_raw_content:
+                result["raw_content"] = raw_content
+            response["results"].append(result)
+        return response
+
+
+def ingest_search_cache(corpus: LocalCorpus, cache_path: str) -> tuple[int, int]:
+    """Add every result held in the search cache at `cache_path` to `corpus`.
+
+    Returns the number of cached responses read and of documents added.
+    """
+    if not os.path.exists(cache_path):
+        return 0, 0
+    responses = added = 0
+    with closing(sqlite3.connect(cache_path, timeout=30)) as conn:
+        for (value,) in conn.execute("SELECT value FROM entries WHERE key LIKE 'search:%'"):
+            response = json.loads(value)
+            responses += 1
+            added += corpus.add(response.get("results", []) if isinstance(response, dict) else [])
+    return responses, added
+
+
+_corpora: dict[str, LocalCorpus] = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(path: str) -> LocalCorpus:
+    """Return the process-wide corpus for the given file"""
+    key = os.path.abspath(path)
+    with _corpora_lock:
+        if key not in _corpora:
+            _corpora[key] = LocalCorpus(path)
+        return _corpora[key]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the local search corpus from the search cache")
+    parser.add_argument("--cache-dir", default=".cache", help="directory holding search.sqlite and the corpus")
+    args = parser.parse_args(argv)
+
+    corpus = get_corpus(os.path.join(args.cache_dir, CORPUS_FILE))
+    start = time.perf_counter()
+    responses, added = ingest_search_cache(corpus, os.path.join(args.cache_dir, "search.sqlite"))
+    print(
+        f"Read {responses} cached responses, added {added} documents in {time.perf_counter() - start:.1f}s; "
+        f"the corpus holds {len(corpus)} documents"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.types import RetryPolicy
+
+from src.configuration import Configuration
+from src.schema import SearchResult, Section
+
+
+# Base classes of the transient client errors: openai's connection errors and
+# timeouts, httpx transport errors, and tavily's timeouts and 429 responses
+TRANSIENT_ERROR_TYPES = {"APIConnectionError", "TransportError", "TimeoutError", "UsageLimitExceededError"}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Whether `exc` is worth retrying: timeouts, dropped connections, 408/409/429 and 5xx responses"""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_TYPES for cls in type(exc).__mro__)
+
+
+def mark_call_retried(exc: BaseException) -> None:
+    """Flag `exc` as raised after the call scheduler's own retries ran out"""
+    exc.call_retried = True
+
+
+def should_retry_node(exc: BaseException) -> bool:
+    """Whether a node failing with `exc` is worth running again: transient errors the
+    call scheduler has not already retried, such as those of the streamed report or of
+    calls made with `call_max_attempts=1`"""
+    return is_transient_error(exc) and not getattr(exc, "call_retried", False)
+
+
+# Failed model calls are retried per task, so one failing branch of a fan-out is
+# retried on its own while the writes of its finished siblings are kept. Errors the
+# call scheduler already retried are left alone, so a call is never retried twice over
+RETRY_POLICY = RetryPolicy(
+    initial_interval=1.0,
+    backoff_factor=2.0,
+    max_interval=30.0,
+    max_attempts=4,
+    retry_on=should_retry_node,
+)
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(".cache", "checkpoints.sqlite")
+
+
+def checkpoint_serde() -> JsonPlusSerializer:
+    """Checkpoint serializer that may load the graph's own state types back.
+
+    Unlisted classes in a checkpoint only load with a warning today and will be
+    blocked by later LangGraph versions, so every model kept in state is listed here.
+    """
+    return JsonPlusSerializer(allowed_msgpack_modules=[Section, SearchResult])
+
+
+OUTPUT_KEYS = ("final_report", "run_stats")
+
+# Settings that change how a run is carried out but not what it produces, so a
+# thread run again with other values for them still resumes or reuses its output
+EXECUTION_SETTINGS = frozenset({
+    "call_max_attempts",
+    "hedge_requests",
+    "search_max_concurrency",
+    "search_timeout",
+    "cache_dir",
+    "blob_store_ttl",
+    "blob_store_max_bytes",
+    "search_cache_mode",
+    "search_cache_ttl",
+    "search_cache_max_entries",
+    "planner_cache",
+    "planner_cache_ttl",
+    "planner_cache_max_entries",
+    "profile_dir",
+})
+
+
+def run_fingerprint(config: RunnableConfig) -> str:
+    """Hash the settings of `config` that shape a run's output (models, template, modes, budgets)"""
+    settings = Configuration.from_runnable_config(config).model_dump(exclude=EXECUTION_SETTINGS)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _plan_run(topic: str, fingerprint: str, snapshot) -> tuple[dict | None, dict | None]:
+    """Decide how to run `topic` on a thread, given the thread's latest state snapshot.
+
+    Returns the stored output if the thread already finished this topic with the
+    same settings, otherwise the input to invoke the graph with: None to resume an
+    interrupted run of the same topic and settings, or a fresh input to start over.
+    """
+    same_run = (
+        snapshot.values.get("topic") == topic
+        and (snapshot.metadata or {}).get("run_fingerprint") == fingerprint
+    )
+    if not same_run:
+        return None, {"topic": topic}
+    if not snapshot.next:
+        return {key: snapshot.values[key] for key in OUTPUT_KEYS if key in snapshot.values}, None
+    return None, None
+
+
+def _with_fingerprint(config: RunnableConfig, fingerprint: str) -> RunnableConfig:
+    # Config metadata is stored with every checkpoint of the run
+    return {**config, "metadata": {**config.get("metadata", {}), "run_fingerprint": fingerprint}}
+
+
+def run_or_resume(graph, topic: str, config: RunnableConfig) -> dict:
+    """Run `topic` on the thread given by `config["configurable"]["thread_id"]`.
+
+    If the thread already holds a run of the same topic with the same settings (see
+    `run_fingerprint`), it is resumed from its last checkpoint: finished nodes and
+    finished `Send` branches are not run again, and a completed run returns its stored
+    output. Otherwise the thread is cleared and the run starts over.
+    """
+    fingerprint = run_fingerprint(config)
+    snapshot = graph.get_state(config)
+    output, graph_input = _plan_run(topic, fingerprint, snapshot)
+    if output is not None:
+        return output
+    if graph_input is not None and snapshot.values:
+        # Starting over on top of the old state would add to its sections and run_stats
+        graph.checkpointer.delete_thread(config["configurable"]["thread_id"])
+    return graph.invoke(graph_input, _with_fingerprint(config, fingerprint))
+
+
+async def arun_or_resume(graph, topic: str, config: RunnableConfig) -> dict:
+    """Async version of `run_or_resume`"""
+    fingerprint = run_fingerprint(config)
+    snapshot = await graph.aget_state(config)
+    output, graph_input = _plan_run(topic, fingerprint, snapshot)
+    if output is not None:
+        return output
+    if graph_input is not None and snapshot.values:
+        await graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+    return await graph.ainvoke(graph_input, _with_fingerprint(config, fingerprint))
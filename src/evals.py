@@ -0,0 +1,649 @@
+"""Evaluate the graph on a dataset with LLM judges, recomputing only what changed.
+
+Reads a local JSONL dataset with one example per line
+
+    {"id": "optional-unique-id", "inputs": {"topic": "..."}, "outputs": {<reference outputs>}}
+
+or a LangSmith dataset given as `langsmith:<name>`, runs the target on every
+example (and repetition) concurrently and grades each output with the target's
+judges. Both stages are cached under `cache_dir`: a target output by example, code
+version and configuration, a verdict by the judge's prompt, model and the hash of
+the output it grades. Editing a judge prompt therefore only reruns that judge,
+and editing the graph only reruns the targets whose outputs then change:
+
+    python -m src.evals dataset.jsonl --target paper --repetitions 3 --concurrency 4 \\
+        --judge-model openai:gpt-5-nano --output results.jsonl
+    python -m src.evals langsmith:analytical_paper_sections_dataset --target sections \\
+        --experiment-prefix sections
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+
+from pydantic import BaseModel, Field
+
+from src.cache import get_cache
+from src.clients import get_structured_model
+from src.configuration import Configuration
+from src.prompts import assemble_messages, prompt_block
+from src.scheduler import acall_llm
+from src.schema import get_field
+from src.templates import resolve_template
+
+
+logger = logging.getLogger(__name__)
+
+EVALS_FILE = "evals.sqlite"
+LANGSMITH_PREFIX = "langsmith:"
+
+
+class CorrectnessGrader(BaseModel):
+    """This class is used to grade the correctness of the output"""
+
+    explanation: str = Field(description="The explanation of the correctness of the output")
+    correct: bool = Field(
+        description="Whether the output is correct or not. True if the output is correct, False otherwise"
+    )
+
+
+class StructurePresenceGrader(BaseModel):
+    explanation: str = Field(
+        description="List which required sections were FOUND vs MISSING. Mention recognized merges (e.g., Discussion+Conclusion). Do not judge content quality."
+    )
+    compliant: bool = Field(
+        description="True if ALL required sections (except Appendices) are present; False otherwise."
+    )
+
+
+class ClarityGrader(BaseModel):
+    explanation: str = Field(
+        description="Specific notes comparing the student's clarity, tone, flow, and precision to the good example. Mention strengths and concrete issues."
+    )
+    clear: bool = Field(
+        description="True if the student's writing is clear, precise, and academic in tone, reasonably close to the good example; False otherwise."
+    )
+
+
+class SectionScore(BaseModel):
+    """Score for correctness of the generated research paper sections."""
+
+    reason: str = Field(
+        description=(
+            "A clear explanation of how well the model’s generated sections align with the reference sections. "
+            "Focus on whether each section title is present and whether the description captures the intended purpose, "
+            "scope, and key elements of that section. Variations in wording are acceptable as long as the same core "
+            "intent is preserved."
+        )
+    )
+    correctness: bool = Field(
+        description=(
+            "A binary score (0 or 1) that indicates whether the model’s generated sections adequately match the reference. "
+            "Score 1 if the output includes all required sections (or close equivalents) with descriptions that cover the "
+            "same essential content. Score 0 if critical sections are missing, misinterpreted, or if the descriptions "
+            "contradict or omit the core intent of the reference."
+        )
+    )
+
+
+CORRECTNESS_PROMPT = """
+You are a teacher grading a research paper.
+
+You will be given:
+1) The RESEARCH TOPIC
+2) The STUDENT RESEARCH PAPER
+
+Your job is to evaluate **only correctness in terms of topic alignment**.
+
+Grading criteria:
+- The student's paper must directly address the RESEARCH TOPIC.
+- If the paper introduces extra information, that is acceptable **as long as it remains relevant to the topic**.
+- If the paper drifts away to unrelated subjects, it is incorrect.
+
+Decision rule:
+- correct = True if the student paper stays focused on the research topic.
+- correct = False if the student paper drifts to unrelated or irrelevant areas.
+
+In your explanation, clearly state:
+1. The given research topic.
+2. Whether the student's paper matches the topic.
+3. If there is any drift, explain where and why it is off-topic.
+"""
+
+
+STRUCTURE_PRESENCE_PROMPT = """
+You are grading SECTION PRESENCE ONLY for a research paper against the REQUIRED TEMPLATE.
+
+IMPORTANT RULES:
+- Judge ONLY presence/absence. Do NOT judge quality, population, tone, or formatting.
+- Synonyms are acceptable (e.g., “Methods”, “Methodology”, “Approach” for Methods; “Background” often maps to Introduction).
+- Order can differ.
+- If two sections are clearly merged (e.g., “Discussion & Conclusion”), count BOTH as present and note the merge.
+- Appendices are OPTIONAL and should NOT affect compliance.
+
+Decision:
+- compliant = True if ALL required sections of the template are present (Appendices optional).
+- compliant = False if ANY required section is missing.
+
+In your explanation, list FOUND vs MISSING sections and any merges recognized. Do not comment on content quality.
+"""
+
+
+CLARITY_WITH_REFERENCE_PROMPT = """
+You are grading the CLARITY and ACADEMIC TONE of the STUDENT RESEARCH PAPER
+by comparing it to a GOOD EXAMPLE PAPER that represents the expected standard.
+
+IMPORTANT: Evaluate WRITING QUALITY ONLY. Do NOT judge content overlap, facts, or citations accuracy.
+
+Comparison criteria (relative to the GOOD EXAMPLE):
+- Readability: clear, unambiguous sentences; avoids run-ons and filler.
+- Academic tone: formal, objective, non-conversational; avoids slang and hype.
+- Flow & coherence: logical paragraphing; smooth transitions; clear signposting.
+- Precision: terms defined; claims specific (not vague).
+- Conciseness: avoids redundancy and wordiness.
+
+Decision rule:
+- clear = True if the student paper is generally clear, precise, coherent, and academic in tone, reasonably close to the good example standard.
+- clear = False if it is frequently unclear, informal, verbose, disorganized, or imprecise relative to the good example.
+
+In your explanation:
+- Cite a few short snippets (or section-level observations) from the STUDENT paper that illustrate clarity/tone strengths or issues.
+- Optionally reference comparable qualities from the GOOD EXAMPLE (e.g., “Good Example’s Introduction uses clear signposting, while Student lacks transitions.”).
+- Keep the explanation concise and focused on writing quality.
+"""
+
+
+SECTION_CORRECTNESS_PROMPT = """
+You are evaluating how well a model’s generated research paper sections match a reference ground truth.
+
+Context:
+- The reference output is the ground truth section plan for the paper.
+- The model’s output is being evaluated against this reference for accuracy and completeness.
+- Both contain structured sections with titles and descriptions.
+
+Evaluation Guidelines:
+- Score 1 (true) if the model’s output:
+  * Includes all reference section titles (or clear equivalents).
+  * Provides descriptions that capture the same purpose, scope, and key elements as the reference.
+  * Allows for paraphrasing or slightly different expression as long as meaning is preserved.
+  * May contain additional valid details beyond the reference.
+
+- Score 0 (false) only if the model’s output:
+  * Misses or omits critical sections from the reference.
+  * Provides descriptions that contradict, distort, or ignore the core intent of the reference.
+  * Contains placeholders, irrelevant content, or fabricated information that undermines correctness.
+
+Remember: The reference is the ground truth. Evaluate correctness by judging whether the model captured the same essential
+structure and intent, not whether the wording is identical.
+"""
+
+
+def _correctness_blocks(example: dict, outputs: dict, configuration: Configuration) -> dict | None:
+    return {
+        "specific": [
+            prompt_block("RESEARCH TOPIC", "research_topic", example["inputs"]["topic"]),
+            prompt_block("STUDENT RESEARCH PAPER", "student_research_paper", outputs["final_report"]),
+        ]
+    }
+
+
+def _structure_presence_blocks(example: dict, outputs: dict, configuration: Configuration) -> dict | None:
+    # The template only changes with the configuration, so it stays in the cached prefix
+    return {
+        "static": [prompt_block("TEMPLATE", "template", resolve_template(configuration))],
+        "specific": [prompt_block("STUDENT RESEARCH PAPER", "student_research_paper", outputs["final_report"])],
+    }
+
+
+def _clarity_blocks(example: dict, outputs: dict, configuration: Configuration) -> dict | None:
+    reference = example["outputs"].get("final_report")
+    if not reference:
+        return None
+    return {
+        "shared": [prompt_block("GOOD EXAMPLE PAPER", "good_example_paper", reference)],
+        "specific": [prompt_block("STUDENT RESEARCH PAPER", "student_research_paper", outputs["final_report"])],
+    }
+
+
+def _section_correctness_blocks(example: dict, outputs: dict, configuration: Configuration) -> dict | None:
+    reference = example["outputs"].get("sections")
+    if not reference:
+        return None
+    return {
+        "shared": [prompt_block("REFERENCE GROUND TRUTH", "reference_output", json.dumps(reference))],
+        "specific": [prompt_block("MODEL OUTPUT", "model_output", json.dumps(outputs["sections"]))],
+    }
+
+
+class Judge:
+    """An LLM judge: its instructions, verdict schema, the schema fields holding the
+    score and its explanation, and a function building its prompt blocks for one
+    output (None when the example lacks what the judge compares against)."""
+
+    def __init__(self, key: str, prompt: str, schema: type[BaseModel], score_field: str, comment_field: str, blocks):
+        self.key = key
+        self.prompt = prompt
+        self.schema = schema
+        self.score_field = score_field
+        self.comment_field = comment_field
+        self.blocks = blocks
+
+    def messages(self, model: str, example: dict, outputs: dict, configuration: Configuration) -> list[dict] | None:
+        blocks = self.blocks(example, outputs, configuration)
+        if blocks is None:
+            return None
+        return assemble_messages(model, self.prompt, request="Grade the output.", **blocks)
+
+
+JUDGES = {
+    "correctness": Judge(
+        "correctness", CORRECTNESS_PROMPT, CorrectnessGrader, "correct", "explanation", _correctness_blocks
+    ),
+    "structure_presence": Judge(
+        "structure_presence",
+        STRUCTURE_PRESENCE_PROMPT,
+        StructurePresenceGrader,
+        "compliant",
+        "explanation",
+        _structure_presence_blocks,
+    ),
+    "clarity": Judge("clarity", CLARITY_WITH_REFERENCE_PROMPT, ClarityGrader, "clear", "explanation", _clarity_blocks),
+    "section_correctness": Judge(
+        "section_correctness",
+        SECTION_CORRECTNESS_PROMPT,
+        SectionScore,
+        "correctness",
+        "reason",
+        _section_correctness_blocks,
+    ),
+}
+
+
+async def _paper_target(inputs: dict, config: dict) -> dict:
+    from src.agent import graph
+
+    output = await graph.ainvoke({"topic": inputs["topic"]}, config)
+    return {"final_report": output.get("final_report", "")}
+
+
+async def _sections_target(inputs: dict, config: dict) -> dict:
+    from src.nodes.generate_sections import agenerate_sections
+
+    update = await agenerate_sections({"topic": inputs["topic"]}, config)
+    return {
+        "sections": [
+            {
+                "title": get_field(section, "title", ""),
+                "description": get_field(section, "description", ""),
+                "require_research": get_field(section, "require_research", True),
+            }
+            for section in update["sections"]
+        ]
+    }
+
+
+# Each target and the judges it is graded by
+TARGETS = {
+    "paper": (_paper_target, ("correctness", "structure_presence", "clarity")),
+    "sections": (_sections_target, ("section_correctness",)),
+}
+
+
+def _hash(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def code_version() -> str:
+    """Hash the source of the graph, so cached target outputs go stale when it changes.
+
+    The judges live in this module, which is left out: editing them must not rerun
+    the targets.
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(
+        path
+        for path in glob.glob(os.path.join(src_dir, "**", "*.py"), recursive=True)
+        if os.path.abspath(path) != os.path.abspath(__file__)
+    )
+    parts = []
+    for path in paths:
+        with open(path, "rb") as f:
+            parts += [os.path.relpath(path, src_dir).encode(), f.read()]
+    return _hash(*parts)[:16]
+
+
+def target_cache_key(target: str, example: dict, version: str, config: dict, repetition: int) -> str:
+    """Key a target output by target, example, code version, configuration and repetition"""
+    configuration = Configuration.from_runnable_config(config)
+    return "eval:target:" + _hash(
+        target,
+        example["id"],
+        example["inputs"],
+        version,
+        config.get("configurable", {}),
+        # A custom template may come from outside the source tree
+        resolve_template(configuration),
+        repetition,
+    )
+
+
+def judge_cache_key(judge: Judge, model: str, messages: list[dict]) -> str:
+    """Key a verdict by judge, model, verdict schema and the prompt, which holds the
+    output graded and everything it is compared against"""
+    return "eval:judge:" + _hash(judge.key, model, judge.schema.model_json_schema(), messages)
+
+
+def output_hash(outputs: dict) -> str:
+    return _hash(outputs)[:16]
+
+
+def _example_id(item: dict) -> str:
+    return str(item.get("id") or _hash(item["inputs"])[:16])
+
+
+def load_examples(dataset: str) -> list[dict]:
+    """Read the examples of a local JSONL file or of a `langsmith:<name>` dataset"""
+    if dataset.startswith(LANGSMITH_PREFIX):
+        from langsmith import Client
+
+        return [
+            {"id": str(example.id), "inputs": dict(example.inputs), "outputs": dict(example.outputs or {})}
+            for example in Client().list_examples(dataset_name=dataset[len(LANGSMITH_PREFIX):])
+        ]
+
+    examples, seen = [], set()
+    with open(dataset) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if not item.get("inputs"):
+                raise ValueError(f"{dataset}:{line_number}: missing inputs")
+            example_id = _example_id(item)
+            if example_id in seen:
+                logger.warning("Skipping duplicate example id %r on line %d", example_id, line_number)
+                continue
+            seen.add(example_id)
+            examples.append({"id": example_id, "inputs": item["inputs"], "outputs": item.get("outputs") or {}})
+    return examples
+
+
+def save_examples(examples: list[dict], path: str) -> None:
+    """Write examples as a local JSONL dataset, e.g. to evaluate a LangSmith dataset offline"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        for example in examples:
+            f.write(json.dumps(example) + "\n")
+
+
+class EvalRunner:
+    """Runs a target and its judges over examples with both stages cached"""
+
+    def __init__(
+        self,
+        target: str = "paper",
+        judges: list[str] | None = None,
+        judge_model: str = "openai:gpt-5-nano",
+        config: dict | None = None,
+        concurrency: int = 4,
+        version: str | None = None,
+    ):
+        self.target = target
+        self.target_fn, default_judges = TARGETS[target]
+        self.judges = [JUDGES[key] for key in (judges or default_judges)]
+        self.judge_model = judge_model
+        self.config = config or {}
+        self.configuration = Configuration.from_runnable_config(self.config)
+        self.cache = get_cache(os.path.join(self.configuration.cache_dir, EVALS_FILE))
+        self.version = version or code_version()
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.counts = {"targets_run": 0, "targets_cached": 0, "judges_run": 0, "judges_cached": 0}
+
+    async def run_target(self, example: dict, repetition: int) -> dict:
+        """Return the target output for one repetition of an example, running it only on a cache miss"""
+        key = target_cache_key(self.target, example, self.version, self.config, repetition)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self.counts["targets_cached"] += 1
+            return cached
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            outputs = await self.target_fn(example["inputs"], self.config)
+            seconds = time.perf_counter() - start
+        result = {"outputs": outputs, "seconds": seconds}
+        await asyncio.to_thread(self.cache.set, key, result)
+        self.counts["targets_run"] += 1
+        return result
+
+    async def run_judge(self, judge: Judge, example: dict, outputs: dict) -> dict | None:
+        """Return the verdict of `judge` on an output, calling the judge only on a cache miss"""
+        messages = judge.messages(self.judge_model, example, outputs, self.configuration)
+        if messages is None:
+            return None
+        key = judge_cache_key(judge, self.judge_model, messages)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self.counts["judges_cached"] += 1
+            return cached
+
+        model = get_structured_model(self.judge_model, judge.schema)
+        async with self.semaphore:
+            response = await acall_llm(
+                lambda: model.ainvoke(messages), self.judge_model, "judge", messages, self.configuration
+            )
+        result = {
+            "key": judge.key,
+            "score": float(getattr(response, judge.score_field)),
+            "comment": getattr(response, judge.comment_field),
+        }
+        await asyncio.to_thread(self.cache.set, key, result)
+        self.counts["judges_run"] += 1
+        return result
+
+    async def evaluate(self, example: dict, repetition: int) -> dict:
+        """Run and grade one repetition of an example"""
+        record = {"id": example["id"], "repetition": repetition}
+        try:
+            target = await self.run_target(example, repetition)
+        except Exception as e:
+            logger.warning("Example %r failed: %s", example["id"], e)
+            return {**record, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        verdicts = await asyncio.gather(
+            *(self.run_judge(judge, example, target["outputs"]) for judge in self.judges),
+            return_exceptions=True,
+        )
+        scores = {}
+        for judge, verdict in zip(self.judges, verdicts):
+            if isinstance(verdict, Exception):
+                logger.warning("Judge %s failed on %r: %s", judge.key, example["id"], verdict)
+            elif verdict is not None:
+                scores[judge.key] = verdict
+        return {
+            **record,
+            "status": "ok",
+            "output_hash": output_hash(target["outputs"]),
+            "outputs": target["outputs"],
+            "seconds": target["seconds"],
+            "scores": scores,
+        }
+
+
+def summarize(results: list[dict], counts: dict, seconds: float) -> dict:
+    """Mean score per judge over the graded results, with the computed and cached counts of both stages"""
+    scores: dict[str, list[float]] = {}
+    for result in results:
+        for key, verdict in result.get("scores", {}).items():
+            scores.setdefault(key, []).append(verdict["score"])
+    return {
+        "examples": len({result["id"] for result in results}),
+        "results": len(results),
+        "failed": sum(1 for result in results if result["status"] != "ok"),
+        "scores": {key: sum(values) / len(values) for key, values in scores.items()},
+        **counts,
+        "seconds": seconds,
+    }
+
+
+async def _upload(
+    runner: EvalRunner, dataset_name: str, examples: list[dict], repetitions: int, experiment_prefix: str
+) -> str:
+    """Log the evaluation as a LangSmith experiment.
+
+    The target and the judges are the cached ones, so the experiment replays the
+    results just computed instead of running them again.
+    """
+    from langsmith import Client
+
+    client = Client()
+    # Examples are matched by their dataset id, since several may share the same inputs
+    by_id = {example["id"]: example for example in examples}
+    next_repetition: dict[str, int] = {}
+
+    def evaluated(example_id) -> dict:
+        if str(example_id) not in by_id:
+            raise ValueError(f"Example {example_id} of {dataset_name} was not among the evaluated examples")
+        return by_id[str(example_id)]
+
+    async def target(inputs: dict, *, run_tree) -> dict:
+        # LangSmith traces the target with the id of the example it runs on
+        example = evaluated(run_tree.reference_example_id)
+        repetition = next_repetition.get(example["id"], 0)
+        next_repetition[example["id"]] = repetition + 1
+        return (await runner.run_target(example, repetition % repetitions))["outputs"]
+
+    def evaluator(judge: Judge):
+        async def evaluate(outputs: dict, example) -> dict:
+            reference = {**evaluated(example.id), "outputs": example.outputs or {}}
+            verdict = await runner.run_judge(judge, reference, outputs)
+            return verdict or {"key": judge.key, "score": None}
+
+        evaluate.__name__ = judge.key
+        return evaluate
+
+    results = await client.aevaluate(
+        target,
+        data=dataset_name,
+        evaluators=[evaluator(judge) for judge in runner.judges],
+        experiment_prefix=experiment_prefix,
+        max_concurrency=1,
+        num_repetitions=repetitions,
+        metadata={"code_version": runner.version, "judge_model": runner.judge_model},
+    )
+    return results.experiment_name
+
+
+async def arun_evals(
+    examples: list[dict],
+    target: str = "paper",
+    judges: list[str] | None = None,
+    judge_model: str = "openai:gpt-5-nano",
+    repetitions: int = 1,
+    concurrency: int = 4,
+    config: dict | None = None,
+    version: str | None = None,
+    output_path: str | None = None,
+    experiment_prefix: str | None = None,
+    dataset_name: str | None = None,
+) -> dict:
+    """Evaluate every repetition of every example and return the summary.
+
+    At most `concurrency` target runs and judge calls are in flight at once. With
+    `output_path`, every result is written there as JSONL; with `experiment_prefix`
+    and the LangSmith `dataset_name` the examples came from, the results are also
+    logged as a LangSmith experiment.
+    """
+    runner = EvalRunner(target, judges, judge_model, config, concurrency, version)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(runner.evaluate(example, repetition) for example in examples for repetition in range(repetitions))
+    )
+    summary = summarize(results, runner.counts, time.perf_counter() - start)
+    summary["code_version"] = runner.version
+
+    if output_path:
+        save_examples(results, output_path)
+    if experiment_prefix and dataset_name:
+        summary["experiment"] = await _upload(runner, dataset_name, examples, repetitions, experiment_prefix)
+    return summary
+
+
+def run_evals(examples: list[dict], **kwargs) -> dict:
+    """Blocking version of `arun_evals`"""
+    return asyncio.run(arun_evals(examples, **kwargs))
+
+
+def print_summary(summary: dict) -> None:
+    print(
+        f"{summary['results']} results for {summary['examples']} examples in {summary['seconds']:.1f}s, "
+        f"{summary['failed']} failed (code version {summary['code_version']})"
+    )
+    for key, score in summary["scores"].items():
+        print(f"  {key:<22} {score:.2f}")
+    print(
+        f"targets: {summary['targets_run']} run, {summary['targets_cached']} cached  "
+        f"judges: {summary['judges_run']} run, {summary['judges_cached']} cached"
+    )
+    if summary.get("experiment"):
+        print(f"LangSmith experiment: {summary['experiment']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dataset", help="JSONL file of examples, or langsmith:<dataset name>")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="paper", help="what to run on each example")
+    parser.add_argument("--judges", nargs="+", choices=sorted(JUDGES), help="judges to run (default: the target's)")
+    parser.add_argument("--judge-model", default="openai:gpt-5-nano", help="model the judges run on")
+    parser.add_argument("--repetitions", type=int, default=1, help="runs of the target per example")
+    parser.add_argument("--concurrency", type=int, default=4, help="target runs and judge calls in flight")
+    parser.add_argument(
+        "--config", type=json.loads, default={}, help="JSON object of Configuration overrides for the target"
+    )
+    parser.add_argument("--code-version", help="override the hash of the source that keys cached target outputs")
+    parser.add_argument("--output", "-o", help="JSONL file the results are written to")
+    parser.add_argument("--save-dataset", help="write the examples to this JSONL file, to evaluate offline later")
+    parser.add_argument("--experiment-prefix", help="log the results as a LangSmith experiment with this prefix")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.INFO)
+    args = parse_args(argv)
+    if args.experiment_prefix and not args.dataset.startswith(LANGSMITH_PREFIX):
+        raise SystemExit("--experiment-prefix needs a langsmith:<name> dataset")
+
+    examples = load_examples(args.dataset)
+    if args.save_dataset:
+        save_examples(examples, args.save_dataset)
+    summary = run_evals(
+        examples,
+        target=args.target,
+        judges=args.judges,
+        judge_model=args.judge_model,
+        repetitions=args.repetitions,
+        concurrency=args.concurrency,
+        config={"configurable": args.config},
+        version=args.code_version,
+        output_path=args.output,
+        experiment_prefix=args.experiment_prefix,
+        dataset_name=args.dataset[len(LANGSMITH_PREFIX):] if args.dataset.startswith(LANGSMITH_PREFIX) else None,
+    )
+    print_summary(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
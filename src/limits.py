@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+
+class ConcurrencyLimit:
+    """Process-wide cap on the number of calls of one kind in flight.
+
+    Blocking calls share a thread semaphore; async calls share a semaphore per event
+    loop, created on first use and dropped together with the loop. A limit of None
+    disables the cap.
+    """
+
+    def __init__(self, limit: int | None = None):
+        self._lock = threading.Lock()
+        self.set(limit)
+
+    def set(self, limit: int | None) -> None:
+        with self._lock:
+            self.limit = limit
+            self._semaphore = threading.BoundedSemaphore(limit) if limit else None
+            self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+                weakref.WeakKeyDictionary()
+            )
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of a blocking call"""
+        semaphore = self._semaphore
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Hold one slot for the duration of an async call"""
+        if not self.limit:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.limit)
+        async with semaphore:
+            yield
+
+
+# Shared by every node and run in the process, so concurrent runs (e.g. a batch)
+# stay under one global budget of model and search calls
+LLM_LIMIT = ConcurrencyLimit()
+SEARCH_LIMIT = ConcurrencyLimit()
+
+
+def set_concurrency_limits(llm: int | None = None, search: int | None = None) -> None:
+    """Cap the LLM and web search calls in flight across all runs; None removes a cap"""
+    LLM_LIMIT.set(llm)
+    SEARCH_LIMIT.set(search)
@@ -0,0 +1,367 @@
+import bisect
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}_total{_format_labels(key)} {value}" for key, value in values.items()]
+
+
+class Histogram:
+    """Cumulative histogram with labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_RUNS = REGISTRY.counter("paper_node_runs", "Graph node executions by node and status.")
+NODE_DURATION = REGISTRY.histogram("paper_node_duration_seconds", "Wall time of graph node executions.")
+NODE_STATE_BYTES = REGISTRY.histogram(
+    "paper_node_state_bytes", "Serialized size of node input and output state.", SIZE_BUCKETS
+)
+LLM_TOKENS = REGISTRY.counter("paper_llm_tokens", "LLM tokens by node and direction.")
+LLM_DURATION = REGISTRY.histogram("paper_llm_duration_seconds", "Wall time of LLM calls by node.")
+SEARCH_REQUESTS = REGISTRY.counter("paper_search_requests", "Web search calls by status.")
+SEARCH_DURATION = REGISTRY.histogram("paper_search_duration_seconds", "Wall time of web search calls.")
+TIERED_SEARCHES = REGISTRY.counter(
+    "paper_tiered_searches", "Tiered search queries by whether the local corpus or the web answered."
+)
+OUTBOUND_CALLS = REGISTRY.counter(
+    "paper_outbound_calls", "Scheduled model and search calls by provider, operation and status."
+)
+OUTBOUND_HEDGES = REGISTRY.counter(
+    "paper_outbound_hedges", "Hedged calls by provider, operation and whether the duplicate won."
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "paper_rate_limit_wait_seconds", "Time calls waited for their provider's rate limit."
+)
+SPECULATIVE_SECTIONS = REGISTRY.counter(
+    "paper_speculative_sections",
+    "Speculatively researched sections by outcome: kept, discarded, or abandoned when the planner failed.",
+)
+
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    return REGISTRY.render()
+
+
+def start_metrics_server(port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve `render_prometheus()` on http://host:port/metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _empty_stats() -> dict:
+    return {
+        "runs": 0,
+        "seconds": 0.0,
+        "input_tokens": 0,
+        "cached_input_tokens": 0,
+        "output_tokens": 0,
+        "llm_calls": 0,
+        "search_calls": 0,
+        "search_seconds": 0.0,
+        "state_bytes_in": 0,
+        "state_bytes_out": 0,
+    }
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records per-node metrics for every run of the graph it is attached to.
+
+    Node wall time, LLM token usage, web search calls and serialized state sizes are
+    exported to the process-wide `REGISTRY` and summarized per run; `summary()`
+    returns the per-node and per-`Send`-branch breakdown of a run.
+
+    Serializing every node's input and output state is expensive, so state sizes
+    are only measured for the share `state_size_sample_rate` of runs (none by
+    default); the other runs report 0 state bytes.
+    """
+
+    run_inline = True
+
+    def __init__(self, max_runs: int = 100, state_size_sample_rate: float = 0.0):
+        self.max_runs = max_runs
+        self.state_size_sample_rate = state_size_sample_rate
+        self._serde = JsonPlusSerializer()
+        self._lock = threading.Lock()
+        self._sampled: set[UUID] = set()
+        self._roots: dict[UUID, UUID] = {}
+        self._nodes: dict[UUID, tuple] = {}
+        self._llm_starts: dict[UUID, tuple] = {}
+        self._summaries: OrderedDict[UUID, dict] = OrderedDict()
+
+    def _size(self, value) -> int:
+        try:
+            return len(self._serde.dumps_typed(value)[1])
+        except Exception:
+            return 0
+
+    def _root(self, run_id: UUID, parent_run_id: UUID | None) -> UUID:
+        root = self._roots.get(parent_run_id, parent_run_id) if parent_run_id else run_id
+        self._roots[run_id] = root
+        return root
+
+    def _summary(self, root: UUID) -> dict:
+        summary = self._summaries.get(root)
+        if summary is None:
+            summary = {"run_id": str(root), "seconds": 0.0, "nodes": {}, "branches": {}}
+            self._summaries[root] = summary
+            while len(self._summaries) > self.max_runs:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _add(self, root: UUID, node: str, branch: str | None, **values) -> None:
+        summary = self._summary(root)
+        targets = [summary["nodes"].setdefault(node, _empty_stats())]
+        if branch:
+            targets.append(summary["branches"].setdefault(branch, _empty_stats()))
+        for stats in targets:
+            for key, value in values.items():
+                stats[key] += value
+
+    @staticmethod
+    def _node_of(metadata: dict | None) -> tuple[str | None, str | None]:
+        """Return the node a callback belongs to and its top-level task (the `Send` branch)"""
+        metadata = metadata or {}
+        namespace = metadata.get("langgraph_checkpoint_ns") or ""
+        return metadata.get("langgraph_node"), namespace.split("|")[0] or None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        with self._lock:
+            root = self._root(run_id, parent_run_id)
+            if parent_run_id is None:
+                self._summary(root)["started_at"] = time.perf_counter()
+                if random.random() < self.state_size_sample_rate:
+                    self._sampled.add(root)
+            sampled = root in self._sampled
+
+        node, branch = self._node_of(metadata)
+        if not node or kwargs.get("name") != node:
+            return
+        with self._lock:
+            # Nodes wrapped in a RunnableLambda start a nested run with the same name
+            parent = self._nodes.get(parent_run_id)
+            if parent is not None and parent[1] == node:
+                return
+            self._nodes[run_id] = (root, node, branch, time.perf_counter())
+
+        if sampled:
+            size = self._size(inputs)
+            with self._lock:
+                self._add(root, node, branch, state_bytes_in=size)
+            NODE_STATE_BYTES.observe(size, node=node, direction="input")
+
+    def _finish_node(self, run_id: UUID, outputs, status: str) -> None:
+        with self._lock:
+            started = self._nodes.pop(run_id, None)
+        if started is None:
+            return
+        root, node, branch, start = started
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            sampled = outputs is not None and root in self._sampled
+        size = self._size(outputs) if sampled else 0
+
+        run_stats = (outputs.get("run_stats") or {}) if isinstance(outputs, dict) else {}
+        with self._lock:
+            self._add(
+                root,
+                node,
+                branch,
+                runs=1,
+                seconds=elapsed,
+                state_bytes_out=size,
+                search_calls=run_stats.get("search_calls", 0),
+                search_seconds=run_stats.get("search_seconds", 0.0),
+            )
+        NODE_RUNS.inc(node=node, status=status)
+        NODE_DURATION.observe(elapsed, node=node)
+        if sampled:
+            NODE_STATE_BYTES.observe(size, node=node, direction="output")
+
+    def _finish_root(self, root: UUID) -> None:
+        with self._lock:
+            summary = self._summaries.get(root)
+            if summary is not None and "started_at" in summary:
+                summary["seconds"] = time.perf_counter() - summary.pop("started_at")
+            self._sampled.discard(root)
+            for run_id in [r for r, owner in self._roots.items() if owner == root]:
+                del self._roots[run_id]
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._finish_node(run_id, outputs, "ok")
+        if parent_run_id is None:
+            self._finish_root(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._finish_node(run_id, None, "error")
+        if parent_run_id is None:
+            self._finish_root(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node, branch = self._node_of(metadata)
+        with self._lock:
+            root = self._root(run_id, parent_run_id)
+            self._llm_starts[run_id] = (root, node, branch, time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self.on_chat_model_start(
+            serialized, prompts, run_id=run_id, parent_run_id=parent_run_id, metadata=metadata
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._llm_starts.pop(run_id, None)
+        if started is None:
+            return
+        root, node, branch, start = started
+
+        input_tokens = cached_input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                # Prompt tokens the provider read from its prompt cache, included in input_tokens
+                cached_input_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                output_tokens += usage.get("output_tokens", 0)
+
+        node = node or "unknown"
+        LLM_DURATION.observe(time.perf_counter() - start, node=node)
+        LLM_TOKENS.inc(input_tokens, node=node, direction="input")
+        LLM_TOKENS.inc(cached_input_tokens, node=node, direction="cached_input")
+        LLM_TOKENS.inc(output_tokens, node=node, direction="output")
+        with self._lock:
+            self._add(
+                root,
+                node,
+                branch,
+                llm_calls=1,
+                input_tokens=input_tokens,
+                cached_input_tokens=cached_input_tokens,
+                output_tokens=output_tokens,
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_starts.pop(run_id, None)
+
+    def summary(self, run_id: UUID | str | None = None) -> dict:
+        """Return the summary of `run_id`, or of the most recent run"""
+        with self._lock:
+            if not self._summaries:
+                return {}
+            if run_id is None:
+                summary = next(reversed(self._summaries.values()))
+            else:
+                summary = self._summaries.get(UUID(str(run_id)), {})
+            return {key: value for key, value in summary.items() if key != "started_at"}
@@ -0,0 +1,41 @@
+from langchain_core.runnables import RunnableConfig
+from src.blob_store import store_for
+from src.configuration import Configuration
+from src.context import compact_contexts
+from src.schema import get_field
+from src.state import AgentState
+
+
+def compact_context(state: AgentState, config: RunnableConfig):
+    """This node deduplicates, ranks and trims the researched section contexts to the token budget"""
+
+    # Load configuration
+    configuration = Configuration.from_runnable_config(config)
+
+    if not configuration.context_compaction:
+        return {}
+
+    researched_sections = state.get("researched_sections", [])
+    store = store_for(configuration) if configuration.state_blob_refs else None
+
+    sections_results = []
+    for section in researched_sections:
+        results = get_field(section, "search_results", [])
+        results = (store.resolve(results) if store else results) or []
+        sections_results.append(
+            [item if isinstance(item, dict) else item.model_dump() for item in results]
+        )
+
+    contexts, run_stats = compact_contexts(
+        sections_results,
+        total_budget=configuration.context_token_budget,
+        similarity_threshold=configuration.context_similarity_threshold,
+    )
+
+    section_contexts = {}
+    for section, context in zip(researched_sections, contexts):
+        if store:
+            context = store.put(context)
+        section_contexts[get_field(section, "title", "")] = context
+
+    return {"section_contexts": section_contexts, "run_stats": run_stats}
@@ -1,7 +1,12 @@
 from langchain_core.runnables import RunnableConfig
-from langchain.chat_models import init_chat_model
-
-llm = init_chat_model(model="openai:gpt-5-nano")
+from src.clients import get_chat_model
+from src.blob_store import store_for
+from src.configuration import Configuration
+from src.nodes.plan_searches import query_dedup_stats
+from src.prompts import assemble_messages, prompt_block
+from src.scheduler import SCHEDULER, prompt_tokens, provider_of
+from src.schema import get_field
+from src.templates import resolve_template
 
 
 AGENT_PROMPT = """
@@ -44,47 +49,48 @@ You are an expert academic writing assistant. Your job is to produce a coherent,
 - Do **not** include meta-comments, analysis, or this instruction block.
 - Preserve all formatting/markup present in the TEMPLATE and fill it in; do not add new top-level sections unless the TEMPLATE explicitly asks for them.
 - If information is insufficient for a required subsection, write the best academically neutral version possible and mark a short TODO in brackets (e.g., “[TODO: add dataset statistics when available]”).
+"""
 
-#TEMPLATE:
-<template>
-{template}
-</template>
-
-#SECTION THAT HAVE CONTEXT:
-<section_with_context>
-{section_with_context}
-</section_with_context>
 
-#SECTION THAT DON'T HAVE CONTEXT:
-<section_without_context>
-{section_without_context}
-</section_without_context>
-"""
+def _drafting_model(config: RunnableConfig) -> tuple:
+    """Return the run's `drafting_model` name and its shared chat model"""
+    model_name = Configuration.from_runnable_config(config).drafting_model
+    return model_name, get_chat_model(model_name)
 
 
-def generate_report(state, config: RunnableConfig):
-    """This node generates a report from the researched sections"""
+def _build_messages(state, config: RunnableConfig) -> list[dict]:
+    """Build the drafting messages from the researched and remaining sections"""
 
     # Get the researched sections
     researched_sections = state.get("researched_sections", [])
 
     # Load configuration
-    configuration = config.get("configurable", {})
+    configuration = Configuration.from_runnable_config(config)
+
+    _template = resolve_template(configuration)
+
+    # Use the compacted contexts when the compaction step produced them
+    section_contexts = state.get("section_contexts") or {}
 
-    _template = configuration.get("document_template", "")
+    # Contexts may be blob store references, which are loaded only here
+    store = store_for(configuration)
+
+    def _context(s) -> str:
+        title = get_field(s, "title", "")
+        return store.resolve(section_contexts.get(title, get_field(s, "section_context", "")))
 
     other_sections = []
     for s in state.get("sections", []):
-        if not getattr(s, "require_research", False):
+        if not get_field(s, "require_research", False):
             other_sections.append(s)
 
     _section_with_context = "\n\n".join(
         [
             "\n".join(
                 [
-                    f"Title: {(getattr(s, 'title', '') or '').strip()}",
-                    f"Description: {(getattr(s, 'description', '') or '').strip()}",
-                    f"{(getattr(s, 'title', '') or '').strip()} section context: {(getattr(s, 'section_context', '') or '').strip()}",
+                    f"Title: {(get_field(s, 'title', '') or '').strip()}",
+                    f"Description: {(get_field(s, 'description', '') or '').strip()}",
+                    f"{(get_field(s, 'title', '') or '').strip()} section context: {(_context(s) or '').strip()}",
                 ]
             )
             for s in researched_sections
@@ -95,26 +101,52 @@ def generate_report(state, config: RunnableConfig):
         [
             "\n".join(
                 [
-                    f"Title: {(getattr(s, 'title', '') or '').strip()}",
-                    f"Description: {(getattr(s, 'description', '') or '').strip()}",
-                    f"{(getattr(s, 'title', '') or '').strip()} section context: ",
+                    f"Title: {(get_field(s, 'title', '') or '').strip()}",
+                    f"Description: {(get_field(s, 'description', '') or '').strip()}",
+                    f"{(get_field(s, 'title', '') or '').strip()} section context: ",
                 ]
             )
             for s in other_sections
         ]
     )
 
-    system_instruction = AGENT_PROMPT.format(
-        template=_template,
-        section_with_context=_section_with_context,
-        section_without_context=_section_without_context,
+    # The template is the same for every paper of a paper type, so it stays in the cached prefix
+    return assemble_messages(
+        configuration.drafting_model,
+        AGENT_PROMPT,
+        static=[prompt_block("TEMPLATE", "template", _template)],
+        specific=[
+            prompt_block("SECTION THAT HAVE CONTEXT", "section_with_context", _section_with_context),
+            prompt_block("SECTION THAT DON'T HAVE CONTEXT", "section_without_context", _section_without_context),
+        ],
+        request="Generate a report from the provided sections",
     )
 
-    messages = [
-        {"role": "system", "content": system_instruction},
-        {"role": "user", "content": "Generate a report from the provided sections"},
-    ]
 
-    response = llm.invoke(messages)
+def generate_report(state, config: RunnableConfig):
+    """This node generates a report from the researched sections"""
+
+    # Stream the draft so callers using stream_mode="messages" receive tokens as they are written
+    # The stream is rate limited but neither retried nor hedged here: a failed draft is
+    # retried by the node's retry policy, and a duplicate draft would double the cost
+    model_name, model = _drafting_model(config)
+    messages = _build_messages(state, config)
+    response = None
+    with SCHEDULER.slot(provider_of(model_name), tokens=prompt_tokens(messages)):
+        for chunk in model.stream(messages, config):
+            response = chunk if response is None else response + chunk
+
+    return {"final_report": response.content if response is not None else "", "run_stats": query_dedup_stats(state)}
+
+
+async def agenerate_report(state, config: RunnableConfig):
+    """Async version of `generate_report`"""
+
+    model_name, model = _drafting_model(config)
+    messages = _build_messages(state, config)
+    response = None
+    async with SCHEDULER.aslot(provider_of(model_name), tokens=prompt_tokens(messages)):
+        async for chunk in model.astream(messages, config):
+            response = chunk if response is None else response + chunk
 
-    return {"final_report": response.content}
+    return {"final_report": response.content if response is not None else "", "run_stats": query_dedup_stats(state)}
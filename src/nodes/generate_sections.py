@@ -1,42 +1,42 @@
-from langchain.chat_models import init_chat_model
+import asyncio
+import hashlib
+import os
+
+from src.cache import SQLiteCache, get_cache
+from src.clients import get_structured_model
+from src.configuration import Configuration
+from src.progress import emit_progress
+from src.nodes.speculative_research import aresearch_while_planning, research_while_planning
+from src.prompts import assemble_messages, prompt_block
+from src.scheduler import acall_llm, call_llm
 from src.state import AgentState
+from src.templates import OutlineSection, compile_template, resolve_template
 from pydantic import BaseModel, Field
 from pydantic import ConfigDict
 from langchain_core.runnables import RunnableConfig
 from src.schema import Section
 
 
-class Sections(BaseModel):
+class SectionDescriptions(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    sections: list[Section] = Field(description="The sections of the topic")
-
+    descriptions: list[str] = Field(
+        description="One topic-specific description per section of the outline, in outline order"
+    )
 
-structured_llm = init_chat_model(
-    model="gpt-4.1-nano", model_provider="openai"
-).with_structured_output(Sections)
 
 AGENT_PROMPT = """
 # Identity
-You are a helpful assistant that generates a list of sections for a given topic.
+You are a helpful assistant that plans the sections of a research paper on a given topic.
 
 # Task
 You are provided with:
 1. A **topic** that defines the subject.
-2. A **template** that specifies the section titles to generate.
+2. An **outline** of the paper: the numbered section titles, each with the points the template asks it to cover.
 
-Your goal is to produce a **list of sections**, one for each item in the template.
+Your goal is to write a **description** for every section of the outline.
 
 # Guidelines
-- Always generate **all sections listed in the template**, in the same order.
-- Return a **list of sections** where each section has exactly:
-  * `title`: A concise title (use the template wording as-is, or clarify if needed).
-  * `description`: A topic-specific coverage plan for what to include in that section.
-  * `require_research`: A boolean indicating whether this section needs external research (true) or can be written from other sections' content (false).
-  * `search_queries`: Default empty list.
-  * `search_results`: Default empty list.
-  * `section_context`: Default empty string.
-  
-  
+- Return exactly one description per section of the outline, in the same order as the outline.
 - Each description must:
   - Be grounded in the provided topic (avoid generic phrasing like "This section should...").
   - State **what content should be covered**, not just what the section “is about.”
@@ -49,107 +49,171 @@ Your goal is to produce a **list of sections**, one for each item in the templat
     * **Deliverables** such as figures, tables, or diagrams if useful.
 - The descriptions must be **actionable and specific**, so they can guide someone writing the section.
 - Do not restate the section title in the description.
-- Do not omit any section from the template.
-- For `require_research`: Set to `true` for sections that need external data, studies, or current information (e.g., "Related Work", "Results", "Analysis"). Set to `false` for sections that can be written from other sections' content (e.g., "Introduction", "Conclusion", "Organization of the paper").
-
-# Context
+"""
 
-<Topic>
-{topic}
-</Topic>
 
-<Template>
-{template}
-</Template>
-"""
+def _outline(config: RunnableConfig) -> tuple[str, tuple[OutlineSection, ...]]:
+    """Return the template of the run and its compiled outline"""
+    template = resolve_template(Configuration.from_runnable_config(config))
+    outline = compile_template(template)
+    if not outline:
+        raise ValueError("The document template has no `## ` section headings")
+    return template, outline
 
 
-default_template = """
-            # Research Paper — Analytical Paper
+def render_outline(outline: tuple[OutlineSection, ...]) -> str:
+    """Render the outline as the numbered list of sections and points given to the planner"""
+    return "\n".join(
+        "\n".join([f"{i}. {section.title}", *(f"   - {point}" for point in section.points)])
+        for i, section in enumerate(outline, 1)
+    )
 
-            ## Title Page
-            - **Title**
-            - **Authors & Affiliations**
-            - **Correspondence**
 
-            ## Abstract (150–250 words)
-            - Concise summary of the research question, sources analyzed, methods of analysis, and main insights.
-            - Should emphasize interpretation rather than taking a definitive stance.
-            - No citations here.
+def planner_cache_key(model: str, topic: str, template: str) -> str:
+    """Key a planner result by model, prompt version, normalized topic and template"""
+    digest = hashlib.sha256()
+    for part in (
+        model,
+        hashlib.sha256(AGENT_PROMPT.encode()).hexdigest(),
+        " ".join(topic.lower().split()),
+        template.strip(),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"planner:{digest.hexdigest()}"
+
+
+def _planner_cache(configuration: Configuration) -> SQLiteCache | None:
+    if not configuration.planner_cache:
+        return None
+    return get_cache(
+        os.path.join(configuration.cache_dir, "planner.sqlite"),
+        ttl_seconds=configuration.planner_cache_ttl,
+        max_entries=configuration.planner_cache_max_entries,
+    )
 
-            ## Introduction
-            - Background and motivation
-            - Research question(s) or guiding problem
-            - Scope and boundaries of the analysis
-            - Contributions (bulleted list of what the paper adds)
-            - Organization of the paper
 
-            ## Related Work / Literature Context
-            - Synthesize prior literature and perspectives
-            - Highlight debates, patterns, or trends relevant to the analysis
-            - Identify gaps that your analysis addresses
+def clear_planner_cache(config: RunnableConfig | None = None) -> None:
+    """Drop every cached planner result, e.g. after editing `AGENT_PROMPT` outside of version control"""
+    configuration = Configuration.from_runnable_config(config)
+    get_cache(
+        os.path.join(configuration.cache_dir, "planner.sqlite"),
+        ttl_seconds=configuration.planner_cache_ttl,
+        max_entries=configuration.planner_cache_max_entries,
+    ).clear("planner:")
 
-            ## Analytical Framework / Method
-            - Explain the framework, models, or methods used for analysis
-            - Data, texts, or materials examined
-            - Criteria for inclusion/exclusion
-            - Assumptions and rationale
 
-            ## Analysis
-            - Systematic breakdown of the evidence (thematic, chronological, comparative, etc.)
-            - Tables, figures, or diagrams to support interpretation
-            - Multiple subsections allowed (###) to handle dimensions of analysis
+def _emit_outline(outline: tuple[OutlineSection, ...]) -> None:
+    emit_progress(
+        "outline",
+        sections=[
+            {"title": s.title, "require_research": s.require_research} for s in outline
+        ],
+    )
 
-            ## Discussion
-            - Interpret the findings: what do they mean?
-            - Connections back to literature
-            - Strengths and limitations of your analysis
-            - Broader implications
 
-            ## Conclusion
-            - Recap of key insights
-            - What new understanding the analysis provides
-            - Implications for theory, practice, or future research
+def build_sections(outline: tuple[OutlineSection, ...], descriptions: list[str]) -> list[Section]:
+    """Combine the outline with the planner's descriptions.
 
-            ## Future Work
-            - Open questions raised by the analysis
-            - Possible extensions of the framework or data
-            - Recommendations for deeper or comparative studies
+    Extra descriptions are dropped; a section the planner left without one is
+    described by its template points.
+    """
+    sections = []
+    for i, outline_section in enumerate(outline):
+        description = descriptions[i].strip() if i < len(descriptions) else ""
+        sections.append(
+            Section(
+                title=outline_section.title,
+                description=description or "; ".join(outline_section.points),
+                require_research=outline_section.require_research,
+            )
+        )
+    return sections
 
-            ## References
-            - Full bibliography in the required style (APA, IEEE, etc.)
 
-            ## Appendices (optional)
-            - Extended tables, coding schemes, or supplementary analysis
-            """
+def _cache_hit_update(outline: tuple[OutlineSection, ...], cached: dict) -> dict:
+    sections = build_sections(outline, SectionDescriptions.model_validate(cached).descriptions)
+    return {"sections": sections, "run_stats": {"planner_cache_hits": 1}}
 
 
-def generate_sections(state: AgentState, config: RunnableConfig):
+def _build_messages(state: AgentState, outline: tuple[OutlineSection, ...], model: str) -> list[dict]:
+    """Build the planner messages for the topic and outline of this run"""
 
     # Get topic to generate sections for
     topic = state["topic"]
 
-    # Load configuration
-    configurable = config.get("configurable", {})
+    # The outline only changes with the template, so it stays in the cached prefix
+    return assemble_messages(
+        model,
+        AGENT_PROMPT,
+        static=[prompt_block("OUTLINE", "Outline", render_outline(outline))],
+        specific=[prompt_block("TOPIC", "Topic", topic)],
+        request=f"Describe the {len(outline)} sections of the outline for the given topic",
+    )
+
+
+def _plan_sections(state: AgentState, config: RunnableConfig) -> dict:
+    template, outline = _outline(config)
+    _emit_outline(outline)
 
-    template = configurable.get("document_template", default_template)
+    # Reuse the descriptions of an earlier run with the same model, topic and template
+    configuration = Configuration.from_runnable_config(config)
+    cache = _planner_cache(configuration)
+    key = planner_cache_key(configuration.planner_model, state["topic"], template)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return _cache_hit_update(outline, cached)
 
-    system_instruction = AGENT_PROMPT.format(
-        topic=topic,
-        template=template,
+    model = get_structured_model(configuration.planner_model, SectionDescriptions)
+    messages = _build_messages(state, outline, configuration.planner_model)
+    response = call_llm(
+        lambda: model.invoke(messages), configuration.planner_model, "plan_sections", messages, configuration
     )
+    sections = build_sections(outline, response.descriptions)
+
+    if cache is None:
+        return {"sections": sections}
+
+    cache.set(key, response.model_dump())
+    return {"sections": sections, "run_stats": {"planner_cache_misses": 1}}
+
+
+async def _aplan_sections(state: AgentState, config: RunnableConfig) -> dict:
+    template, outline = _outline(config)
+    _emit_outline(outline)
+
+    configuration = Configuration.from_runnable_config(config)
+    cache = _planner_cache(configuration)
+    key = planner_cache_key(configuration.planner_model, state["topic"], template)
+    cached = await asyncio.to_thread(cache.get, key) if cache is not None else None
+    if cached is not None:
+        return _cache_hit_update(outline, cached)
+
+    model = get_structured_model(configuration.planner_model, SectionDescriptions)
+    messages = _build_messages(state, outline, configuration.planner_model)
+    response = await acall_llm(
+        lambda: model.ainvoke(messages), configuration.planner_model, "plan_sections", messages, configuration
+    )
+    sections = build_sections(outline, response.descriptions)
+
+    if cache is None:
+        return {"sections": sections}
+
+    await asyncio.to_thread(cache.set, key, response.model_dump())
+    return {"sections": sections, "run_stats": {"planner_cache_misses": 1}}
+
+
+def generate_sections(state: AgentState, config: RunnableConfig):
+    """This node plans the sections: the outline comes from the template, the model only describes each section"""
 
-    messages = [
-        {
-            "role": "system",
-            "content": system_instruction,
-        },
-        {
-            "role": "user",
-            "content": "Generate sections for the given topic",
-        },
-    ]
+    # Speculative mode researches the template's sections while the planner runs
+    if Configuration.from_runnable_config(config).speculative_research:
+        return research_while_planning(state, config, _plan_sections)
+    return _plan_sections(state, config)
 
-    response = structured_llm.invoke(messages)
 
-    return {"sections": response.sections}
+async def agenerate_sections(state: AgentState, config: RunnableConfig):
+    """Async version of `generate_sections`"""
+    if Configuration.from_runnable_config(config).speculative_research:
+        return await aresearch_while_planning(state, config, _aplan_sections)
+    return await _aplan_sections(state, config)
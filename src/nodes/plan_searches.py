@@ -0,0 +1,173 @@
+import asyncio
+
+from langchain_core.runnables import RunnableConfig
+from src.blob_store import store_for
+from src.configuration import Configuration
+from src.progress import emit_progress
+from src.state import AgentState, merge_stats
+from src.text import jaccard, token_set
+from src.nodes.research_agent.nodes.generate_queries import agenerate_queries, generate_queries
+from src.nodes.research_agent.nodes.web_research import (
+    asearch_queries_with_config,
+    build_researched_section,
+    render_context,
+    search_queries_with_config,
+    section_results,
+)
+
+
+def dedupe_queries(
+    queries_per_section: list[list[str]], threshold: float
+) -> tuple[list[str], list[list[int]]]:
+    """Merge duplicate and near-duplicate queries across sections.
+
+    Two queries are merged when the Jaccard similarity of their token sets is at
+    least `threshold`; the first query seen represents the group. Returns the
+    distinct queries and, for every section, the indices of the distinct queries
+    it asked for (in the section's own order, without repeats).
+    """
+    distinct_queries: list[str] = []
+    distinct_tokens: list[frozenset] = []
+    assignments: list[list[int]] = []
+
+    for queries in queries_per_section:
+        assigned: list[int] = []
+        for query in queries:
+            tokens = token_set(query)
+            match = next(
+                (i for i, other in enumerate(distinct_tokens) if jaccard(tokens, other) >= threshold),
+                None,
+            )
+            if match is None:
+                match = len(distinct_queries)
+                distinct_queries.append(query)
+                distinct_tokens.append(tokens)
+            if match not in assigned:
+                assigned.append(match)
+        assignments.append(assigned)
+
+    return distinct_queries, assignments
+
+
+def query_dedup_ratio(run_stats: dict) -> float:
+    """Share of the requested queries that deduplication saved, from the summed counts of `run_stats`"""
+    requested = run_stats.get("queries_requested", 0)
+    return 1 - run_stats.get("queries_executed", 0) / requested if requested else 0.0
+
+
+def query_dedup_stats(state: dict) -> dict:
+    """The run's `query_dedup_ratio`, for the node that finishes the run to add to `run_stats`.
+
+    The ratio is only written once the counts are complete, since `run_stats` is
+    merged by summing and a ratio written earlier would be added to.
+    """
+    run_stats = state.get("run_stats") or {}
+    if "queries_requested" not in run_stats:
+        return {}
+    return {"query_dedup_ratio": query_dedup_ratio(run_stats)}
+
+
+def _section_queries_update(state: dict, response: dict) -> dict:
+    return {
+        "section_queries": [
+            {"section": state["section"], "search_queries": response["search_queries"]}
+        ]
+    }
+
+
+def generate_section_queries(state: dict, config: RunnableConfig):
+    """This node generates the search queries for one section and hands them to the planning stage"""
+    response = generate_queries(state, config)
+    return _section_queries_update(state, response)
+
+
+async def agenerate_section_queries(state: dict, config: RunnableConfig):
+    """Async version of `generate_section_queries`"""
+    response = await agenerate_queries(state, config)
+    return _section_queries_update(state, response)
+
+
+def _plan(state: AgentState, configuration: Configuration) -> tuple[list[dict], list[str], list[list[int]]]:
+    """Deduplicate the queries of every section"""
+    section_queries = state.get("section_queries", [])
+    distinct_queries, assignments = dedupe_queries(
+        [item["search_queries"] for item in section_queries],
+        threshold=configuration.query_dedup_threshold,
+    )
+    return section_queries, distinct_queries, assignments
+
+
+def _plan_searches_update(
+    section_queries: list[dict],
+    distinct_queries: list[str],
+    assignments: list[list[int]],
+    responses: list[dict],
+    run_stats: dict,
+    configuration: Configuration,
+) -> dict:
+    """Hand every section the results of the queries it asked for"""
+    store = store_for(configuration) if configuration.state_blob_refs else None
+    researched_sections = []
+    for item, assigned in zip(section_queries, assignments):
+        flattened_results, passage_stats = section_results(
+            item["section"], [responses[i] for i in assigned], configuration
+        )
+        run_stats = merge_stats(run_stats, passage_stats)
+        section_dict = build_researched_section(
+            item["section"],
+            item["search_queries"],
+            flattened_results,
+            render_context(flattened_results),
+            store,
+        )
+        researched_sections.append(section_dict)
+        emit_progress(
+            "section_researched",
+            title=section_dict.get("title", ""),
+            queries=len(item["search_queries"]),
+            results=len(flattened_results),
+        )
+
+    requested = sum(len(item["search_queries"]) for item in section_queries)
+    run_stats = {
+        **run_stats,
+        "queries_requested": requested,
+        "queries_executed": len(distinct_queries),
+    }
+
+    return {"researched_sections": researched_sections, "run_stats": run_stats}
+
+
+def plan_searches(state: AgentState, config: RunnableConfig):
+    """This node deduplicates the queries of all sections, runs each distinct query once and hands every section its results"""
+
+    # Load configuration
+    configuration = Configuration.from_runnable_config(config)
+
+    section_queries, distinct_queries, assignments = _plan(state, configuration)
+
+    responses, run_stats = search_queries_with_config(distinct_queries, configuration)
+
+    return _plan_searches_update(
+        section_queries, distinct_queries, assignments, responses, run_stats, configuration
+    )
+
+
+async def aplan_searches(state: AgentState, config: RunnableConfig):
+    """Async version of `plan_searches`"""
+
+    configuration = Configuration.from_runnable_config(config)
+
+    section_queries, distinct_queries, assignments = _plan(state, configuration)
+
+    responses, run_stats = await asearch_queries_with_config(distinct_queries, configuration)
+
+    return await asyncio.to_thread(
+        _plan_searches_update,
+        section_queries,
+        distinct_queries,
+        assignments,
+        responses,
+        run_stats,
+        configuration,
+    )
@@ -1,7 +1,10 @@
+from src.configuration import Configuration
 from src.state import ResearchAgentState
 from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
-from langchain.chat_models import init_chat_model
+from src.clients import get_structured_model
+from src.prompts import assemble_messages, prompt_block
+from src.scheduler import acall_llm, call_llm
 
 
 class SearchQueries(BaseModel):
@@ -10,14 +13,8 @@ class SearchQueries(BaseModel):
     )
 
 
-structured_llm = init_chat_model(
-    model="gpt-4.1-nano", model_provider="openai"
-).with_structured_output(SearchQueries)
-
-
 GENERATE_QUERIES_PROMPT = """
-
-You are a helpful assistant that generates search queries for the {section_title} section of a research paper.
+You are a helpful assistant that generates search queries for one section of a research paper.
 
 # Task
 You are provided with:
@@ -30,23 +27,12 @@ Your goal is to produce a **list of search queries** to find relevant informatio
 - Make sure the generated search queries are specific to the section and its description.
 - Make sure the generated search queries are not too broad or too narrow.
 - Make sure the search queries are suitable for the web search engine.
-
-# SECTION TITLE
-<section_title>
-{section_title}
-</section_title>
-
-# SECTION DESCRIPTION
-<section_description>
-{section_description}
-</section_description>
+- List the search queries from most to least important, since later queries may be skipped once enough evidence is found.
 """
 
 
-def generate_queries(state: ResearchAgentState, config: RunnableConfig):
-    """
-    This node takes what the section is about and generates search queries to find relevant information.
-    """
+def _build_messages(state: ResearchAgentState, model: str) -> list[dict]:
+    """Build the query generation messages for the section"""
 
     # Get the section title
     section_title = state["section"].title
@@ -54,17 +40,44 @@ def generate_queries(state: ResearchAgentState, config: RunnableConfig):
     # Get the section description
     section_description = state["section"].description
 
-    system_instruction = GENERATE_QUERIES_PROMPT.format(
-        section_title=section_title,
-        section_description=section_description,
+    return assemble_messages(
+        model,
+        GENERATE_QUERIES_PROMPT,
+        specific=[
+            prompt_block("SECTION TITLE", "section_title", section_title),
+            prompt_block("SECTION DESCRIPTION", "section_description", section_description),
+        ],
+        request="Generate search queries for the given section.",
     )
 
+
+def generate_queries(state: ResearchAgentState, config: RunnableConfig):
+    """
+    This node takes what the section is about and generates search queries to find relevant information.
+    """
+
+    # Load configuration
+    configuration = Configuration.from_runnable_config(config)
+
     # Generate search queries
-    messages = [
-        {"role": "system", "content": system_instruction},
-        {"role": "user", "content": "Generate search queries for the given section."},
-    ]
+    model = get_structured_model(configuration.query_model, SearchQueries)
+    messages = _build_messages(state, configuration.query_model)
+    response = call_llm(
+        lambda: model.invoke(messages), configuration.query_model, "generate_queries", messages, configuration
+    )
 
-    response = structured_llm.invoke(messages)
+    return {"search_queries": response.queries}
+
+
+async def agenerate_queries(state: ResearchAgentState, config: RunnableConfig):
+    """Async version of `generate_queries`"""
+
+    configuration = Configuration.from_runnable_config(config)
+
+    model = get_structured_model(configuration.query_model, SearchQueries)
+    messages = _build_messages(state, configuration.query_model)
+    response = await acall_llm(
+        lambda: model.ainvoke(messages), configuration.query_model, "generate_queries", messages, configuration
+    )
 
     return {"search_queries": response.queries}
@@ -1,60 +1,460 @@
 from langchain_core.runnables import RunnableConfig
-from src.state import ResearchAgentState
-from tavily import TavilyClient
+from src.blob_store import BlobStore, store_for
+from src.cache import SQLiteCache, get_cache
+from src.configuration import Configuration
+from src.metrics import SEARCH_DURATION, SEARCH_REQUESTS
+from src.novelty import NoveltyTracker
+from src.progress import emit_progress
+from src.schema import get_field
+from src.search_backends import SearchBackend, TavilyBackend, search_backend
+from src.state import ResearchAgentState, merge_stats
+from src.text import estimate_tokens, normalize_text
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
+import time
 from pydantic import BaseModel
 
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
-client = TavilyClient(api_key=TAVILY_API_KEY)
+def search_cache_key(
+    query: str, max_results: int, topic: str, raw_content: bool = False, backend: str = "tavily"
+) -> str:
+    """Build the cache key for a query and the search options that affect its results"""
+    options = f"{max_results}:raw" if raw_content else f"{max_results}"
+    if backend != "tavily":
+        options = f"{options}:{backend}"
+    return f"search:{topic}:{options}:{normalize_text(query)}"
 
 
-def search_web(state: ResearchAgentState, config: RunnableConfig):
-    """This node searches the web for the search queries and returns the search results"""
+def _record_search(start: float, response: dict) -> tuple[dict, float]:
+    elapsed = time.perf_counter() - start
+    SEARCH_REQUESTS.inc(status="ok" if response else "error")
+    SEARCH_DURATION.observe(elapsed)
+    return response, elapsed
 
-    # Get the search queries
-    search_queries = state["search_queries"]
 
-    search_results = []
+def _search(
+    backend: SearchBackend,
+    query: str,
+    max_results: int,
+    topic: str,
+    timeout: float,
+    raw_content: bool = False,
+) -> tuple[dict, float]:
+    """Run a single query on `backend`, returning its response (empty if it fails) and latency"""
+    start = time.perf_counter()
+    try:
+        response = backend.search(query, max_results, topic, timeout, raw_content)
+    except Exception as e:
+        logger.warning("Web search failed for query %r: %s", query, e)
+        response = {}
+    return _record_search(start, response)
+
+
+async def _asearch(
+    backend: SearchBackend,
+    query: str,
+    max_results: int,
+    topic: str,
+    timeout: float,
+    raw_content: bool = False,
+) -> tuple[dict, float]:
+    """Async version of `_search`"""
+    start = time.perf_counter()
+    try:
+        response = await backend.asearch(query, max_results, topic, timeout, raw_content)
+    except Exception as e:
+        logger.warning("Web search failed for query %r: %s", query, e)
+        response = {}
+    return _record_search(start, response)
+
+
+def _fetch_stats(fetched: list[tuple[dict, float]]) -> dict:
+    stats = {
+        "search_calls": len(fetched),
+        "search_errors": sum(1 for response, _ in fetched if not response),
+        "search_seconds": sum(elapsed for _, elapsed in fetched),
+    }
+    # Tiered search tags every response with where it was answered
+    sources = [response.get("source") for response, _ in fetched if response]
+    if any(sources):
+        stats["search_local_hits"] = sources.count("local")
+        stats["search_web_fallbacks"] = sources.count("web")
+    return stats
+
+
+def _read_cache(
+    search_queries: list[str],
+    max_results: int,
+    topic: str,
+    cache: SQLiteCache | None,
+    refresh: bool,
+    raw_content: bool = False,
+    backend: str = "tavily",
+) -> tuple[list[dict | None], dict]:
+    """Look the queries up in the cache, returning the cached responses and hit/miss counts"""
+    responses: list[dict | None] = [None] * len(search_queries)
+    if cache is None:
+        return responses, {}
+
+    stats = {"search_cache_hits": 0, "search_cache_misses": 0}
+    for i, query in enumerate(search_queries):
+        cached = None if refresh else cache.get(search_cache_key(query, max_results, topic, raw_content, backend))
+        if cached is None:
+            stats["search_cache_misses"] += 1
+        else:
+            stats["search_cache_hits"] += 1
+            responses[i] = cached
+    return responses, stats
+
+
+def _write_cache(
+    queries: list[str],
+    responses: list[dict],
+    max_results: int,
+    topic: str,
+    cache: SQLiteCache | None,
+    raw_content: bool = False,
+    backend: str = "tavily",
+) -> None:
+    """Store the successful responses in the cache"""
+    if cache is None:
+        return
+    for query, response in zip(queries, responses):
+        if response:
+            cache.set(search_cache_key(query, max_results, topic, raw_content, backend), response)
+
+
+def run_queries(
+    search_queries: list[str],
+    max_concurrency: int,
+    timeout: float,
+    max_results: int = 5,
+    topic: str = "general",
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    backend: SearchBackend | None = None,
+    raw_content: bool = False,
+) -> tuple[list[dict], dict]:
+    """Run the search queries concurrently and return the responses in query order.
+
+    Responses found in `cache` are reused unless `refresh` is set; fresh successful
+    responses are written back. Also returns the cache hit/miss counts. Queries go
+    to `backend`, Tavily without retries by default. With `raw_content`, the full
+    page content of every result is requested too.
+    """
+    backend = backend or TavilyBackend()
+    responses, stats = _read_cache(
+        search_queries, max_results, topic, cache, refresh, raw_content, backend.name
+    )
+
+    pending = [i for i, response in enumerate(responses) if response is None]
+    if pending:
+        max_workers = max(1, min(max_concurrency, len(pending)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = list(
+                executor.map(
+                    lambda i: _search(backend, search_queries[i], max_results, topic, timeout, raw_content),
+                    pending,
+                )
+            )
+        for i, (response, _) in zip(pending, fetched):
+            responses[i] = response
+        _write_cache(
+            [search_queries[i] for i in pending],
+            [response for response, _ in fetched],
+            max_results,
+            topic,
+            cache,
+            raw_content,
+            backend.name,
+        )
+        stats = {**stats, **_fetch_stats(fetched)}
+
+    return responses, stats
+
+
+async def arun_queries(
+    search_queries: list[str],
+    max_concurrency: int,
+    timeout: float,
+    max_results: int = 5,
+    topic: str = "general",
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    backend: SearchBackend | None = None,
+    raw_content: bool = False,
+) -> tuple[list[dict], dict]:
+    """Async version of `run_queries`, running at most `max_concurrency` queries at once"""
+    backend = backend or TavilyBackend()
+    responses, stats = await asyncio.to_thread(
+        _read_cache, search_queries, max_results, topic, cache, refresh, raw_content, backend.name
+    )
+
+    pending = [i for i, response in enumerate(responses) if response is None]
+    if pending:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(i: int) -> tuple[dict, float]:
+            async with semaphore:
+                return await _asearch(backend, search_queries[i], max_results, topic, timeout, raw_content)
+
+        fetched = await asyncio.gather(*(fetch(i) for i in pending))
+        for i, (response, _) in zip(pending, fetched):
+            responses[i] = response
+        await asyncio.to_thread(
+            _write_cache,
+            [search_queries[i] for i in pending],
+            [response for response, _ in fetched],
+            max_results,
+            topic,
+            cache,
+            raw_content,
+            backend.name,
+        )
+        stats = {**stats, **_fetch_stats(fetched)}
+
+    return responses, stats
+
+
+def _search_kwargs(configuration: Configuration) -> dict:
+    """Translate the search and cache settings of `configuration` into `run_queries` arguments"""
+    cache = None
+    if configuration.search_cache_mode != "bypass":
+        cache = get_cache(
+            os.path.join(configuration.cache_dir, "search.sqlite"),
+            ttl_seconds=configuration.search_cache_ttl,
+            max_entries=configuration.search_cache_max_entries,
+        )
+
+    return {
+        "max_concurrency": configuration.search_max_concurrency,
+        "timeout": configuration.search_timeout,
+        "max_results": configuration.search_max_results,
+        "topic": configuration.search_topic,
+        "cache": cache,
+        "refresh": configuration.search_cache_mode == "refresh",
+        "backend": search_backend(configuration),
+        "raw_content": configuration.passage_index,
+    }
+
+
+def search_queries_with_config(
+    search_queries: list[str], configuration: Configuration
+) -> tuple[list[dict], dict]:
+    """Run the search queries with the search and cache settings of `configuration`"""
+    return run_queries(search_queries, **_search_kwargs(configuration))
+
+
+async def asearch_queries_with_config(
+    search_queries: list[str], configuration: Configuration
+) -> tuple[list[dict], dict]:
+    """Async version of `search_queries_with_config`"""
+    return await arun_queries(search_queries, **_search_kwargs(configuration))
+
+
+class AdaptiveSearch:
+    """Hands out a section's queries in batches until its evidence saturates.
+
+    Queries are taken in the order they were generated. After each batch, the search
+    stops once the batch's novelty falls below the threshold, the section's results
+    exceed the token budget or the query budget is spent.
+    """
+
+    def __init__(self, search_queries: list[str], configuration: Configuration):
+        self.search_queries = search_queries
+        self.batch_size = max(1, configuration.adaptive_search_batch_size)
+        self.max_queries = configuration.adaptive_search_max_queries
+        self.novelty_threshold = configuration.adaptive_search_novelty_threshold
+        self.token_budget = configuration.adaptive_search_token_budget
+
+        self.tracker = NoveltyTracker()
+        self.issued: list[str] = []
+        self.responses: list[dict] = []
+        self.stats: dict = {}
+        self.tokens = 0
+        self.saturated = False
+
+    def next_batch(self) -> list[str]:
+        """Return the next queries to run, or an empty list once the search should stop"""
+        if self.saturated or self.tokens >= self.token_budget:
+            return []
+        limit = min(len(self.search_queries), self.max_queries)
+        start = len(self.issued)
+        return self.search_queries[start : min(start + self.batch_size, limit)]
 
-    for query in search_queries:
-        results = client.search(query, max_results=5, topic="general")
-        search_results.append(results)
+    def record(self, batch: list[str], responses: list[dict], stats: dict) -> None:
+        """Record the responses of a batch returned by `run_queries`"""
+        self.issued.extend(batch)
+        self.responses.extend(responses)
+        self.stats = merge_stats(self.stats, stats)
 
-    # Flatten individual result items across all queries
+        # A batch where every query failed says nothing about saturation
+        if not any(responses):
+            return
+        results = flatten_results(responses)
+        self.tokens += sum(estimate_tokens(item.get("content") or "") for item in results)
+        self.saturated = self.tracker.add(results) < self.novelty_threshold
+
+    def result(self) -> tuple[list[str], list[dict], dict]:
+        """Return the queries issued, their responses and the search stats"""
+        skipped = len(self.search_queries) - len(self.issued)
+        return self.issued, self.responses, {**self.stats, "search_queries_skipped": skipped}
+
+
+def adaptive_search_queries(
+    search_queries: list[str], configuration: Configuration
+) -> tuple[list[str], list[dict], dict]:
+    """Run the queries in batches until the section's evidence saturates (see `AdaptiveSearch`)"""
+    search = AdaptiveSearch(search_queries, configuration)
+    kwargs = _search_kwargs(configuration)
+    while batch := search.next_batch():
+        search.record(batch, *run_queries(batch, **kwargs))
+    return search.result()
+
+
+async def aadaptive_search_queries(
+    search_queries: list[str], configuration: Configuration
+) -> tuple[list[str], list[dict], dict]:
+    """Async version of `adaptive_search_queries`"""
+    search = AdaptiveSearch(search_queries, configuration)
+    kwargs = _search_kwargs(configuration)
+    while batch := search.next_batch():
+        search.record(batch, *await arun_queries(batch, **kwargs))
+    return search.result()
+
+
+def flatten_results(search_results: list[dict]) -> list[dict]:
+    """Flatten individual result items across all query responses"""
     flattened_results = []
     for per_query_response in search_results:
         if isinstance(per_query_response, dict):
             flattened_results.extend(per_query_response.get("results", []))
+    return flattened_results
+
+
+def section_results(section, search_results: list[dict], configuration: Configuration) -> tuple[list[dict], dict]:
+    """Return the result items of a section's query responses and the passage index counts.
+
+    With `passage_index`, the items are the passages of the raw page content that
+    best match the section's title and description (see `src/passages.py`).
+    """
+    results = flatten_results(search_results)
+    if not configuration.passage_index:
+        return results, {}
+
+    # Imported here so NumPy is only loaded once the passage index is used
+    from src.passages import select_passages
 
-    context = "\n\n---\n\n".join(
+    query = f"{get_field(section, 'title', '')} {get_field(section, 'description', '')}"
+    return select_passages(results, query, configuration.passage_tokens, configuration.passage_top_k)
+
+
+def render_context(results: list[dict]) -> str:
+    """Render search result items as the markdown context used for drafting"""
+    return "\n\n---\n\n".join(
         f"### {item.get('title', 'Untitled')}\n"
         f"**URL:** [{item.get('url', 'N/A')}]({item.get('url', '#')})\n\n"
         f"{item.get('content', '')}"
-        for item in flattened_results
+        for item in results
     )
-    
-    section = state["section"]
+
+
+def build_researched_section(
+    section,
+    search_queries: list[str],
+    search_results: list[dict],
+    context: str,
+    store: BlobStore | None = None,
+) -> dict:
+    """Return the section as a dict carrying its queries, results and context.
+
+    With a blob `store`, the results and context are stored there and the section
+    carries references to them instead.
+    """
     if isinstance(section, BaseModel):
         section_dict = section.model_dump()
     else:
-        section_dict = dict(section) 
-
-    section_dict.setdefault("search_queries", [])
-    section_dict.setdefault("search_results", [])
-    section_dict.setdefault("section_context", "")
+        section_dict = dict(section)
 
     section_dict["search_queries"] = search_queries
-    section_dict["search_results"] = flattened_results
-    section_dict["section_context"] = context
+    section_dict["search_results"] = store.put(search_results) if store else search_results
+    section_dict["section_context"] = store.put(context) if store else context
+    return section_dict
+
+
+def _search_web_update(
+    section,
+    search_queries: list[str],
+    search_results: list[dict],
+    run_stats: dict,
+    configuration: Configuration,
+) -> dict:
+    """Build the state update shared by `search_web` and `asearch_web`"""
+    store = store_for(configuration) if configuration.state_blob_refs else None
+    flattened_results, passage_stats = section_results(section, search_results, configuration)
+    context = render_context(flattened_results)
+    section_dict = build_researched_section(
+        section, search_queries, flattened_results, context, store
+    )
+
+    emit_progress(
+        "section_researched",
+        title=section_dict.get("title", ""),
+        queries=len(search_queries),
+        results=len(flattened_results),
+    )
 
     return {
-        "search_results": flattened_results,
-        "section_context": context,
-        "section": section_dict,                 
-        "researched_sections": [section_dict], 
+        "search_results": section_dict["search_results"],
+        "section_context": section_dict["section_context"],
+        "section": section_dict,
+        "researched_sections": [section_dict],
+        "run_stats": merge_stats(run_stats, passage_stats),
     }
+
+
+def search_web(state: ResearchAgentState, config: RunnableConfig):
+    """This node searches the web for the search queries and returns the search results"""
+
+    # Get the search queries
+    search_queries = state["search_queries"]
+
+    # Load configuration
+    configuration = Configuration.from_runnable_config(config)
+
+    if configuration.adaptive_search:
+        search_queries, search_results, run_stats = adaptive_search_queries(
+            search_queries, configuration
+        )
+    else:
+        search_results, run_stats = search_queries_with_config(search_queries, configuration)
+
+    run_stats = {"search_queries_issued": len(search_queries), **run_stats}
+    return _search_web_update(
+        state["section"], search_queries, search_results, run_stats, configuration
+    )
+
+
+async def asearch_web(state: ResearchAgentState, config: RunnableConfig):
+    """Async version of `search_web`"""
+
+    search_queries = state["search_queries"]
+    configuration = Configuration.from_runnable_config(config)
+
+    if configuration.adaptive_search:
+        search_queries, search_results, run_stats = await aadaptive_search_queries(
+            search_queries, configuration
+        )
+    else:
+        search_results, run_stats = await asearch_queries_with_config(search_queries, configuration)
+
+    run_stats = {"search_queries_issued": len(search_queries), **run_stats}
+    # Building the section context can index megabytes of raw content; keep it off the event loop
+    return await asyncio.to_thread(
+        _search_web_update, state["section"], search_queries, search_results, run_stats, configuration
+    )
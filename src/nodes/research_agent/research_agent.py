@@ -1,18 +1,22 @@
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from src.configuration import Configuration
-from langchain.chat_models import init_chat_model
+from src.durable import RETRY_POLICY
 from src.state import ResearchAgentState
 from langgraph.graph import StateGraph, START, END
 
-from src.nodes.research_agent.nodes.generate_queries import generate_queries
-from src.nodes.research_agent.nodes.web_research import search_web
+from src.nodes.research_agent.nodes.generate_queries import agenerate_queries, generate_queries
+from src.nodes.research_agent.nodes.web_research import asearch_web, search_web
 
 
 
 research_agent = StateGraph(ResearchAgentState)
 
-research_agent.add_node("generate_queries", generate_queries)
-research_agent.add_node("search_web", search_web)
+research_agent.add_node(
+    "generate_queries",
+    RunnableLambda(generate_queries, afunc=agenerate_queries),
+    retry_policy=RETRY_POLICY,
+)
+research_agent.add_node("search_web", RunnableLambda(search_web, afunc=asearch_web))
 
 research_agent.add_edge(START, "generate_queries")
 research_agent.add_edge("generate_queries", "search_web")
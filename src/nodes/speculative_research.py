@@ -0,0 +1,211 @@
+"""Research the template's sections while the planner describes them.
+
+The section titles come from the template, so the research sections are known
+before the planner has run. With `speculative_research`, `generate_sections`
+starts query generation and search for each of them, describing a section by the
+topic and its template points, and runs the planner at the same time. Once the
+planner's sections arrive, the speculative results of the matching sections are
+kept under the planner's description, the others are cancelled or discarded, and
+the sections left without results are researched as usual by the graph. If the
+planner fails, every speculative section is stopped and counted as abandoned.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.runnables import RunnableConfig
+
+from src.configuration import Configuration
+from src.metrics import SPECULATIVE_SECTIONS
+from src.nodes.research_agent.nodes.generate_queries import agenerate_queries, generate_queries
+from src.nodes.research_agent.nodes.web_research import asearch_web, search_web
+from src.schema import Section
+from src.state import merge_stats
+from src.templates import OutlineSection, compile_template, resolve_template
+from src.text import token_set
+
+
+logger = logging.getLogger(__name__)
+
+
+def speculative_sections(topic: str, outline: tuple[OutlineSection, ...]) -> list[Section]:
+    """Return the research sections of the outline, described by the topic and their template points"""
+    return [
+        Section(
+            title=s.title,
+            description="; ".join([f"Section of a research paper on: {topic}", *s.points]),
+            require_research=True,
+        )
+        for s in outline
+        if s.require_research
+    ]
+
+
+def query_coverage(search_queries: list[str], description: str) -> float:
+    """Share of the distinct words of the queries that appear in the description"""
+    query_tokens = token_set(" ".join(search_queries))
+    if not query_tokens:
+        return 0.0
+    return len(query_tokens & token_set(description)) / len(query_tokens)
+
+
+def _research(section: Section, config: RunnableConfig, stop: threading.Event) -> dict | None:
+    start = time.perf_counter()
+    search_queries = generate_queries({"section": section}, config)["search_queries"]
+    # A thread cannot be cancelled, so a section no longer wanted stops before its searches
+    if stop.is_set():
+        return None
+    update = search_web({"section": section, "search_queries": search_queries}, config)
+    return {"section": update["section"], "run_stats": update["run_stats"], "seconds": time.perf_counter() - start}
+
+
+async def _aresearch(section: Section, config: RunnableConfig) -> dict:
+    start = time.perf_counter()
+    search_queries = (await agenerate_queries({"section": section}, config))["search_queries"]
+    update = await asearch_web({"section": section, "search_queries": search_queries}, config)
+    return {"section": update["section"], "run_stats": update["run_stats"], "seconds": time.perf_counter() - start}
+
+
+def _planned_titles(update: dict) -> set[str]:
+    return {s.title for s in update["sections"] if s.require_research}
+
+
+def _abandon(sections: int, start: float) -> None:
+    # The node fails without an update, so the abandoned work goes to the metrics and the log
+    SPECULATIVE_SECTIONS.inc(sections, outcome="abandoned")
+    logger.warning(
+        "Planner failed; abandoned the speculative research of %d sections after %.1fs",
+        sections, time.perf_counter() - start,
+    )
+
+
+def reconcile(
+    update: dict, finished: dict[str, dict | None], cancelled: int, planner_seconds: float, threshold: float
+) -> dict:
+    """Merge the finished speculative research into the planner's update.
+
+    `finished` maps a section title to its speculative outcome, or None if it
+    failed; `cancelled` counts the speculative sections stopped before finishing.
+    A finished section is kept when the planner returned a research section with
+    its title and enough of its query words appear in the planner's description.
+    The time saved is the part of the longest kept research that overlapped the
+    planner. The time wasted is a lower bound: finished discarded sections count
+    what they ran for, but cancelled ones only the planner's time, as a stopped
+    section may still be finishing its query generation.
+    """
+    planned = {s.title: s for s in update["sections"] if s.require_research}
+    kept, kept_seconds, run_stats = [], [], {}
+    discarded, wasted_seconds, wasted_queries = cancelled, cancelled * planner_seconds, 0
+
+    for title, outcome in finished.items():
+        if outcome is None:
+            continue
+        # Discarded or not, the calls were made
+        run_stats = merge_stats(run_stats, outcome["run_stats"])
+        section = planned.get(title)
+        search_queries = outcome["section"]["search_queries"]
+        if section is not None and query_coverage(search_queries, section.description) >= threshold:
+            kept.append({**outcome["section"], "description": section.description})
+            kept_seconds.append(outcome["seconds"])
+        else:
+            discarded += 1
+            wasted_seconds += outcome["seconds"]
+            wasted_queries += len(search_queries)
+
+    run_stats = merge_stats(
+        run_stats,
+        {
+            "speculative_sections_started": len(finished) + cancelled,
+            "speculative_sections_kept": len(kept),
+            "speculative_sections_discarded": discarded,
+            "speculative_sections_missed": len(planned) - len(kept),
+            "speculative_seconds_saved": min(planner_seconds, max(kept_seconds, default=0.0)),
+            "speculative_min_seconds_wasted": wasted_seconds,
+            "speculative_queries_wasted": wasted_queries,
+        },
+    )
+    SPECULATIVE_SECTIONS.inc(len(kept), outcome="kept")
+    SPECULATIVE_SECTIONS.inc(discarded, outcome="discarded")
+    return {
+        **update,
+        "researched_sections": kept,
+        "run_stats": merge_stats(update.get("run_stats"), run_stats),
+    }
+
+
+def research_while_planning(state: dict, config: RunnableConfig, plan) -> dict:
+    """Run `plan(state, config)` while researching the template's sections, and return its reconciled update"""
+    configuration = Configuration.from_runnable_config(config)
+    sections = speculative_sections(state["topic"], compile_template(resolve_template(configuration)))
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, len(sections)))
+    stops = {s.title: threading.Event() for s in sections}
+    # Each speculative section runs in its own copy of the context, so it reports to the run's callbacks
+    futures = {
+        s.title: executor.submit(contextvars.copy_context().run, _research, s, config, stops[s.title])
+        for s in sections
+    }
+    try:
+        try:
+            update = plan(state, config)
+        except BaseException:
+            for stop in stops.values():
+                stop.set()
+            _abandon(len(sections), start)
+            raise
+        planner_seconds = time.perf_counter() - start
+
+        wanted = _planned_titles(update)
+        finished, cancelled = {}, 0
+        for title, future in futures.items():
+            # A section still running when it is not wanted stops before its searches
+            if title not in wanted and (future.cancel() or not future.done()):
+                stops[title].set()
+                cancelled += 1
+                continue
+            try:
+                finished[title] = future.result()
+            except Exception as e:
+                logger.warning("Speculative research failed for section %r: %s", title, e)
+                finished[title] = None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return reconcile(update, finished, cancelled, planner_seconds, configuration.speculative_match_threshold)
+
+
+async def aresearch_while_planning(state: dict, config: RunnableConfig, plan) -> dict:
+    """Async version of `research_while_planning`, where `plan` is a coroutine function"""
+    configuration = Configuration.from_runnable_config(config)
+    sections = speculative_sections(state["topic"], compile_template(resolve_template(configuration)))
+
+    start = time.perf_counter()
+    tasks = {s.title: asyncio.create_task(_aresearch(s, config)) for s in sections}
+    try:
+        update = await plan(state, config)
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        _abandon(len(sections), start)
+        raise
+    planner_seconds = time.perf_counter() - start
+
+    wanted = _planned_titles(update)
+    finished, cancelled = {}, 0
+    for title, task in tasks.items():
+        if title not in wanted and not task.done():
+            task.cancel()
+            cancelled += 1
+            continue
+        try:
+            finished[title] = await task
+        except Exception as e:
+            logger.warning("Speculative research failed for section %r: %s", title, e)
+            finished[title] = None
+
+    return reconcile(update, finished, cancelled, planner_seconds, configuration.speculative_match_threshold)
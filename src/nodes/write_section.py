@@ -0,0 +1,161 @@
+from langchain_core.runnables import RunnableConfig
+from src.clients import get_chat_model
+from src.blob_store import store_for
+from src.configuration import Configuration
+from src.nodes.plan_searches import query_dedup_stats
+from src.prompts import assemble_messages, prompt_block
+from src.scheduler import acall_llm, call_llm
+from src.schema import get_field
+
+
+WRITE_SECTION_PROMPT = """
+You are an expert academic writing assistant. Your job is to write ONE section of a research paper on the given topic, grounded in the provided context.
+
+## Guidelines
+- Cover everything the SECTION DESCRIPTION asks for, using the SECTION CONTEXT to ground all claims.
+- Academic, clear, and concise. Prefer active voice and precise terminology.
+- If sources are mentioned in the context, cite them where appropriate. Do not fabricate sources; use “[citation needed]” when a claim would need one.
+- Do not write other sections of the paper, and do not add an introduction or conclusion to the section.
+
+## Output Rules (very important)
+- Start with the SECTION TITLE as a level-2 markdown heading (`## ` followed by the title).
+- OUTPUT **ONLY** the section content, with no meta-comments.
+"""
+
+
+WRITE_DEPENDENT_SECTION_PROMPT = """
+You are an expert academic writing assistant. Your job is to write ONE section of a research paper on the given topic. The researched sections of the paper have already been drafted; the section you write must follow from them.
+
+## Guidelines
+- Cover everything the SECTION DESCRIPTION asks for.
+- Base every claim on the DRAFTED SECTIONS—no invented facts, results, or sources.
+- Keep terminology, acronyms, and tone consistent with the drafted sections.
+- If information is insufficient, write the best academically neutral version possible and mark a short TODO in brackets.
+
+## Output Rules (very important)
+- Start with the SECTION TITLE as a level-2 markdown heading (`## ` followed by the title).
+- OUTPUT **ONLY** the section content, with no meta-comments.
+"""
+
+
+def _draft(messages: list[dict], config: RunnableConfig):
+    """Draft with the run's `drafting_model`; drafts are rate limited and retried but never hedged"""
+    configuration = Configuration.from_runnable_config(config)
+    model = get_chat_model(configuration.drafting_model)
+    return call_llm(
+        lambda: model.invoke(messages, config),
+        configuration.drafting_model,
+        "write_section",
+        messages,
+        configuration,
+        hedge=False,
+    )
+
+
+async def _adraft(messages: list[dict], config: RunnableConfig):
+    """Async version of `_draft`"""
+    configuration = Configuration.from_runnable_config(config)
+    model = get_chat_model(configuration.drafting_model)
+    return await acall_llm(
+        lambda: model.ainvoke(messages, config),
+        configuration.drafting_model,
+        "write_section",
+        messages,
+        configuration,
+        hedge=False,
+    )
+
+
+def _section_blocks(section) -> list[str]:
+    return [
+        prompt_block("SECTION TITLE", "section_title", (get_field(section, "title", "") or "").strip()),
+        prompt_block(
+            "SECTION DESCRIPTION", "section_description", (get_field(section, "description", "") or "").strip()
+        ),
+    ]
+
+
+def _build_section_messages(state: dict, config: RunnableConfig) -> list[dict]:
+    configuration = Configuration.from_runnable_config(config)
+    store = store_for(configuration)
+    section_context = (store.resolve(state.get("section_context", "")) or "").strip()
+    return assemble_messages(
+        configuration.drafting_model,
+        WRITE_SECTION_PROMPT,
+        shared=[prompt_block("TOPIC", "topic", state.get("topic", ""))],
+        specific=[*_section_blocks(state["section"]), prompt_block("SECTION CONTEXT", "section_context", section_context)],
+        request="Write the section.",
+    )
+
+
+def _build_dependent_section_messages(state: dict, config: RunnableConfig) -> list[dict]:
+    # Every dependent section of a paper gets the same drafts, so they go before the section itself
+    drafted_sections = "\n\n".join(draft["content"].strip() for draft in state.get("drafts", []))
+    return assemble_messages(
+        Configuration.from_runnable_config(config).drafting_model,
+        WRITE_DEPENDENT_SECTION_PROMPT,
+        shared=[
+            prompt_block("TOPIC", "topic", state.get("topic", "")),
+            prompt_block("DRAFTED SECTIONS", "drafted_sections", drafted_sections),
+        ],
+        specific=_section_blocks(state["section"]),
+        request="Write the section.",
+    )
+
+
+def _draft_update(state: dict, content: str) -> dict:
+    return {
+        "section_drafts": [
+            {"title": get_field(state["section"], "title", ""), "content": content}
+        ]
+    }
+
+
+def write_section(state: dict, config: RunnableConfig):
+    """This node drafts one researched section from its context"""
+
+    response = _draft(_build_section_messages(state, config), config)
+
+    return _draft_update(state, response.content)
+
+
+async def awrite_section(state: dict, config: RunnableConfig):
+    """Async version of `write_section`"""
+
+    response = await _adraft(_build_section_messages(state, config), config)
+
+    return _draft_update(state, response.content)
+
+
+def write_dependent_section(state: dict, config: RunnableConfig):
+    """This node drafts a section that doesn't need research from the drafts of the researched sections"""
+
+    response = _draft(_build_dependent_section_messages(state, config), config)
+
+    return _draft_update(state, response.content)
+
+
+async def awrite_dependent_section(state: dict, config: RunnableConfig):
+    """Async version of `write_dependent_section`"""
+
+    response = await _adraft(_build_dependent_section_messages(state, config), config)
+
+    return _draft_update(state, response.content)
+
+
+def stitch_report(state, config: RunnableConfig):
+    """This node assembles the section drafts into the final report in outline order"""
+
+    drafts = {draft["title"]: draft["content"].strip() for draft in state.get("section_drafts", [])}
+
+    parts = []
+    for section in state.get("sections", []):
+        title = (get_field(section, "title", "") or "").strip()
+        content = drafts.get(get_field(section, "title", ""), "")
+        if not content:
+            content = f"[TODO: {title} section was not drafted]"
+        if not content.startswith("#"):
+            content = f"## {title}\n\n{content}"
+        parts.append(content)
+
+    return {"final_report": "\n\n".join(parts), "run_stats": query_dedup_stats(state)}
@@ -0,0 +1,41 @@
+from src.text import shingles
+
+
+# Weight of results without a relevance score, and the floor for scored ones so a
+# batch of low scored results still counts
+MIN_WEIGHT = 0.05
+
+
+class NoveltyTracker:
+    """Remembers the URLs and content shingles a section's searches have returned so far"""
+
+    def __init__(self):
+        self.urls: set[str] = set()
+        self.shingles: set[str] = set()
+
+    def add(self, results: list[dict]) -> float:
+        """Record a batch of search results and return its novelty.
+
+        Novelty is the share of the batch's content that is new, weighted by each
+        result's relevance `score`: a result whose URL was already seen adds nothing,
+        any other result adds the fraction of its 5-word shingles not seen before.
+        An empty batch has novelty 0.
+        """
+        total = new = 0.0
+        for item in results:
+            weight = max(item.get("score") or MIN_WEIGHT, MIN_WEIGHT)
+            total += weight
+
+            url = item.get("url")
+            if url and url in self.urls:
+                continue
+            item_shingles = shingles(item.get("content") or "")
+            if item_shingles:
+                new += weight * len(item_shingles - self.shingles) / len(item_shingles)
+            else:
+                new += weight
+            if url:
+                self.urls.add(url)
+            self.shingles |= item_shingles
+
+        return new / total if total else 0.0
@@ -0,0 +1,149 @@
+"""BM25 passage index over the raw page content of a section's search results."""
+
+import re
+
+import numpy as np
+
+from src.text import STOPWORDS, estimate_tokens, normalize_text
+
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+WORD = re.compile(r"\w+")
+
+
+def _query_terms(query: str) -> list[str]:
+    return [t for t in normalize_text(query).split() if t not in STOPWORDS]
+
+
+def split_passages(text: str, passage_tokens: int) -> list[str]:
+    """Split `text` into passages of at most about `passage_tokens` tokens.
+
+    Consecutive paragraphs are packed into one passage while they fit; a paragraph
+    longer than a passage is cut between words.
+    """
+    max_chars = max(1, passage_tokens) * 4
+    pieces = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        words = paragraph.split()
+        piece: list[str] = []
+        length = 0
+        for word in words:
+            if piece and length + 1 + len(word) > max_chars:
+                pieces.append(" ".join(piece))
+                piece, length = [], 0
+            piece.append(word)
+            length += len(word) + (1 if length else 0)
+        if piece:
+            pieces.append(" ".join(piece))
+
+    passages: list[str] = []
+    for piece in pieces:
+        if passages and len(passages[-1]) + 2 + len(piece) <= max_chars:
+            passages[-1] = f"{passages[-1]}\n\n{piece}"
+        else:
+            passages.append(piece)
+    return passages
+
+
+class PassageIndex:
+    """In-memory BM25 index over a list of passages.
+
+    Every term occurrence is kept as a (term id, passage id) pair in two flat arrays,
+    so building the index and scoring a query are linear in the indexed text.
+    """
+
+    def __init__(self, passages: list[str]):
+        self.passages = passages
+
+        # Stopwords are indexed too: they are never query terms, and BM25 lengths count every word
+        tokens = [WORD.findall(passage.lower()) for passage in passages]
+        flat = [t for passage_tokens in tokens for t in passage_tokens]
+        self.vocabulary = {t: i for i, t in enumerate(dict.fromkeys(flat))}
+
+        self.term_ids = np.fromiter(map(self.vocabulary.__getitem__, flat), dtype=np.int64, count=len(flat))
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+        self.passage_ids = np.repeat(np.arange(len(passages)), lengths)
+        self.lengths = lengths.astype(np.float64)
+        self.average_length = self.lengths.mean() if len(passages) else 0.0
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the BM25 score of every passage for `query`"""
+        n = len(self.passages)
+        query_ids = sorted({self.vocabulary[t] for t in _query_terms(query) if t in self.vocabulary})
+        if not n or not query_ids or not self.average_length:
+            return np.zeros(n)
+
+        # Map every query term to its row; all other terms to -1
+        rows = np.full(len(self.vocabulary), -1, dtype=np.int64)
+        rows[query_ids] = np.arange(len(query_ids))
+        term_rows = rows[self.term_ids]
+        matched = term_rows >= 0
+
+        # Term frequencies of the query terms in every passage, shape (terms, passages)
+        tf = np.bincount(
+            term_rows[matched] * n + self.passage_ids[matched], minlength=len(query_ids) * n
+        ).reshape(len(query_ids), n).astype(np.float64)
+        df = np.count_nonzero(tf, axis=1)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / self.average_length)
+        return (idf[:, None] * tf * (BM25_K1 + 1) / (tf + norm)).sum(axis=0)
+
+    def top(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Return the ids and scores of the `k` best passages that match `query`, best first"""
+        scores = self.scores(query)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(i), float(scores[i])) for i in best]
+
+
+def _passage_url(url: str | None, position: int) -> str:
+    return f"{url}#p{position}" if url else "N/A"
+
+
+def select_passages(results: list[dict], query: str, passage_tokens: int, top_k: int) -> tuple[list[dict], dict]:
+    """Index the pages of `results` and return the `top_k` passages that best match `query`.
+
+    Each page is its `raw_content`, or its snippet when the raw content is missing.
+    Passages are returned as result items of their page with the passage as content
+    and the BM25 score relative to the best passage as score, so they render and
+    compact like search results. Their URL is the page's with a `#p<n>` fragment
+    naming the passage, so compaction's URL dedupe keeps several passages of one
+    page; if no passage matches, the snippets are returned.
+    Also returns the index size counts.
+    """
+    passages: list[str] = []
+    pages: list[int] = []
+    positions: list[int] = []
+    raw_tokens = 0
+    for page, item in enumerate(results):
+        text = item.get("raw_content") or item.get("content") or ""
+        raw_tokens += estimate_tokens(text)
+        page_passages = split_passages(text, passage_tokens)
+        passages.extend(page_passages)
+        pages.extend([page] * len(page_passages))
+        positions.extend(range(len(page_passages)))
+
+    stats = {"raw_content_tokens": raw_tokens, "passages_indexed": len(passages)}
+    best = PassageIndex(passages).top(query, top_k)
+    if not best:
+        # Nothing matches the query; fall back to the snippets
+        return [{key: value for key, value in item.items() if key != "raw_content"} for item in results], stats
+
+    top_score = best[0][1]
+    selected = [
+        {
+            "title": results[pages[i]].get("title", "Untitled"),
+            "url": _passage_url(results[pages[i]].get("url"), positions[i]),
+            "content": passages[i],
+            "score": round(score / top_score, 4),
+        }
+        for i, score in best
+    ]
+    return selected, stats
@@ -0,0 +1,192 @@
+"""Run batch topics across several worker processes.
+
+One process stops scaling once the graph's own CPU work (JSON parsing, pydantic
+validation, prompt and context building) saturates its core. `run_pool` spreads the
+topics over `workers` processes, each running `concurrency` topics at once on its
+own event loop:
+
+- every worker warms up once (graph, model and search clients, template) before
+  taking topics;
+- the on-disk caches under `cache_dir` (search, planner, corpus) are SQLite files in
+  WAL mode and are shared by all workers;
+- provider rate limits live in shared memory, so all workers stay under one budget,
+  and the LLM and search concurrency caps are split exactly between the workers;
+- only topics go out and only result lines (report, run_stats, time, cost) come
+  back, streamed to the output file as each topic finishes.
+
+The output has the same format as `src.batch`, so an interrupted run resumes by
+skipping the topics already completed.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+
+from src.batch import COST_COUNTERS, arun_topic, completed_ids, prune_blobs
+
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(config: dict) -> tuple:
+    """Build everything a worker needs before its first topic and return the graph and its metrics handler"""
+    from src.agent import graph, metrics_handler
+    from src.clients import get_chat_model, get_search_client
+    from src.configuration import Configuration
+    from src.templates import compile_template, resolve_template
+
+    configuration = Configuration.from_runnable_config(config)
+    for model in {configuration.query_model, configuration.planner_model, configuration.drafting_model}:
+        get_chat_model(model)
+    get_search_client()
+    compile_template(resolve_template(configuration))
+    return graph, metrics_handler
+
+
+async def _serve(graph, metrics_handler, tasks, results, config: dict, concurrency: int) -> None:
+    # Keep a summary for every run in flight so their costs can be read back
+    metrics_handler.max_runs = max(metrics_handler.max_runs, 2 * concurrency)
+
+    async def lane() -> None:
+        while True:
+            item = await asyncio.to_thread(tasks.get)
+            if item is None:
+                return
+            results.put(await arun_topic(graph, metrics_handler, item, config, durable=False))
+
+    await asyncio.gather(*(lane() for _ in range(concurrency)))
+
+
+def _worker(tasks, results, settings: dict) -> None:
+    from src.limits import set_concurrency_limits
+    from src.scheduler import SCHEDULER
+
+    if settings["initializer"] is not None:
+        settings["initializer"](*settings["initargs"])
+    SCHEDULER.install_rate_limits(settings["rate_limits"])
+    set_concurrency_limits(llm=settings["llm_concurrency"], search=settings["search_concurrency"])
+    graph, metrics_handler = warm_up(settings["config"])
+    results.put({"ready": os.getpid()})
+    asyncio.run(_serve(graph, metrics_handler, tasks, results, settings["config"], settings["concurrency"]))
+
+
+def split_limit(name: str, limit: int | None, workers: int) -> list[int | None]:
+    """Split a cap on calls in flight between `workers`, the first workers taking the
+    remainder, so the workers' caps add up to exactly `limit`"""
+    if not limit:
+        return [None] * workers
+    if limit < workers:
+        raise ValueError(f"{name} ({limit}) must be at least the number of workers ({workers})")
+    share, remainder = divmod(limit, workers)
+    return [share + (i < remainder) for i in range(workers)]
+
+
+def run_pool(
+    topics: list[dict],
+    output_path: str,
+    workers: int | None = None,
+    concurrency: int = 4,
+    llm_concurrency: int | None = None,
+    search_concurrency: int | None = None,
+    config: dict | None = None,
+    rate_limits: dict | None = None,
+    initializer=None,
+    initargs: tuple = (),
+    start_method: str = "spawn",
+) -> dict:
+    """Run every topic not yet completed in `output_path` on `workers` processes and return the batch report.
+
+    Each worker runs `concurrency` topics at once. `llm_concurrency` and
+    `search_concurrency` cap the calls in flight across all workers (at least one per
+    worker), and `rate_limits` sets provider rate limits shared by all of them.
+    `initializer(*initargs)` runs first in every worker, e.g. to install client fakes.
+    The report is the one of `arun_batch`, with the worker count and the seconds the
+    workers took to start.
+    """
+    from src.scheduler import shared_rate_limits
+
+    workers = workers or os.cpu_count() or 1
+    done = completed_ids(output_path)
+    pending = [item for item in topics if item["id"] not in done]
+    prune_blobs(config)
+
+    context = multiprocessing.get_context(start_method)
+    tasks, results = context.Queue(), context.Queue()
+    settings = {
+        "config": config or {},
+        "concurrency": max(1, concurrency),
+        "rate_limits": shared_rate_limits(rate_limits, context),
+        "initializer": initializer,
+        "initargs": initargs,
+    }
+
+    worker_settings = [
+        {**settings, "llm_concurrency": llm, "search_concurrency": search}
+        for llm, search in zip(
+            split_limit("llm_concurrency", llm_concurrency, workers),
+            split_limit("search_concurrency", search_concurrency, workers),
+        )
+    ]
+
+    start = time.perf_counter()
+    processes = [
+        context.Process(target=_worker, args=(tasks, results, worker), daemon=True) for worker in worker_settings
+    ]
+    for process in processes:
+        process.start()
+    for item in pending:
+        tasks.put(item)
+    # One stop marker per lane of every worker
+    for _ in range(workers * settings["concurrency"]):
+        tasks.put(None)
+
+    received, ready, startup_seconds = [], 0, 0.0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a") as output:
+        while len(received) < len(pending):
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    logger.warning("All workers exited with %d topics unfinished", len(pending) - len(received))
+                    break
+                continue
+            if "ready" in result:
+                ready += 1
+                if ready == workers:
+                    startup_seconds = time.perf_counter() - start
+                continue
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            received.append(result)
+            logger.info(
+                "[%d/%d] %s %s in %.1fs",
+                len(received), len(pending), result["status"], result["id"], result["seconds"],
+            )
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+    succeeded = sum(1 for result in received if result["status"] == "ok")
+    cost = dict.fromkeys(COST_COUNTERS, 0)
+    for result in received:
+        for key in COST_COUNTERS:
+            cost[key] += result["cost"][key]
+    return {
+        "topics": len(topics),
+        "skipped": len(topics) - len(pending),
+        "succeeded": succeeded,
+        "failed": len(pending) - succeeded,
+        "seconds": elapsed,
+        "papers_per_minute": succeeded / elapsed * 60 if elapsed else 0.0,
+        "cost": cost,
+        "workers": workers,
+        "startup_seconds": startup_seconds,
+    }
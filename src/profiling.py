@@ -0,0 +1,559 @@
+"""Opt-in per-node CPU and allocation profiling.
+
+A run is profiled when its `profile_dir` is set, in the configuration or through
+the PAPER_PROFILE_DIR environment variable. `ProfilingCallbackHandler` then runs
+every node of both graphs under a deterministic profiler (timed in the CPU time of
+the thread running it, so waiting on the network costs nothing) and tracemalloc,
+and writes to `<profile_dir>/<run id>/`:
+
+- one report per node run (`NN-<node>.txt`): CPU and wall time, peak and net
+  allocation, the top functions and the allocations by line, with the raw
+  profile stats next to it (`NN-<node>.prof`, for snakeviz or pstats);
+- `summary.json`: CPU time and allocations per node, summed over its runs;
+- `run.collapsed`: the collapsed stacks of the whole run, one line per stack
+  prefixed with the node, for flamegraph.pl, speedscope or inferno.
+
+Python only allows one cProfile per process, and it records every thread, so it
+cannot tell concurrent Send branches apart. Instead a profile hook on every thread
+hands each call to the node whose context it runs in, which separates branches
+running in threads as well as in asyncio tasks. tracemalloc traces the whole
+process, so the allocations of a node that ran alongside others include theirs;
+its report and the summary count those runs. A subgraph node is represented by the
+nodes it runs.
+"""
+
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import Counter
+from contextvars import ContextVar
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.config import get_config
+
+
+PROFILE_DIR_ENV = "PAPER_PROFILE_DIR"
+
+TOP_FUNCTIONS = 30
+TOP_LINES = 20
+# Allocations are reported by line, so one frame per traceback is enough and keeps snapshots cheap
+TRACEMALLOC_FRAMES = 1
+# Stacks worth less than this many microseconds are left out of the collapsed output
+MIN_STACK_MICROSECONDS = 10
+
+
+def _label(func: tuple) -> str:
+    """Render a pstats function key as a stack frame of the collapsed format"""
+    filename, line, name = func
+    if filename == "~":
+        label = name
+    else:
+        # The last path parts are enough to tell the module, e.g. langgraph/pregel/main.py
+        label = f"{name} ({'/'.join(filename.split(os.sep)[-3:])}:{line})"
+    return re.sub(r"[;\s]+", " ", label).strip()
+
+
+def _components(entries: dict) -> dict[tuple, int]:
+    """Number the strongly connected components of the call graph, i.e. its recursion cycles"""
+    callees: dict[tuple, list] = {func: [] for func in entries}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            if caller in entries:
+                callees[caller].append(func)
+
+    # Kosaraju: order by DFS finish time, then collect components on the reversed graph
+    order, seen = [], set()
+    for start in entries:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [(start, iter(callees[start]))]
+        while stack:
+            func, children = stack[-1]
+            for child in children:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(callees[child])))
+                    break
+            else:
+                stack.pop()
+                order.append(func)
+
+    component: dict[tuple, int] = {}
+    for start in reversed(order):
+        if start in component:
+            continue
+        component[start] = len(component)
+        index, pending = component[start], [start]
+        while pending:
+            func = pending.pop()
+            for caller in entries[func][4]:
+                if caller in entries and caller not in component:
+                    component[caller] = index
+                    pending.append(caller)
+    return component
+
+
+def collapsed_stacks(stats: pstats.Stats, prefix: str = "") -> Counter:
+    """Approximate the collapsed stacks of a cProfile run, in microseconds.
+
+    cProfile only records caller/callee edges, so each function's time is split
+    over the paths reaching it in proportion to the time spent through each edge.
+    """
+    entries = stats.stats
+    callees: dict[tuple, list] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    stacks: Counter = Counter()
+
+    def walk(func: tuple, path: tuple, fraction: float) -> None:
+        _, _, tottime, cumtime, _ = entries[func]
+        if fraction * cumtime * 1e6 < MIN_STACK_MICROSECONDS:
+            return
+        path = (*path, _label(func))
+        self_time = int(fraction * tottime * 1e6)
+        if self_time:
+            stacks[";".join(path)] += self_time
+        for callee, edge_cumtime in callees.get(func, ()):
+            callee_cumtime = entries[callee][3]
+            if callee_cumtime <= 0 or _label(callee) in path:
+                continue
+            walk(callee, path, fraction * min(1.0, edge_cumtime / callee_cumtime))
+
+    base = (prefix,) if prefix else ()
+    component = _components(entries)
+    roots: dict[int, tuple] = {}
+    for func, (_, _, _, cumtime, callers) in entries.items():
+        # Time not explained by calls from outside the function's recursion cycle was
+        # spent under frames already running when the profiler started
+        called = sum(
+            edge[3] for caller, edge in callers.items() if caller in entries and component[caller] != component[func]
+        )
+        if cumtime <= 0 or called >= cumtime:
+            continue
+        # A cycle (e.g. invoke -> Context.run -> invoke) is entered once, at its costliest function
+        best = roots.get(component[func])
+        if best is None or cumtime > entries[best[0]][3]:
+            roots[component[func]] = (func, 1.0 - called / cumtime)
+    for func, fraction in roots.values():
+        walk(func, base, fraction)
+    return stacks
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _function_key(key) -> tuple:
+    """Turn the key a call was recorded under into the function key of cProfile and pstats"""
+    if isinstance(key, types.CodeType):
+        return (key.co_filename, key.co_firstlineno, key.co_name)
+    if isinstance(key, tuple):
+        owner, name = key
+        return ("~", 0, f"<method '{name}' of '{owner.__name__}' objects>")
+    module = getattr(key, "__module__", None)
+    name = getattr(key, "__name__", None) or repr(key)
+    return ("~", 0, f"<built-in method {module}.{name}>" if module else f"<built-in method {name}>")
+
+
+def _call_key(frame, event: str, arg):
+    """Key a call as cheaply as possible, since tracemalloc traces every allocation of the profiler"""
+    if event == "call":
+        return frame.f_code
+    owner = getattr(arg, "__self__", None)
+    if owner is None or isinstance(owner, types.ModuleType):
+        return arg
+    # A method is bound anew on every call, so it is keyed by what it is bound to
+    return (type(owner), arg.__name__)
+
+
+class _NodeSlot:
+    """Where the profile of a node run goes, shared by every context copied from the node's"""
+
+    __slots__ = ("profile",)
+
+    def __init__(self):
+        self.profile: _NodeProfile | None = None
+
+
+_PROFILED_NODE: ContextVar[_NodeSlot | None] = ContextVar("profiled_node", default=None)
+
+
+def _dispatch(frame, event: str, arg) -> None:
+    """The profile hook of every thread while a run is profiled"""
+    slot = _PROFILED_NODE.get()
+    # The handler's own calls are left out, since it switches the hook off inside them
+    if slot is not None and slot.profile is not None and frame.f_code.co_filename != __file__:
+        slot.profile.event(frame, event, arg)
+
+
+class _ThreadCalls:
+    """The calls one thread made for a node run, and the stats of those that returned"""
+
+    __slots__ = ("frames", "keys", "starts", "children", "depth", "entries", "overhead")
+
+    def __init__(self):
+        # The open calls, as parallel stacks so that a call allocates no list of its own
+        self.frames: list = []
+        self.keys: list = []
+        self.starts: list[float] = []
+        self.children: list[float] = []
+        self.depth: dict = {}
+        # pstats' [primitive calls, calls, own time, cumulative time, callers] per function
+        self.entries: dict = {}
+        # CPU time spent in the profiler, which is kept out of the stats
+        self.overhead = 0.0
+
+    def close(self, frame, is_python: bool, now: float) -> None:
+        """Account the call returning in `frame`, and any left open above it"""
+        frames, keys = self.frames, self.keys
+        # A call that started before the node did, or whose return was missed, is left out
+        for index in range(len(frames) - 1, -1, -1):
+            if frames[index] is frame and (keys[index] is frame.f_code) == is_python:
+                break
+        else:
+            return
+        while len(frames) > index:
+            frames.pop()
+            key = self.keys.pop()
+            elapsed = now - self.starts.pop()
+            own = elapsed - self.children.pop()
+            depth = self.depth[key] - 1
+            self.depth[key] = depth
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = [0, 0, 0.0, 0.0, {}]
+            entry[1] += 1
+            entry[2] += own
+            if not depth:
+                entry[0] += 1
+                entry[3] += elapsed
+            if frames:
+                self.children[-1] += elapsed
+                edge = entry[4].get(self.keys[-1])
+                if edge is None:
+                    edge = entry[4][self.keys[-1]] = [0, 0, 0.0, 0.0]
+                edge[1] += 1
+                edge[2] += own
+                if not depth:
+                    edge[0] += 1
+                    edge[3] += elapsed
+
+
+class _NodeProfile:
+    """The profile of one node run, fed the calls of every thread and task running in its context"""
+
+    def __init__(self, run_id: UUID, root: UUID, node: str, branch: str | None, concurrent: int):
+        self.run_id = run_id
+        self.root = root
+        self.node = node
+        self.branch = branch
+        # The number of other node runs this one overlapped, whose allocations its own include
+        self.concurrent = concurrent
+        self._local = threading.local()
+        self._threads: list[_ThreadCalls] = []
+        self.wall_start = time.perf_counter()
+        if not concurrent:
+            tracemalloc.reset_peak()
+        self.memory_start = tracemalloc.get_traced_memory()[0]
+        self.snapshot = tracemalloc.take_snapshot()
+
+    def event(self, frame, event: str, arg) -> None:
+        entered = time.thread_time()
+        calls = getattr(self._local, "calls", None)
+        if calls is None:
+            calls = self._local.calls = _ThreadCalls()
+            self._threads.append(calls)
+        now = entered - calls.overhead
+        if event == "call" or event == "c_call":
+            # A C function runs in the frame of its caller, only keyed differently
+            calls.frames.append(frame)
+            key = _call_key(frame, event, arg)
+            calls.keys.append(key)
+            calls.starts.append(now)
+            calls.children.append(0.0)
+            calls.depth[key] = calls.depth.get(key, 0) + 1
+        else:
+            calls.close(frame, event == "return", now)
+        calls.overhead += time.thread_time() - entered
+
+    def _merged_stats(self) -> dict:
+        """Merge the threads into the format of pstats"""
+        merged: dict[tuple, list] = {}
+        for calls in list(self._threads):
+            for key, (cc, nc, tt, ct, callers) in calls.entries.items():
+                entry = merged.setdefault(_function_key(key), [0, 0, 0.0, 0.0, {}])
+                for field, value in enumerate((cc, nc, tt, ct)):
+                    entry[field] += value
+                for caller, edge in callers.items():
+                    total = entry[4].setdefault(_function_key(caller), [0, 0, 0.0, 0.0])
+                    for field, value in enumerate(edge):
+                        total[field] += value
+        return {
+            key: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in merged.items()
+        }
+
+    def stop(self) -> dict:
+        wall = time.perf_counter() - self.wall_start
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        lines = [
+            stat
+            for stat in snapshot.compare_to(self.snapshot, "lineno")
+            if stat.size_diff > 0 and stat.traceback[0].filename not in (tracemalloc.__file__, __file__)
+        ][:TOP_LINES]
+        # Built by hand, since pstats refuses to load a profile without calls
+        stats = pstats.Stats()
+        stats.stats = self._merged_stats()
+        stats.get_top_level_stats()
+        return {
+            "stats": stats,
+            "wall_seconds": wall,
+            "cpu_seconds": stats.total_tt,
+            "peak_bytes": max(0, peak - self.memory_start),
+            "net_bytes": current - self.memory_start,
+            "lines": lines,
+            "concurrent": self.concurrent,
+        }
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """Profiles the nodes of the runs that have a profile directory and writes their reports"""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: dict[UUID, dict] = {}
+        self._parents: dict[UUID, UUID | None] = {}
+        self._roots: dict[UUID, UUID] = {}
+        self._node_runs: dict[UUID, str] = {}
+        self._pending: dict[UUID, tuple] = {}
+        self._slots: dict[UUID, _NodeSlot] = {}
+        self._active: dict[UUID, _NodeProfile] = {}
+        self._hooked = False
+        self._started_tracemalloc = False
+
+    def _unhook(self) -> None:
+        """Keep the profile hook off the handler's own work in this thread, e.g. the snapshot diffs"""
+        if self._hooked:
+            sys.setprofile(None)
+
+    def _rehook(self) -> None:
+        # Profiling may have ended meanwhile
+        if self._hooked:
+            sys.setprofile(_dispatch)
+
+    def _is_ancestor(self, ancestor: UUID, run_id: UUID | None) -> bool:
+        while run_id is not None:
+            if run_id == ancestor:
+                return True
+            run_id = self._parents.get(run_id)
+        return False
+
+    def _start_run(self, root: UUID) -> bool:
+        """Decide whether the run `root` is profiled, once its configuration can be read.
+
+        Callbacks only see the configuration from inside a node, so this returns False
+        until then. A profiled run gets its report directory in `_runs`, others None.
+        """
+        try:
+            directory = get_config().get("configurable", {}).get("profile_dir")
+        except RuntimeError:
+            if not os.environ.get(PROFILE_DIR_ENV):
+                return False
+            directory = None
+        directory = directory or os.environ.get(PROFILE_DIR_ENV, "")
+        if not directory:
+            self._runs[root] = None
+            return True
+
+        run_dir = os.path.join(directory, str(root))
+        os.makedirs(run_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        if not self._hooked:
+            threading.setprofile_all_threads(_dispatch)
+            self._hooked = True
+        self._runs[root] = {"dir": run_dir, "reports": 0, "nodes": {}, "stacks": Counter()}
+        return True
+
+    def _start_node(self, run_id: UUID, root: UUID, node: str, branch: str | None) -> None:
+        run = self._runs[root]
+        if run is None:
+            return
+        for active in list(self._active.values()):
+            if self._is_ancestor(active.run_id, self._parents.get(run_id)):
+                # A subgraph node: drop its profile in favour of the nodes it runs
+                self._slots[active.run_id].profile = None
+                del self._active[active.run_id]
+        profile = _NodeProfile(run_id, root, node, branch, concurrent=len(self._active))
+        for active in self._active.values():
+            active.concurrent += 1
+        self._active[run_id] = profile
+        self._slots[run_id].profile = profile
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._unhook()
+        try:
+            self._start_chain(run_id, parent_run_id, metadata, kwargs.get("name"))
+        finally:
+            self._rehook()
+
+    def _start_chain(self, run_id: UUID, parent_run_id: UUID | None, metadata: dict | None, name: str | None) -> None:
+        with self._lock:
+            root = self._roots.get(parent_run_id, parent_run_id) if parent_run_id else run_id
+            self._roots[run_id] = root
+            self._parents[run_id] = parent_run_id
+
+            node = (metadata or {}).get("langgraph_node")
+            # Nodes wrapped in a RunnableLambda start a nested run with the same name
+            is_node = bool(node) and name == node and self._node_runs.get(parent_run_id) != node
+            if is_node:
+                self._node_runs[run_id] = node
+                if self._runs.get(root, True) is not None:
+                    # The node's calls, in whichever thread or task they run, go to its profile
+                    self._slots[run_id] = _NodeSlot()
+                    _PROFILED_NODE.set(self._slots[run_id])
+
+            if root not in self._runs:
+                if not self._start_run(root):
+                    # Profile the node from its first nested run, where the configuration is readable
+                    if is_node:
+                        namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+                        self._pending[root] = (run_id, node, namespace.split("|")[0] or None)
+                    return
+                pending = self._pending.pop(root, None)
+                if pending is not None and pending[0] in self._node_runs:
+                    self._start_node(pending[0], root, *pending[1:])
+
+            if is_node:
+                namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+                self._start_node(run_id, root, node, namespace.split("|")[0] or None)
+
+    def _finish_node(self, run_id: UUID) -> None:
+        with self._lock:
+            self._node_runs.pop(run_id, None)
+            slot = self._slots.pop(run_id, None)
+            active = self._active.pop(run_id, None)
+            if active is None:
+                return
+            slot.profile = None
+            run = self._runs.get(active.root)
+            if run is None:
+                return
+            run["reports"] += 1
+            index = run["reports"]
+        # The snapshot diff is slow, so it runs outside the lock the other branches need
+        result = active.stop()
+        self._write_node_report(run, index, active, result)
+
+    def _write_node_report(self, run: dict, index: int, active: _NodeProfile, result: dict) -> None:
+        base = os.path.join(run["dir"], f"{index:02d}-{active.node}")
+        stats = result["stats"]
+        stats.dump_stats(base + ".prof")
+
+        out = io.StringIO()
+        out.write(f"node: {active.node}\n")
+        if active.branch:
+            out.write(f"branch: {active.branch}\n")
+        if result["concurrent"]:
+            out.write(f"ran alongside {result['concurrent']} other node runs, whose allocations are included\n")
+        out.write(
+            f"cpu: {result['cpu_seconds']:.4f}s  wall: {result['wall_seconds']:.4f}s  "
+            f"peak allocation: {_format_size(result['peak_bytes'])}  "
+            f"net allocation: {_format_size(result['net_bytes'])}\n\n"
+        )
+        stats.stream = out
+        out.write("Top functions by own CPU time\n")
+        stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+        out.write("\nTop functions by cumulative CPU time\n")
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        out.write("\nAllocations by line (net growth during the node)\n")
+        for stat in result["lines"]:
+            frame = stat.traceback[0]
+            out.write(
+                f"{_format_size(stat.size_diff):>12}  {stat.count_diff:>+8} blocks  {frame.filename}:{frame.lineno}\n"
+            )
+        with open(base + ".txt", "w") as f:
+            f.write(out.getvalue())
+
+        stacks = collapsed_stacks(stats, prefix=active.node)
+        with self._lock:
+            run["stacks"].update(stacks)
+            totals = run["nodes"].setdefault(
+                active.node,
+                {
+                    "runs": 0,
+                    "concurrent_runs": 0,
+                    "cpu_seconds": 0.0,
+                    "wall_seconds": 0.0,
+                    "peak_bytes": 0,
+                    "net_bytes": 0,
+                },
+            )
+            totals["runs"] += 1
+            totals["concurrent_runs"] += bool(result["concurrent"])
+            totals["cpu_seconds"] += result["cpu_seconds"]
+            totals["wall_seconds"] += result["wall_seconds"]
+            totals["peak_bytes"] = max(totals["peak_bytes"], result["peak_bytes"])
+            totals["net_bytes"] += result["net_bytes"]
+
+    def _finish_root(self, root: UUID) -> None:
+        with self._lock:
+            run = self._runs.pop(root, None)
+            self._pending.pop(root, None)
+            for run_id in [r for r, owner in self._roots.items() if owner == root]:
+                del self._roots[run_id]
+                self._parents.pop(run_id, None)
+                self._node_runs.pop(run_id, None)
+                slot = self._slots.pop(run_id, None)
+                if slot is not None:
+                    slot.profile = None
+                self._active.pop(run_id, None)
+            if run is None:
+                return
+            if not any(self._runs.values()):
+                threading.setprofile_all_threads(None)
+                self._hooked = False
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+                    self._started_tracemalloc = False
+
+        with open(os.path.join(run["dir"], "run.collapsed"), "w") as f:
+            for stack, weight in sorted(run["stacks"].items()):
+                f.write(f"{stack} {weight}\n")
+        nodes = dict(sorted(run["nodes"].items(), key=lambda item: -item[1]["cpu_seconds"]))
+        with open(os.path.join(run["dir"], "summary.json"), "w") as f:
+            json.dump({"run_id": str(root), "nodes": nodes}, f, indent=2)
+
+    def _finish_chain(self, run_id: UUID, parent_run_id: UUID | None) -> None:
+        self._unhook()
+        try:
+            self._finish_node(run_id)
+            if parent_run_id is None:
+                self._finish_root(run_id)
+        finally:
+            self._rehook()
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._finish_chain(run_id, parent_run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._finish_chain(run_id, parent_run_id)
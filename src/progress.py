@@ -0,0 +1,13 @@
+from langgraph.config import get_stream_writer
+
+
+def emit_progress(event: str, **data) -> None:
+    """Send a progress event to callers streaming the graph with stream_mode="custom".
+
+    Does nothing when the node runs outside of a graph, e.g. when called directly.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, **data})
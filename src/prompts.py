@@ -0,0 +1,65 @@
+"""Prompt assembly laid out for provider-side prompt caching.
+
+Providers cache the longest prompt prefix they have seen before, so a prompt is
+built from its most to least stable parts: the fixed instructions and blocks that
+only change with the template come first, then what every call of one paper
+shares (the topic, the drafted sections), and the content of the single call last.
+Instructions never interpolate anything, which keeps the cached prefix byte-stable
+across calls and runs.
+"""
+
+from typing import Sequence
+
+from src.scheduler import provider_of
+
+
+# Providers that only cache up to explicitly marked breakpoints
+EXPLICIT_CACHE_PROVIDERS = {"anthropic"}
+
+
+def prompt_block(heading: str, tag: str, content: str) -> str:
+    """Render one tagged section of a prompt, e.g. `# TOPIC` followed by `<topic>…</topic>`"""
+    return f"# {heading}\n<{tag}>\n{content}\n</{tag}>"
+
+
+def _text_part(text: str, breakpoint: bool) -> dict:
+    part = {"type": "text", "text": text}
+    if breakpoint:
+        part["cache_control"] = {"type": "ephemeral"}
+    return part
+
+
+def assemble_messages(
+    model: str,
+    instructions: str,
+    static: Sequence[str] = (),
+    shared: Sequence[str] = (),
+    specific: Sequence[str] = (),
+    request: str = "",
+) -> list[dict]:
+    """Build the chat messages of a prompt, most stable parts first.
+
+    The `instructions` and the `static` blocks (the same for every call with the same
+    template) form the system message. The user message holds the `shared` blocks
+    (the same for every call of one paper), then the call's `specific` blocks and the
+    `request`. For providers that cache only at explicit breakpoints, the end of the
+    system message and of the shared blocks are marked as breakpoints.
+    """
+    system = "\n\n".join([instructions.strip(), *static])
+    shared_text = "\n\n".join(shared)
+    specific_text = "\n\n".join([*specific, request] if request else specific)
+
+    if provider_of(model) not in EXPLICIT_CACHE_PROVIDERS:
+        user = "\n\n".join(part for part in (shared_text, specific_text) if part)
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+    user_parts = []
+    if shared_text:
+        user_parts.append(_text_part(shared_text + "\n\n", breakpoint=True))
+    if specific_text:
+        user_parts.append(_text_part(specific_text, breakpoint=False))
+    return [
+        {"role": "system", "content": [_text_part(system, breakpoint=True)]},
+        {"role": "user", "content": user_parts},
+    ]
+
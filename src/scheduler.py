@@ -0,0 +1,440 @@
+"""Shared scheduler for the outbound model and web search calls.
+
+Every call goes through `SCHEDULER`, which is shared by all nodes and runs in the
+process. A call first waits for its provider's rate limit (token buckets for
+requests per second and tokens per minute), then holds a slot of its concurrency
+limit while it runs. Transient failures (429s, 5xx responses, timeouts, dropped
+connections) are retried with jittered exponential backoff, honouring Retry-After.
+Hedged calls fire a duplicate once the first has been running longer than the
+recent p95 latency of the same kind of call, if the provider's rate limit has room
+for it, and take whichever answers first.
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable
+
+from src.durable import is_transient_error, mark_call_retried
+from src.limits import LLM_LIMIT, ConcurrencyLimit
+from src.metrics import OUTBOUND_CALLS, OUTBOUND_HEDGES, RATE_LIMIT_WAIT
+from src.text import estimate_tokens, message_text
+
+
+SEARCH_PROVIDER = "tavily"
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+HEDGE_QUANTILE = 0.95
+# Hedging starts once this many calls of a kind have been timed
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+def provider_of(model: str) -> str:
+    """Return the provider of a `provider:model` name"""
+    return model.split(":", 1)[0]
+
+
+def prompt_tokens(messages: list[dict]) -> int:
+    """Estimate the prompt tokens of chat messages"""
+    return sum(estimate_tokens(message_text(message)) for message in messages)
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, exc: BaseException | None = None) -> float:
+    """Seconds to wait before retrying after failed attempt number `attempt`.
+
+    Uses the server's Retry-After when it sent one, otherwise exponential backoff
+    with full jitter, so callers throttled together don't retry together.
+    """
+    retry_after = _retry_after(exc) if exc is not None else None
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` units per second, holding at most `capacity`.
+
+    Callers reserve their units up front and then wait until the bucket would have
+    held them, so waiting callers are served in arrival order and never spin.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        # [level, updated]
+        self._state = [capacity, time.monotonic()]
+        self._lock = threading.Lock()
+
+    def _level(self, now: float) -> float:
+        return min(self.capacity, self._state[0] + (now - self._state[1]) * self.rate)
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` units and return the seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            level = self._level(now) - amount
+            self._state[0], self._state[1] = level, now
+            return max(0.0, -level / self.rate)
+
+    def available(self) -> float:
+        """Return the units that could be taken right now without waiting"""
+        with self._lock:
+            return self._level(time.monotonic())
+
+
+class SharedTokenBucket(TokenBucket):
+    """`TokenBucket` kept in shared memory, so several processes draw from one budget.
+
+    Create it in the parent process and hand it to the workers as they start; the
+    monotonic clock is system-wide, so every process sees the same refills.
+    """
+
+    def __init__(self, rate: float, capacity: float, context=None):
+        self.rate = rate
+        self.capacity = capacity
+        # [level, updated], guarded by the array's own process-shared lock
+        self._state = (context or multiprocessing).Array("d", [capacity, time.monotonic()])
+
+    @property
+    def _lock(self):
+        return self._state.get_lock()
+
+
+class RateLimit:
+    """Request and token rate limits of one provider; None disables either.
+
+    Pass a multiprocessing `context` to keep the buckets in shared memory, for a
+    limit shared by worker processes (see `shared_rate_limits`).
+    """
+
+    def __init__(
+        self, requests_per_second: float | None = None, tokens_per_minute: float | None = None, context=None
+    ):
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+
+        def bucket(rate: float, capacity: float):
+            if context is None:
+                return TokenBucket(rate, capacity)
+            return SharedTokenBucket(rate, capacity, context)
+
+        # Bursts are capped at a tenth of each limit, so a burst followed by calls at
+        # the full rate still fits in the provider's window
+        self._requests = None
+        if requests_per_second:
+            self._requests = bucket(requests_per_second, max(1.0, requests_per_second / 10))
+        self._tokens = None
+        if tokens_per_minute:
+            self._tokens = bucket(tokens_per_minute / 60, tokens_per_minute / 10)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens` tokens, returning the seconds to wait"""
+        delay = self._requests.reserve() if self._requests else 0.0
+        if self._tokens and tokens:
+            delay = max(delay, self._tokens.reserve(tokens))
+        return delay
+
+    def has_room(self, tokens: int = 0) -> bool:
+        """Whether a call with `tokens` tokens could start now without waiting"""
+        if self._requests and self._requests.available() < 1:
+            return False
+        return not (self._tokens and tokens and self._tokens.available() < tokens)
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls of one kind"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Return the `q` quantile, or None until enough calls have been timed"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CallScheduler:
+    """Rate limits, retries and hedges outbound calls (see the module docstring)"""
+
+    def __init__(self):
+        self._rate_limits: dict[str, RateLimit] = {}
+        self._latencies: dict[tuple[str, str], LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def set_rate_limit(
+        self, provider: str, requests_per_second: float | None = None, tokens_per_minute: float | None = None
+    ) -> None:
+        """Limit the calls to `provider`; with neither limit set, its calls are not rate limited"""
+        with self._lock:
+            if requests_per_second or tokens_per_minute:
+                self._rate_limits[provider] = RateLimit(requests_per_second, tokens_per_minute)
+            else:
+                self._rate_limits.pop(provider, None)
+
+    def install_rate_limits(self, rate_limits: dict[str, RateLimit]) -> None:
+        """Replace the rate limits with ready-made ones, e.g. limits shared with other processes"""
+        with self._lock:
+            self._rate_limits = dict(rate_limits)
+
+    def clear_rate_limits(self) -> None:
+        with self._lock:
+            self._rate_limits.clear()
+
+    def reset(self) -> None:
+        """Drop every rate limit and the latency history hedging is based on"""
+        with self._lock:
+            self._rate_limits.clear()
+            self._latencies.clear()
+
+    def _latency(self, provider: str, operation: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._latencies.get((provider, operation))
+            if tracker is None:
+                tracker = self._latencies[(provider, operation)] = LatencyTracker()
+            return tracker
+
+    def _has_room(self, provider: str, tokens: int) -> bool:
+        rate_limit = self._rate_limits.get(provider)
+        return rate_limit is None or rate_limit.has_room(tokens)
+
+    def _rate_delay(self, provider: str, tokens: int) -> float:
+        rate_limit = self._rate_limits.get(provider)
+        delay = rate_limit.reserve(tokens) if rate_limit else 0.0
+        if delay:
+            RATE_LIMIT_WAIT.observe(delay, provider=provider)
+        return delay
+
+    @contextmanager
+    def slot(self, provider: str, limit: ConcurrencyLimit = LLM_LIMIT, tokens: int = 0):
+        """Wait for the provider's rate limit, then hold a slot of `limit` for a blocking call"""
+        delay = self._rate_delay(provider, tokens)
+        if delay:
+            time.sleep(delay)
+        with limit.slot():
+            yield
+
+    @asynccontextmanager
+    async def aslot(self, provider: str, limit: ConcurrencyLimit = LLM_LIMIT, tokens: int = 0):
+        """Async version of `slot`"""
+        delay = self._rate_delay(provider, tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        async with limit.aslot():
+            yield
+
+    def _timed(self, fn: Callable[[], Any], provider: str, operation: str, limit: ConcurrencyLimit, tokens: int):
+        with self.slot(provider, limit, tokens):
+            start = time.perf_counter()
+            result = fn()
+        self._latency(provider, operation).add(time.perf_counter() - start)
+        return result
+
+    async def _atimed(
+        self, afn: Callable[[], Awaitable], provider: str, operation: str, limit: ConcurrencyLimit, tokens: int
+    ):
+        async with self.aslot(provider, limit, tokens):
+            start = time.perf_counter()
+            result = await afn()
+        self._latency(provider, operation).add(time.perf_counter() - start)
+        return result
+
+    def _submit(self, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="hedge")
+        # Each attempt runs in a copy of the caller's context, so callbacks still attach to the node
+        return self._executor.submit(contextvars.copy_context().run, self._timed, *args)
+
+    def _hedged(self, fn, provider: str, operation: str, limit: ConcurrencyLimit, tokens: int):
+        delay = self._latency(provider, operation).quantile(HEDGE_QUANTILE)
+        if delay is None:
+            return self._timed(fn, provider, operation, limit, tokens)
+
+        primary = self._submit(fn, provider, operation, limit, tokens)
+        # Hedges only use spare rate: with the provider's budget spent, keep waiting on the first call
+        if wait([primary], timeout=delay).done or not self._has_room(provider, tokens):
+            return primary.result()
+
+        # A blocking call can't be cancelled, so the losing attempt runs to completion in the background
+        hedge = self._submit(fn, provider, operation, limit, tokens)
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    OUTBOUND_HEDGES.inc(provider=provider, operation=operation, won=str(future is hedge).lower())
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, afn, provider: str, operation: str, limit: ConcurrencyLimit, tokens: int):
+        delay = self._latency(provider, operation).quantile(HEDGE_QUANTILE)
+        if delay is None:
+            return await self._atimed(afn, provider, operation, limit, tokens)
+
+        primary = asyncio.ensure_future(self._atimed(afn, provider, operation, limit, tokens))
+        pending, error = {primary}, None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._has_room(provider, tokens):
+                return await primary
+
+            hedge = asyncio.ensure_future(self._atimed(afn, provider, operation, limit, tokens))
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        OUTBOUND_HEDGES.inc(provider=provider, operation=operation, won=str(task is hedge).lower())
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        provider: str,
+        operation: str,
+        limit: ConcurrencyLimit = LLM_LIMIT,
+        tokens: int = 0,
+        max_attempts: int = 1,
+        hedge: bool = False,
+    ):
+        """Run the blocking call `fn` under the limits of `provider` and return its result.
+
+        `operation` names the kind of call whose latencies decide when to hedge, and
+        `tokens` is charged to the provider's tokens-per-minute limit. Transient errors
+        are retried up to `max_attempts` in all; other errors are raised at once. An
+        error raised after retries is flagged, so node retry policies don't retry it again.
+        """
+        for attempt in range(1, max(1, max_attempts) + 1):
+            try:
+                if hedge:
+                    result = self._hedged(fn, provider, operation, limit, tokens)
+                else:
+                    result = self._timed(fn, provider, operation, limit, tokens)
+            except Exception as e:
+                if attempt >= max_attempts or not is_transient_error(e):
+                    OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="error")
+                    if attempt > 1:
+                        mark_call_retried(e)
+                    raise
+                OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="retry")
+                time.sleep(backoff_delay(attempt, e))
+            else:
+                OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="ok")
+                return result
+
+    async def acall(
+        self,
+        afn: Callable[[], Awaitable],
+        provider: str,
+        operation: str,
+        limit: ConcurrencyLimit = LLM_LIMIT,
+        tokens: int = 0,
+        max_attempts: int = 1,
+        hedge: bool = False,
+    ):
+        """Async version of `call`; `afn` returns a new awaitable for every attempt"""
+        for attempt in range(1, max(1, max_attempts) + 1):
+            try:
+                if hedge:
+                    result = await self._ahedged(afn, provider, operation, limit, tokens)
+                else:
+                    result = await self._atimed(afn, provider, operation, limit, tokens)
+            except Exception as e:
+                if attempt >= max_attempts or not is_transient_error(e):
+                    OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="error")
+                    if attempt > 1:
+                        mark_call_retried(e)
+                    raise
+                OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="retry")
+                await asyncio.sleep(backoff_delay(attempt, e))
+            else:
+                OUTBOUND_CALLS.inc(provider=provider, operation=operation, status="ok")
+                return result
+
+
+SCHEDULER = CallScheduler()
+
+
+def set_rate_limits(limits: dict[str, dict] | None) -> None:
+    """Replace the provider rate limits, e.g. {"openai": {"requests_per_second": 50, "tokens_per_minute": 2_000_000}}"""
+    SCHEDULER.clear_rate_limits()
+    for provider, limit in (limits or {}).items():
+        SCHEDULER.set_rate_limit(provider, **limit)
+
+
+def shared_rate_limits(limits: dict[str, dict] | None, context=None) -> dict[str, RateLimit]:
+    """Build provider rate limits in shared memory, to hand to worker processes for
+    `SCHEDULER.install_rate_limits`, so all of them stay under one budget"""
+    context = context or multiprocessing.get_context()
+    return {
+        provider: RateLimit(**limit, context=context)
+        for provider, limit in (limits or {}).items()
+        if limit.get("requests_per_second") or limit.get("tokens_per_minute")
+    }
+
+
+def call_llm(fn: Callable[[], Any], model: str, operation: str, messages: list[dict], configuration, hedge: bool = True):
+    """Run the blocking model call `fn` with the retry and hedging settings of `configuration`.
+
+    Pass `hedge=False` for calls too expensive to duplicate, like drafting.
+    """
+    return SCHEDULER.call(
+        fn,
+        provider_of(model),
+        operation,
+        LLM_LIMIT,
+        tokens=prompt_tokens(messages),
+        max_attempts=configuration.call_max_attempts,
+        hedge=hedge and configuration.hedge_requests,
+    )
+
+
+async def acall_llm(
+    afn: Callable[[], Awaitable], model: str, operation: str, messages: list[dict], configuration, hedge: bool = True
+):
+    """Async version of `call_llm`"""
+    return await SCHEDULER.acall(
+        afn,
+        provider_of(model),
+        operation,
+        LLM_LIMIT,
+        tokens=prompt_tokens(messages),
+        max_attempts=configuration.call_max_attempts,
+        hedge=hedge and configuration.hedge_requests,
+    )
@@ -23,9 +23,18 @@ class Section(BaseModel):
         description="Whether the section requires research to be written or it can be written based on other section contents"
     )
     search_queries: list[str] = Field(
-        description="Make sure this field is always empty"
+        default_factory=list, description="The web search queries run for the section"
     )
     search_results: list[SearchResult] = Field(
-        description="Make sure this field is always empty"
+        default_factory=list, description="The web search results found for the section"
     )
-    section_context: str = Field(description="Make sure this field is always empty")
+    section_context: str = Field(
+        default="", description="The research context the section is drafted from"
+    )
+
+
+def get_field(section: Section | dict, name: str, default=None):
+    """Read a field from a section given either as a `Section` or as a plain dict"""
+    if isinstance(section, dict):
+        return section.get(name, default)
+    return getattr(section, name, default)
@@ -0,0 +1,152 @@
+"""Search backends behind the `search_web` node.
+
+Every backend answers a query with a Tavily-style response (`{"query", "results"}`)
+and raises when the search fails:
+
+- `TavilyBackend` searches the web through the shared search client and the call scheduler
+- `LocalCorpusBackend` answers from the on-disk corpus of earlier results (see `src/corpus.py`)
+- `TieredBackend` answers from the corpus when its matches are good enough and from
+  the web otherwise, adding the web results to the corpus
+"""
+
+import asyncio
+import math
+import os
+from abc import ABC, abstractmethod
+
+from src.clients import get_async_search_client, get_search_client
+from src.configuration import Configuration
+from src.corpus import CORPUS_FILE, LocalCorpus, get_corpus
+from src.limits import SEARCH_LIMIT
+from src.metrics import TIERED_SEARCHES
+from src.scheduler import SCHEDULER, SEARCH_PROVIDER
+
+
+class SearchBackend(ABC):
+    """Interface of a search backend; `asearch` defaults to running `search` in a thread"""
+
+    name = ""
+
+    @abstractmethod
+    def search(self, query: str, max_results: int, topic: str, timeout: float, raw_content: bool = False) -> dict:
+        """Return the Tavily-style response to `query`, raising when the search fails"""
+
+    async def asearch(
+        self, query: str, max_results: int, topic: str, timeout: float, raw_content: bool = False
+    ) -> dict:
+        return await asyncio.to_thread(self.search, query, max_results, topic, timeout, raw_content)
+
+
+class TavilyBackend(SearchBackend):
+    """Web search through the shared search client, with up to `max_attempts` attempts per query, hedged if `hedge` is set"""
+
+    name = "tavily"
+
+    def __init__(self, max_attempts: int = 1, hedge: bool = False):
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+
+    def search(self, query, max_results, topic, timeout, raw_content=False):
+        client = get_search_client()
+        return SCHEDULER.call(
+            lambda: client.search(
+                query,
+                max_results=max_results,
+                topic=topic,
+                timeout=timeout,
+                include_raw_content=raw_content,
+            ),
+            SEARCH_PROVIDER,
+            "search",
+            SEARCH_LIMIT,
+            max_attempts=self.max_attempts,
+            hedge=self.hedge,
+        )
+
+    async def asearch(self, query, max_results, topic, timeout, raw_content=False):
+        client = get_async_search_client()
+        return await SCHEDULER.acall(
+            lambda: asyncio.wait_for(
+                client.search(
+                    query,
+                    max_results=max_results,
+                    topic=topic,
+                    timeout=timeout,
+                    include_raw_content=raw_content,
+                ),
+                timeout,
+            ),
+            SEARCH_PROVIDER,
+            "search",
+            SEARCH_LIMIT,
+            max_attempts=self.max_attempts,
+            hedge=self.hedge,
+        )
+
+
+class LocalCorpusBackend(SearchBackend):
+    """Offline search over a local corpus; the topic is ignored"""
+
+    name = "local"
+
+    def __init__(self, corpus: LocalCorpus):
+        self.corpus = corpus
+
+    def search(self, query, max_results, topic, timeout, raw_content=False):
+        return self.corpus.search(query, max_results, raw_content)
+
+
+class TieredBackend(SearchBackend):
+    """Answer from the local corpus when it matches well, from the web otherwise.
+
+    A query is answered locally when at least half of `max_results` corpus results
+    have a match score of at least `min_score`; only those results are returned.
+    Otherwise the `web` backend answers, and its results are added to the corpus.
+    Responses carry a `source` of "local" or "web".
+    """
+
+    name = "tiered"
+
+    def __init__(self, corpus: LocalCorpus, web: SearchBackend, min_score: float):
+        self.corpus = corpus
+        self.web = web
+        self.min_score = min_score
+
+    def _local(self, query: str, max_results: int, raw_content: bool) -> dict | None:
+        response = self.corpus.search(query, max_results, raw_content)
+        good = [item for item in response["results"] if item["score"] >= self.min_score]
+        if len(good) < max(1, math.ceil(max_results / 2)):
+            return None
+        TIERED_SEARCHES.inc(source="local")
+        return {**response, "results": good, "source": "local"}
+
+    def _web(self, response: dict) -> dict:
+        TIERED_SEARCHES.inc(source="web")
+        if response:
+            self.corpus.add(response.get("results", []))
+        return {**response, "source": "web"}
+
+    def search(self, query, max_results, topic, timeout, raw_content=False):
+        local = self._local(query, max_results, raw_content)
+        if local is not None:
+            return local
+        return self._web(self.web.search(query, max_results, topic, timeout, raw_content))
+
+    async def asearch(self, query, max_results, topic, timeout, raw_content=False):
+        local = await asyncio.to_thread(self._local, query, max_results, raw_content)
+        if local is not None:
+            return local
+        response = await self.web.asearch(query, max_results, topic, timeout, raw_content)
+        return await asyncio.to_thread(self._web, response)
+
+
+def search_backend(configuration: Configuration) -> SearchBackend:
+    """Return the search backend selected by `configuration`"""
+    web = TavilyBackend(configuration.call_max_attempts, configuration.hedge_requests)
+    if configuration.search_backend == "tavily":
+        return web
+
+    corpus = get_corpus(configuration.local_corpus_path or os.path.join(configuration.cache_dir, CORPUS_FILE))
+    if configuration.search_backend == "local":
+        return LocalCorpusBackend(corpus)
+    return TieredBackend(corpus, web, configuration.local_corpus_min_score)
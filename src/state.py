@@ -5,6 +5,14 @@ import operator
 from src.schema import Section, SearchResult
 
 
+def merge_stats(left: dict | None, right: dict | None) -> dict:
+    """Reducer that sums per-run counters reported by the nodes"""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
 # Main Agent Input State
 class InputState(TypedDict):
     topic: str
@@ -15,12 +23,17 @@ class AgentState(TypedDict):
     topic: str
     sections: list[Section]
     researched_sections: Annotated[list[Section], operator.add]
+    section_queries: Annotated[list[dict], operator.add]
+    section_contexts: dict[str, str]
+    section_drafts: Annotated[list[dict], operator.add]
     final_report: str
+    run_stats: Annotated[dict, merge_stats]
 
 
 # Main Agent Output State
 class OutputState(TypedDict):
     final_report: str
+    run_stats: Annotated[dict, merge_stats]
 
 
 class ResearchAgentState(TypedDict):
@@ -29,3 +42,4 @@ class ResearchAgentState(TypedDict):
     search_results: list[SearchResult]
     section_context: str
     researched_sections: Annotated[list[Section], operator.add]
+    run_stats: Annotated[dict, merge_stats]
@@ -0,0 +1,519 @@
+import re
+from functools import lru_cache
+
+from pydantic import BaseModel, ConfigDict
+
+from src.configuration import Configuration
+from src.text import normalize_text
+
+
+TEMPLATES = {
+    "Analytical Paper": """
+# Research Paper — Analytical Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+- **Correspondence**
+
+## Abstract (150–250 words)
+- Concise summary of the research question, sources analyzed, methods of analysis, and main insights.
+- Should emphasize interpretation rather than taking a definitive stance.
+- No citations here.
+
+## Introduction
+- Background and motivation
+- Research question(s) or guiding problem
+- Scope and boundaries of the analysis
+- Contributions (bulleted list of what the paper adds)
+- Organization of the paper
+
+## Related Work / Literature Context
+- Synthesize prior literature and perspectives
+- Highlight debates, patterns, or trends relevant to the analysis
+- Identify gaps that your analysis addresses
+
+## Analytical Framework / Method
+- Explain the framework, models, or methods used for analysis
+- Data, texts, or materials examined
+- Criteria for inclusion/exclusion
+- Assumptions and rationale
+
+## Analysis
+- Systematic breakdown of the evidence (thematic, chronological, comparative, etc.)
+- Tables, figures, or diagrams to support interpretation
+- Multiple subsections allowed (###) to handle dimensions of analysis
+
+## Discussion
+- Interpret the findings: what do they mean?
+- Connections back to literature
+- Strengths and limitations of your analysis
+- Broader implications
+
+## Conclusion
+- Recap of key insights
+- What new understanding the analysis provides
+- Implications for theory, practice, or future research
+
+## Future Work
+- Open questions raised by the analysis
+- Possible extensions of the framework or data
+- Recommendations for deeper or comparative studies
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+
+## Appendices (optional)
+- Extended tables, coding schemes, or supplementary analysis
+""",
+    "Argumentative/Persuasive Paper": """
+# Research Paper — Argumentative/Persuasive Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The claim, the main lines of evidence and the conclusion.
+
+## Introduction
+- Background of the issue and why it matters now
+- Thesis statement
+- Organization of the paper
+
+## Background
+- Key terms, history and current state of the debate
+- Stakeholders and their positions
+
+## Arguments and Evidence
+- Each supporting argument with the evidence behind it
+- Data, studies and expert opinion
+- Multiple subsections allowed (###), one per argument
+
+## Counterarguments and Rebuttals
+- Strongest opposing positions, stated fairly
+- Evidence-based rebuttal of each
+
+## Implications and Recommendations
+- Policy, practice or research consequences of accepting the thesis
+- Concrete recommendations
+
+## Conclusion
+- Restate the thesis in light of the evidence
+- Call to action
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Case Study": """
+# Research Paper — Case Study
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The case, the problem, the approach of the study and the key lessons.
+
+## Introduction
+- Why this case was chosen
+- Research questions the case addresses
+- Organization of the paper
+
+## Case Background
+- Context of the organization, event or subject
+- Timeline of relevant events
+- Key actors and constraints
+
+## Literature and Theoretical Lens
+- Prior studies of similar cases
+- Frameworks used to interpret the case
+
+## Methodology
+- Data sources (interviews, documents, observations, metrics)
+- How the data was collected and analyzed
+
+## Findings
+- What happened and why, supported by case evidence
+- Tables or timelines where useful
+
+## Discussion
+- Interpretation against the theoretical lens
+- Transferable lessons and their limits
+
+## Conclusion
+- Summary of lessons learned
+- Recommendations for practitioners
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Cause and Effect Paper": """
+# Research Paper — Cause and Effect Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The phenomenon, its main causes and effects, and the strength of the evidence.
+
+## Introduction
+- The phenomenon and why its causes and effects matter
+- Thesis about the causal relationship
+- Organization of the paper
+
+## Background
+- Definitions and history of the phenomenon
+- Prior explanations in the literature
+
+## Causes
+- Primary and contributing causes with supporting evidence
+- Mechanisms linking each cause to the phenomenon
+
+## Effects
+- Short- and long-term effects with supporting evidence
+- Who or what is affected and how strongly
+
+## Evaluation of the Causal Evidence
+- Correlation versus causation, confounders and alternative explanations
+- Quality and limits of the available studies
+
+## Conclusion
+- Summary of the causal chain
+- Implications and possible interventions
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Compare and Contrast Paper": """
+# Research Paper — Compare and Contrast Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The subjects compared, the criteria and the main similarities and differences.
+
+## Introduction
+- The subjects and why comparing them is useful
+- Thesis about how they relate
+- Organization of the paper
+
+## Background on the Subjects
+- Overview of each subject
+- Context needed to compare them fairly
+
+## Criteria for Comparison
+- Dimensions of the comparison and why they were chosen
+- Sources of evidence for each dimension
+
+## Similarities
+- Shared characteristics along each criterion, with evidence
+
+## Differences
+- Diverging characteristics along each criterion, with evidence
+- Comparison table summarizing both subjects
+
+## Discussion
+- What the similarities and differences reveal
+- Trade-offs and contexts where each subject is preferable
+
+## Conclusion
+- Summary of the comparison
+- Recommendations or open questions
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Descriptive Paper": """
+# Research Paper — Descriptive Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The subject described and the most important characteristics covered.
+
+## Introduction
+- The subject and why a detailed description is useful
+- Scope of the description
+- Organization of the paper
+
+## Background
+- History and context of the subject
+- Key terms and definitions
+
+## Description
+- Components, characteristics and how they fit together
+- Current state, with data and examples
+- Multiple subsections allowed (###) for distinct aspects
+
+## Notable Examples
+- Representative instances or cases illustrating the subject
+
+## Conclusion
+- Summary of the most important characteristics
+- Where the subject appears to be heading
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Experimental Research Paper": """
+# Research Paper — Experimental Research Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+- **Correspondence**
+
+## Abstract (150–250 words)
+- Objective, experimental design, main results and conclusion.
+
+## Introduction
+- Background and motivation
+- Hypotheses
+- Contributions
+- Organization of the paper
+
+## Related Work
+- Prior experiments and findings on the question
+- Gaps the experiment addresses
+
+## Materials and Methods
+- Participants, samples or systems studied
+- Experimental design, variables and controls
+- Procedure, instruments and statistical analysis
+
+## Results
+- Outcomes for each hypothesis with effect sizes and statistics
+- Tables and figures of the main results
+
+## Discussion
+- Interpretation of the results against the hypotheses
+- Comparison with prior findings
+- Threats to validity and limitations
+
+## Conclusion
+- Summary of the findings and their significance
+
+## Future Work
+- Follow-up experiments and open questions
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+
+## Appendices (optional)
+- Additional tables, materials and raw results
+""",
+    "Interpretive Paper": """
+# Research Paper — Interpretive Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- The work or phenomenon interpreted, the theoretical lens and the main reading.
+
+## Introduction
+- The subject of interpretation and why it matters
+- Thesis of the interpretation
+- Organization of the paper
+
+## Theoretical Framework
+- Theory or critical lens applied and why it fits
+- Key concepts of the framework
+
+## Context
+- Historical, cultural or disciplinary context of the subject
+- Existing interpretations in the literature
+
+## Interpretation
+- Close reading of the subject through the framework
+- Evidence from the subject supporting each point
+- Multiple subsections allowed (###) for distinct themes
+
+## Discussion
+- How the interpretation extends or challenges existing readings
+- Limits of the chosen lens
+
+## Conclusion
+- Summary of the interpretation and its significance
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+    "Survey Research Paper": """
+# Research Paper — Survey Research Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- Research questions, survey population, method and key findings.
+
+## Introduction
+- Background and motivation
+- Research questions
+- Organization of the paper
+
+## Literature Review
+- Prior surveys and studies on the topic
+- Constructs and measures used in the field
+
+## Survey Methodology
+- Population, sampling and response rate
+- Questionnaire design and validated instruments
+- Data collection and analysis methods
+
+## Results
+- Descriptive statistics of the respondents
+- Findings for each research question with tables and figures
+
+## Discussion
+- Interpretation of the findings
+- Comparison with prior surveys
+- Limitations such as sampling and response bias
+
+## Conclusion
+- Summary of the findings and recommendations
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+
+## Appendices (optional)
+- Full questionnaire and additional tables
+""",
+    "Review Paper": """
+# Research Paper — Review Paper
+
+## Title Page
+- **Title**
+- **Authors & Affiliations**
+
+## Abstract (150–250 words)
+- Scope of the review, sources covered and main conclusions.
+
+## Introduction
+- The field and why a review is needed now
+- Review questions and scope
+- Organization of the paper
+
+## Review Methodology
+- Databases, search strings and time range
+- Inclusion and exclusion criteria
+- Screening and synthesis process
+
+## Thematic Review of the Literature
+- Main themes, approaches and results in the field
+- Comparison table of key studies
+- Multiple subsections allowed (###), one per theme
+
+## Trends and Open Challenges
+- How the field has evolved
+- Unresolved problems and conflicting findings
+
+## Discussion
+- Synthesis across themes
+- Limitations of the review
+
+## Conclusion
+- Summary of the state of the field
+
+## Future Directions
+- Research agenda suggested by the gaps
+
+## References
+- Full bibliography in the required style (APA, IEEE, etc.)
+""",
+}
+
+DEFAULT_PAPER_TYPE = "Analytical Paper"
+
+# Sections written from the other sections' content rather than from web research,
+# matched against the start of the normalized heading
+NO_RESEARCH_TITLES = (
+    "title page",
+    "abstract",
+    "keywords",
+    "introduction",
+    "conclusion",
+    "future work",
+    "future directions",
+    "references",
+    "bibliography",
+    "appendix",
+    "appendices",
+    "acknowledgments",
+)
+
+# A heading may end with "[research]" or "[no research]" to override the default
+RESEARCH_MARKER = re.compile(r"\s*\[(no )?research\]\s*$", re.IGNORECASE)
+NOTE = re.compile(r"\s*\(([^()]*)\)\s*$")
+
+
+class OutlineSection(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    title: str
+    points: tuple[str, ...] = ()
+    require_research: bool = True
+
+
+def _requires_research(title: str) -> bool:
+    normalized = normalize_text(title)
+    return not any(normalized.startswith(prefix) for prefix in NO_RESEARCH_TITLES)
+
+
+@lru_cache(maxsize=64)
+def compile_template(template: str) -> tuple[OutlineSection, ...]:
+    """Parse a markdown template into its outline: one section per `##` heading.
+
+    The bullets under a heading become the section's points, a trailing
+    parenthetical note of the heading (e.g. "(optional)") is moved to the points, and
+    `require_research` comes from the heading unless a research marker overrides it.
+    """
+    outline: list[OutlineSection] = []
+    title, points, marker = None, [], None
+
+    def flush():
+        if title:
+            require_research = _requires_research(title) if marker is None else marker
+            outline.append(OutlineSection(title=title, points=tuple(points), require_research=require_research))
+
+    for line in template.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            flush()
+            title, points, marker = line[3:].strip(), [], None
+            match = RESEARCH_MARKER.search(title)
+            if match:
+                marker = match.group(1) is None
+                title = title[: match.start()]
+            match = NOTE.search(title)
+            if match:
+                points.append(match.group(1).strip())
+                title = title[: match.start()]
+        elif title and line[:2] in ("- ", "* ", "+ "):
+            points.append(line[2:].strip())
+        elif title and line.startswith("###"):
+            points.append(line.lstrip("#").strip())
+    flush()
+    return tuple(outline)
+
+
+def resolve_template(configuration: Configuration) -> str:
+    """Return the template of the run: the custom `document_template`, or the built-in
+    template of `research_paper_type`"""
+    if configuration.document_template.strip():
+        return configuration.document_template
+    return TEMPLATES.get(configuration.research_paper_type or DEFAULT_PAPER_TYPE, TEMPLATES[DEFAULT_PAPER_TYPE])
+
+
+def get_outline(configuration: Configuration) -> tuple[OutlineSection, ...]:
+    """Return the compiled outline of the run's template"""
+    return compile_template(resolve_template(configuration))
@@ -0,0 +1,45 @@
+import re
+
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or the to what when where which who why with".split()
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase `text`, replace punctuation with spaces and collapse whitespace"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def token_set(text: str) -> frozenset[str]:
+    """Return the normalized tokens of `text` without stopwords"""
+    return frozenset(t for t in normalize_text(text).split() if t not in STOPWORDS)
+
+
+def shingles(text: str, k: int = 5) -> frozenset[str]:
+    """Return the set of `k`-word shingles of `text` (the whole text if it is shorter)"""
+    words = normalize_text(text).split()
+    if len(words) <= k:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i : i + k]) for i in range(len(words) - k + 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two sets, 1.0 when both are empty"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def message_text(message: dict) -> str:
+    """Return the text of a chat message, whether its content is a string or a list of parts"""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
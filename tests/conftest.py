@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from benchmarks.fakes import install_fakes
+from benchmarks.rate_limits import ThrottlingServer
+
+
+@pytest.fixture
+def fakes():
+    """Yield `install_fakes` for the test to call, and reset the client registry afterwards"""
+    yield install_fakes
+
+    # Drop the fake clients so later tests start from a clean registry
+    from src.clients import configure_clients
+
+    configure_clients()
+
+
+@pytest.fixture
+def servers():
+    """Yield a function starting a `ThrottlingServer` with fast, steady responses by
+    default, and stop every server started and the scheduler's rate limits afterwards"""
+    started = []
+
+    def start(**kwargs) -> ThrottlingServer:
+        server = ThrottlingServer(**{"delay": 0.0, "slow_rate": 0.0, **kwargs})
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append(server)
+        return server
+
+    yield start
+
+    from src.scheduler import SCHEDULER
+
+    SCHEDULER.reset()
+    for server in started:
+        server.shutdown()
+        server.server_close()
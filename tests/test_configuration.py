@@ -0,0 +1,28 @@
+from typing import get_args
+
+import pytest
+
+from src.configuration import LEGACY_MODEL_NAMES, Configuration, ModelName
+
+
+@pytest.mark.parametrize("legacy_name", sorted(LEGACY_MODEL_NAMES))
+def test_legacy_model_names_migrate_to_a_selectable_model(legacy_name):
+    configuration = Configuration(query_model=legacy_name, planner_model=legacy_name, drafting_model=legacy_name)
+
+    assert configuration.drafting_model == LEGACY_MODEL_NAMES[legacy_name]
+    assert configuration.drafting_model in get_args(ModelName)
+
+
+def test_every_model_name_of_earlier_releases_still_validates():
+    earlier = [
+        "openai:gpt-5-nano", "openai:gpt-4.1", "openai:o4-mini-2025-04-16", "openai:gpt-4o", "openai:gpt-4o-mini",
+        "openai:gpt-5", "openai:gpt-5-mini", "openai:gpt-5-large",
+        "anthropic:claude-3-haiku", "anthropic:claude-3-sonnet", "anthropic:claude-3-opus",
+        "anthropic:claude-3-5-sonnet", "anthropic:claude-3-5-opus",
+        "google:gemini-1.5-flash", "google:gemini-1.5-pro", "google:gemini-1.5-ultra",
+        "google:gemini-2.0-flash", "google:gemini-2.0-pro",
+    ]
+
+    for name in earlier:
+        configuration = Configuration.from_runnable_config({"configurable": {"query_model": name}})
+        assert configuration.query_model in get_args(ModelName)
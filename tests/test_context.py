@@ -0,0 +1,24 @@
+from src.context import dedupe_results
+
+
+def test_results_without_content_are_kept_unless_their_urls_repeat():
+    results = [
+        {"url": "https://a.example", "content": "", "score": 0.9},
+        {"url": "https://b.example", "content": None, "score": 0.8},
+        {"url": "https://c.example", "content": "...", "score": 0.7},
+        {"url": "https://a.example", "content": "", "score": 0.6},
+    ]
+
+    kept = dedupe_results(results, threshold=0.8)
+
+    assert [item["url"] for item in kept] == ["https://a.example", "https://b.example", "https://c.example"]
+
+
+def test_near_duplicate_snippets_from_different_urls_are_merged():
+    snippet = "graph neural networks learn representations of nodes from their neighbourhoods"
+    results = [
+        {"url": "https://a.example", "content": snippet, "score": 0.5},
+        {"url": "https://b.example", "content": snippet + ".", "score": 0.9},
+    ]
+
+    assert [item["url"] for item in dedupe_results(results, threshold=0.8)] == ["https://b.example"]
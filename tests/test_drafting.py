@@ -0,0 +1,35 @@
+def test_parallel_drafting_routes_sections_restored_as_dicts(fakes):
+    fakes()
+    from src.agent import assign_to_dependent_writer, assign_to_drafting
+    from src.nodes.write_section import stitch_report, write_dependent_section, write_section
+
+    # Sections come back from a checkpoint as plain dicts rather than `Section` models
+    sections = [
+        {"title": "Abstract", "description": "Summary of the paper", "require_research": False},
+        {"title": "Methods", "description": "How the study was run", "require_research": True},
+        {"title": "Conclusion", "description": "What the results mean", "require_research": False},
+    ]
+    config = {"configurable": {"drafting_mode": "parallel"}}
+    state = {
+        "topic": "graph neural networks",
+        "sections": sections,
+        "researched_sections": [{**sections[1], "section_context": "Evidence on the methods."}],
+        "section_contexts": {},
+        "section_drafts": [],
+    }
+
+    for send in assign_to_drafting(state, config):
+        state["section_drafts"] += write_section(send.arg, config)["section_drafts"]
+    sends = assign_to_dependent_writer(state)
+    assert [send.arg["section"]["title"] for send in sends] == ["Abstract", "Conclusion"]
+
+    for send in sends:
+        state["section_drafts"] += write_dependent_section(send.arg, config)["section_drafts"]
+    report = stitch_report(state, config)["final_report"]
+
+    assert "[TODO" not in report
+    assert [line for line in report.splitlines() if line.startswith("## ")] == [
+        "## Abstract",
+        "## Methods",
+        "## Conclusion",
+    ]
@@ -0,0 +1,99 @@
+from collections import Counter
+
+import pytest
+
+import benchmarks.fakes
+from benchmarks.fakes import fake_queries, fake_template
+
+
+FAILING_SECTION = "Analysis"
+
+
+@pytest.fixture
+def query_calls(fakes, monkeypatch):
+    """Count query generation calls per section; `failures[title]` makes that many of a section's calls raise"""
+    calls, failures = Counter(), {}
+
+    def respond(messages, model):
+        response = fake_queries(messages, model)
+        title = response.queries[0].split(" evidence ")[0]
+        calls[title] += 1
+        if failures.get(title):
+            failures[title] -= 1
+            raise failures["error"]
+        return response
+
+    monkeypatch.setitem(benchmarks.fakes.STRUCTURED_RESPONSES, "SearchQueries", respond)
+    fakes()
+    return calls, failures
+
+
+@pytest.fixture
+def durable(tmp_path):
+    from src.agent import durable_graph
+
+    with durable_graph(str(tmp_path / "checkpoints.sqlite")) as graph:
+        yield graph
+
+
+def run_config(thread_id: str, **configurable) -> dict:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "search_cache_mode": "bypass",
+            "document_template": fake_template(6),
+            # Leave transient errors to the node retry policy
+            "call_max_attempts": 1,
+            **configurable,
+        }
+    }
+
+
+def test_a_failed_branch_is_retried_without_rerunning_its_siblings(query_calls):
+    from src.agent import graph
+
+    calls, failures = query_calls
+    failures.update({FAILING_SECTION: 1, "error": ConnectionError("connection reset")})
+
+    output = graph.invoke({"topic": "retried branch"}, run_config("unused"))
+
+    assert "[TODO" not in output["final_report"]
+    assert calls[FAILING_SECTION] == 2
+    assert all(count == 1 for title, count in calls.items() if title != FAILING_SECTION)
+
+
+def test_an_interrupted_run_resumes_from_its_last_checkpoint(query_calls, durable):
+    from src.durable import run_or_resume
+
+    calls, failures = query_calls
+    config = run_config("interrupted")
+    # A non-transient error stops the run mid-graph, after the other branches finished
+    failures.update({FAILING_SECTION: 1, "error": RuntimeError("worker crashed")})
+    with pytest.raises(RuntimeError):
+        run_or_resume(durable, "interrupted run", config)
+    finished = {title for title in calls if title != FAILING_SECTION}
+    assert finished
+    calls.clear()
+
+    output = run_or_resume(durable, "interrupted run", config)
+
+    assert output["final_report"]
+    assert dict(calls) == {FAILING_SECTION: 1}
+
+
+def test_a_finished_thread_is_reused_only_with_the_same_settings(query_calls, durable):
+    from src.durable import run_or_resume
+
+    calls, _ = query_calls
+    first = run_or_resume(durable, "settings", run_config("finished"))
+    sections = sum(calls.values())
+
+    # Settings that only change how the run is carried out reuse the stored output
+    assert run_or_resume(durable, "settings", run_config("finished", hedge_requests=True)) == first
+    assert sum(calls.values()) == sections
+
+    # Settings that change the paper start it over on a clean thread
+    rerun = run_or_resume(durable, "settings", run_config("finished", drafting_mode="parallel"))
+    assert sum(calls.values()) == 2 * sections
+    assert rerun["final_report"] != first["final_report"]
+    assert rerun["run_stats"]["search_calls"] == first["run_stats"]["search_calls"]
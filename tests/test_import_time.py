@@ -0,0 +1,8 @@
+from benchmarks.import_time import DEFAULT_BUDGET_SECONDS, LAZY_MODULES, measure
+
+
+def test_importing_the_graph_stays_within_budget_and_loads_no_provider_sdk():
+    elapsed, modules = measure()
+
+    assert elapsed <= DEFAULT_BUDGET_SECONDS
+    assert not [name for name in LAZY_MODULES if name in modules]
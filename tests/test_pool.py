@@ -0,0 +1,53 @@
+import functools
+import os
+
+import pytest
+
+from benchmarks.fakes import fake_template
+from benchmarks.rate_limits import install_url_clients
+from src.pool import run_pool, split_limit
+
+
+def test_concurrency_caps_split_exactly_between_workers():
+    assert split_limit("llm_concurrency", 5, 4) == [2, 1, 1, 1]
+    assert split_limit("llm_concurrency", 8, 4) == [2, 2, 2, 2]
+    assert split_limit("llm_concurrency", None, 3) == [None, None, None]
+    with pytest.raises(ValueError):
+        split_limit("llm_concurrency", 3, 4)
+
+
+def test_workers_share_one_rate_limit_and_the_search_cache(servers, tmp_path):
+    server = servers(rps={"search": 20, "chat": 1000})
+    config = {
+        "configurable": {
+            "cache_dir": str(tmp_path),
+            "document_template": fake_template(6),
+            # A throttled search would fail, not be retried into compliance
+            "call_max_attempts": 1,
+        }
+    }
+
+    def run(name: str) -> dict:
+        topics = [{"id": f"{name}-{i}", "topic": f"shared budget {i}", "config": {}} for i in range(6)]
+        return run_pool(
+            topics,
+            os.path.join(tmp_path, f"{name}.jsonl"),
+            workers=2,
+            concurrency=3,
+            config=config,
+            rate_limits={"tavily": {"requests_per_second": 18}},
+            initializer=functools.partial(install_url_clients, server.url),
+        )
+
+    report = run("first")
+    searches = server.requests["search"]
+
+    assert report["succeeded"] == 6
+    assert server.throttled["search"] == 0
+    # Both workers draw from one bucket, so together they search at most 18 times a second
+    arrivals = server.arrivals["search"]
+    assert arrivals[-1] - arrivals[0] >= (searches - 1.8) / 18 - 0.1
+
+    # The same topics again: every search is answered from the cache the workers share
+    assert run("again")["succeeded"] == 6
+    assert server.requests["search"] == searches
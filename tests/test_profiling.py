@@ -0,0 +1,45 @@
+import asyncio
+import glob
+import json
+import os
+import pstats
+
+import pytest
+
+
+BRANCH_NODES = {"generate_queries": "search_web", "search_web": "generate_queries"}
+
+
+def functions(report: str) -> set[str]:
+    return {name for _, _, name in pstats.Stats(report).stats}
+
+
+@pytest.mark.parametrize("invoke", ["sync", "async"])
+def test_concurrent_branches_are_each_profiled_on_their_own(fakes, tmp_path, invoke):
+    # Slow enough responses that the branches of a step overlap
+    fakes(llm_delay=0.1, search_delay=0.1)
+    from src.agent import graph
+
+    config = {"configurable": {"profile_dir": str(tmp_path), "search_cache_mode": "bypass"}}
+    if invoke == "sync":
+        graph.invoke({"topic": "profiled branches"}, config)
+    else:
+        asyncio.run(graph.ainvoke({"topic": "profiled branches"}, config))
+
+    [run_dir] = glob.glob(os.path.join(tmp_path, "*"))
+    with open(os.path.join(run_dir, "summary.json")) as f:
+        nodes = json.load(f)["nodes"]
+    # The research branches ran at once, and none of them went unprofiled
+    branches = nodes["generate_queries"]["runs"]
+    assert branches > 1
+    assert nodes["search_web"]["runs"] == branches
+    assert nodes["generate_queries"]["concurrent_runs"] > 0
+    assert nodes["search_web"]["concurrent_runs"] > 0
+    assert len(glob.glob(os.path.join(run_dir, "*.prof"))) == sum(node["runs"] for node in nodes.values())
+
+    # Each report holds the calls of its own node only, whichever thread or task ran the others
+    for node, other in BRANCH_NODES.items():
+        for report in glob.glob(os.path.join(run_dir, f"*-{node}.prof")):
+            names = functions(report)
+            assert {node, f"a{node}"} & names
+            assert not {other, f"a{other}"} & names
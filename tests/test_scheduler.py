@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from benchmarks.rate_limits import HTTPSearchClient, install_server_clients
+from src.durable import should_retry_node
+from src.limits import SEARCH_LIMIT
+from src.scheduler import BACKOFF_BASE, SCHEDULER, SEARCH_PROVIDER, set_rate_limits
+
+
+def search(client: HTTPSearchClient, query: str, max_attempts: int):
+    return SCHEDULER.call(
+        lambda: client.search(query), SEARCH_PROVIDER, "search", SEARCH_LIMIT, max_attempts=max_attempts
+    )
+
+
+def test_a_throttled_call_is_retried_after_the_servers_retry_after(servers):
+    server = servers(rps={"search": 1}, retry_after=1)
+    client = HTTPSearchClient(server.url)
+
+    search(client, "first", max_attempts=3)
+    search(client, "second", max_attempts=3)
+
+    assert server.requests["search"] == 3
+    assert server.throttled["search"] == 1
+    first, throttled, retried = server.arrivals["search"]
+    assert retried - throttled >= 1.0
+
+
+def test_retries_stop_after_max_attempts_with_capped_jittered_backoff(servers):
+    server = servers(rps={"search": 0})
+    client = HTTPSearchClient(server.url)
+
+    with pytest.raises(httpx.HTTPStatusError) as raised:
+        search(client, "always throttled", max_attempts=4)
+
+    arrivals = server.arrivals["search"]
+    assert len(arrivals) == 4
+    for attempt, (before, after) in enumerate(zip(arrivals, arrivals[1:]), start=1):
+        assert after - before <= BACKOFF_BASE * 2 ** (attempt - 1) + 0.1
+    # The scheduler has retried it, so the node's retry policy must not run it again
+    assert not should_retry_node(raised.value)
+
+
+def test_an_unretried_call_is_left_to_the_node_retry_policy(servers):
+    server = servers(rps={"search": 0})
+
+    with pytest.raises(httpx.HTTPStatusError) as raised:
+        search(HTTPSearchClient(server.url), "always throttled", max_attempts=1)
+
+    assert server.requests["search"] == 1
+    assert should_retry_node(raised.value)
+
+
+def test_rate_limited_calls_stay_under_the_servers_limit(servers):
+    server = servers(rps={"search": 20})
+    set_rate_limits({SEARCH_PROVIDER: {"requests_per_second": 18}})
+    client = HTTPSearchClient(server.url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: search(client, f"query {i}", max_attempts=1), range(40)))
+    elapsed = time.perf_counter() - start
+
+    assert server.requests["search"] == 40
+    assert server.throttled["search"] == 0
+    # Only the initial burst of a tenth of the limit goes out without waiting
+    assert elapsed >= (40 - 1.8) / 18 - 0.1
+
+
+def test_a_model_call_is_retried_by_the_scheduler_only(fakes, servers, tmp_path):
+    fakes()
+    server = servers(rps={"search": 100, "chat": 0}, retry_after=0)
+    install_server_clients(server)
+    from src.agent import graph
+
+    config = {"configurable": {"cache_dir": str(tmp_path), "search_cache_mode": "bypass", "call_max_attempts": 2}}
+    with pytest.raises(Exception):
+        graph.invoke({"topic": "throttled planner"}, config)
+
+    # Two attempts by the scheduler, and no further runs of the node around them
+    assert server.requests["chat"] == 2
@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from benchmarks.streaming_latency import stream_async, stream_sync
+
+
+TOKEN_DELAY = 0.005
+
+
+@pytest.fixture
+def graph(fakes):
+    fakes(llm_delay=0.1, search_delay=0.05, token_delay=TOKEN_DELAY, report_chars=2000)
+    from src.agent import graph
+
+    return graph
+
+
+@pytest.mark.parametrize("stream", ["sync", "async"])
+def test_outline_sections_and_report_tokens_arrive_before_the_run_completes(graph, stream):
+    marks = stream_sync(graph) if stream == "sync" else asyncio.run(stream_async(graph))
+
+    assert marks["first outline"] < marks["first section_researched"] < marks["first report token"]
+    # The report streams token by token, so its first token comes well before the last
+    assert marks["complete"] - marks["first report token"] > 0.1
+    assert marks["first report token"] < 0.75 * marks["complete"]